@@ -0,0 +1,685 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import sis
+import servidor
+
+# Ferramentas de desempenho do sistema da oficina:
+#   gerar     preenche um banco com dados sintéticos em escala configurável
+#   executar  cronometra cada método do Database e cada lista/relatório da
+#             MainWindow (plataforma offscreen do Qt) e emite JSON
+#   vendas    mede vendas por segundo no balcão com uma cesta realista
+#   carga     simula vários terminais usando o servidor (servidor.py) ao mesmo tempo
+#   sincronizacao  tempo da sincronização entre duas filiais por quantidade de alterações
+
+LOTE_GERACAO = 10000
+
+MARCAS_MODELOS = [(marca, modelo) for marca, modelos in {
+    "Honda": ["CG 160", "Biz 125", "Pop 110i", "NXR 160 Bros", "XRE 190"],
+    "Yamaha": ["Factor 150", "Fazer 250", "Crosser 150", "MT-03"],
+    "Shineray": ["XY 125", "Jet 125SS"],
+    "Bajaj": ["Dominar 400", "Pulsar NS 200"],
+}.items() for modelo in modelos]
+NOMES = ["Ana", "Bruno", "Carla", "Diego", "Elaine", "Felipe", "Gabriela", "Hugo", "Isabel", "João",
+         "Karina", "Lucas", "Marina", "Nelson", "Olívia", "Paulo", "Renata", "Sérgio", "Tânia", "Vitor"]
+SOBRENOMES = ["Silva", "Santos", "Oliveira", "Souza", "Lima", "Pereira", "Costa", "Rodrigues", "Almeida", "Nunes"]
+PECAS = ["Vela de ignição", "Óleo 20W50", "Pastilha de freio", "Corrente", "Coroa", "Pinhão", "Filtro de ar",
+         "Cabo de embreagem", "Pneu traseiro", "Pneu dianteiro", "Lâmpada farol", "Bateria", "Retentor"]
+SERVICOS = ["Revisão geral", "Troca de óleo", "Troca de kit relação", "Regulagem de freio",
+            "Troca de pneu", "Revisão elétrica", "Limpeza de carburador"]
+FUNCOES = ["Administrador", "Mecânico", "Serviços Gerais", "Vendas"]
+
+
+def tamanhos_para_escala(escala):
+    # A escala é a quantidade de OS e de vendas; as demais tabelas acompanham
+    return {
+        "clientes": max(escala // 5, 10),
+        "motos": max(escala // 4, 10),
+        "produtos": min(max(escala // 20, 50), 50000),
+        "funcionarios": min(max(escala // 1000, 5), 200),
+        "ordens_servico": escala,
+        "vendas": escala,
+    }
+
+
+def _em_lotes(db, sql, linhas):
+    lote = []
+    for linha in linhas:
+        lote.append(linha)
+        if len(lote) >= LOTE_GERACAO:
+            db.cursor.executemany(sql, lote)
+            db.conn.commit()
+            lote.clear()
+    if lote:
+        db.cursor.executemany(sql, lote)
+        db.conn.commit()
+
+
+def gerar_dados(db, escala, semente=42, pecas_por_os=2, itens_por_venda=3, anos=3):
+    """Preenche as oito tabelas com dados referencialmente consistentes"""
+    rnd = random.Random(semente)
+    n = tamanhos_para_escala(escala)
+    fim = datetime.now()
+    inicio = fim - timedelta(days=365 * anos)
+    segundos = int((fim - inicio).total_seconds())
+
+    def data_aleatoria():
+        return (inicio + timedelta(seconds=rnd.randrange(segundos))).strftime("%Y-%m-%d %H:%M:%S")
+
+    # Datas de OS e vendas: segundos desde 1970
+    def momento_aleatorio():
+        return int(inicio.timestamp()) + rnd.randrange(segundos)
+
+    def placa():
+        letras = "".join(rnd.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(3))
+        return f"{letras}{rnd.randrange(10)}{rnd.choice('ABCDEFGHIJ')}{rnd.randrange(100):02d}"
+
+    _em_lotes(db, "INSERT INTO clientes (id, nome, cpf, telefone) VALUES (?, ?, ?, ?)",
+              ((i, f"{rnd.choice(NOMES)} {rnd.choice(SOBRENOMES)} {rnd.choice(SOBRENOMES)}",
+                f"{rnd.randrange(10 ** 11):011d}", f"{rnd.randrange(11, 99)}9{rnd.randrange(10 ** 8):08d}")
+               for i in range(1, n["clientes"] + 1)))
+
+    dono = [0] + [rnd.randint(1, n["clientes"]) for _ in range(n["motos"])]
+    _em_lotes(db, "INSERT INTO motos (id, cliente_id, marca, modelo, placa, ano, cor) VALUES (?, ?, ?, ?, ?, ?, ?)",
+              ((i, dono[i], *rnd.choice(MARCAS_MODELOS), placa(), str(rnd.randint(2005, 2025)),
+                rnd.choice(["Preta", "Vermelha", "Branca", "Azul", "Prata"]))
+               for i in range(1, n["motos"] + 1)))
+
+    precos = [0.0]
+    custos = [0.0]
+    for i in range(n["produtos"]):
+        custo = round(rnd.uniform(5, 400), 2)
+        custos.append(custo)
+        precos.append(round(custo * rnd.uniform(1.2, 1.9), 2))
+    _em_lotes(db, "INSERT INTO produtos (id, codigo, descricao, quantidade, preco_custo, preco_venda, estoque_minimo) "
+                  "VALUES (?, ?, ?, ?, ?, ?, ?)",
+              ((i, f"P{i:06d}", f"{rnd.choice(PECAS)} {i}", rnd.randint(0, 500), custos[i], precos[i], rnd.randint(2, 20))
+               for i in range(1, n["produtos"] + 1)))
+
+    _em_lotes(db, "INSERT INTO funcionarios (id, nome, cpf, telefone, funcao, data_admissao, salario) "
+                  "VALUES (?, ?, ?, ?, ?, ?, ?)",
+              ((i, f"{rnd.choice(NOMES)} {rnd.choice(SOBRENOMES)}", f"{i:011d}",
+                f"{rnd.randrange(11, 99)}9{rnd.randrange(10 ** 8):08d}", rnd.choice(FUNCOES),
+                data_aleatoria()[:10], round(rnd.uniform(1500, 6000), 2))
+               for i in range(1, n["funcionarios"] + 1)))
+
+    def ordens():
+        for i in range(1, n["ordens_servico"] + 1):
+            moto = rnd.randint(1, n["motos"])
+            status = "Concluída" if rnd.random() < 0.9 else "Aberta"
+            mao_obra = round(rnd.uniform(50, 600), 2)
+            yield (i, dono[moto], moto, rnd.choice(SERVICOS), status, mao_obra, mao_obra, momento_aleatorio())
+    # O total começa na mão de obra; os gatilhos somam as peças inseridas depois
+    _em_lotes(db, "INSERT INTO ordens_servico (id, cliente_id, moto_id, descricao, status, mao_obra, total, data) "
+                  "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", ordens())
+
+    def pecas():
+        for os_id in range(1, n["ordens_servico"] + 1):
+            for _ in range(rnd.randint(0, pecas_por_os * 2)):
+                produto_id = rnd.randint(1, n["produtos"])
+                yield (os_id, produto_id, rnd.randint(1, 4), precos[produto_id])
+    _em_lotes(db, "INSERT INTO os_pecas (os_id, produto_id, quantidade, preco_unitario) VALUES (?, ?, ?, ?)", pecas())
+
+    itens = []
+    def vendas():
+        for i in range(1, n["vendas"] + 1):
+            cesta = [(rnd.randint(1, n["produtos"]), rnd.randint(1, 3)) for _ in range(rnd.randint(1, itens_por_venda * 2 - 1))]
+            itens.append((i, cesta))
+            cliente = rnd.randint(1, n["clientes"]) if rnd.random() < 0.7 else None
+            yield (i, cliente, momento_aleatorio(), round(sum(precos[p] * q for p, q in cesta), 2))
+    def itens_venda():
+        for venda_id, cesta in itens:
+            for produto_id, quantidade in cesta:
+                yield (venda_id, produto_id, quantidade, precos[produto_id])
+        itens.clear()
+    # Vendas e itens alternam em blocos para não guardar todas as cestas na memória
+    gerador = vendas()
+    while True:
+        bloco = [venda for _, venda in zip(range(LOTE_GERACAO), gerador)]
+        if not bloco:
+            break
+        _em_lotes(db, "INSERT INTO vendas (id, cliente_id, data, total) VALUES (?, ?, ?, ?)", bloco)
+        _em_lotes(db, "INSERT INTO venda_itens (venda_id, produto_id, quantidade, preco_unitario) VALUES (?, ?, ?, ?)",
+                  itens_venda())
+
+    gerar_movimentos(db, inicio)
+
+    db.invalidar_catalogo()
+    # A carga inicial não é uma alteração a ser mostrada pelas visões abertas
+    db.conn.execute("DELETE FROM alteracoes")
+    db.conn.execute("ANALYZE")
+    db.conn.commit()
+    return n
+
+
+def gerar_movimentos(db, inicio):
+    """Movimentação de estoque coerente com o saldo atual e saldos mensais"""
+    # Entrada inicial de cada produto no começo do período e as saídas de OS e
+    # vendas, gravadas em ordem de data (os ids acompanham as datas)
+    db.conn.execute("""
+        INSERT INTO movimentos_estoque (produto_id, data, quantidade, tipo, referencia)
+        SELECT * FROM (
+            SELECT p.id, ?, p.quantidade
+                   + COALESCE((SELECT SUM(quantidade) FROM os_pecas WHERE produto_id = p.id), 0)
+                   + COALESCE((SELECT SUM(quantidade) FROM venda_itens WHERE produto_id = p.id), 0),
+                   'inicial', NULL
+            FROM produtos p
+            UNION ALL
+            SELECT op.produto_id, datetime(o.data, 'unixepoch', 'localtime'), -op.quantidade, 'os', o.id
+            FROM os_pecas op JOIN ordens_servico o ON o.id = op.os_id
+            UNION ALL
+            SELECT i.produto_id, datetime(v.data, 'unixepoch', 'localtime'), -i.quantidade, 'venda', v.id
+            FROM venda_itens i JOIN vendas v ON v.id = i.venda_id
+        ) ORDER BY 2
+    """, (inicio.strftime("%Y-%m-%d %H:%M:%S"),))
+
+    # Saldo no fim de cada mês encerrado dos produtos movimentados no mês
+    por_mes = {}
+    for mes, produto_id, quantidade, ultimo in db.conn.execute(
+            "SELECT substr(data, 1, 7), produto_id, SUM(quantidade), MAX(id) FROM movimentos_estoque GROUP BY 1, 2"):
+        por_mes.setdefault(mes, []).append((produto_id, quantidade, ultimo))
+    saldos = {}
+    mes_atual = datetime.now().strftime("%Y-%m")
+    for mes in sorted(por_mes):
+        if mes == mes_atual:
+            break
+        ano, numero = map(int, mes.split("-"))
+        fim = (datetime(ano + numero // 12, numero % 12 + 1, 1) - timedelta(seconds=1)).strftime("%Y-%m-%d %H:%M:%S")
+        ultimo = max(linha[2] for linha in por_mes[mes])
+        for produto_id, quantidade, _ in por_mes[mes]:
+            saldos[produto_id] = saldos.get(produto_id, 0) + quantidade
+        _em_lotes(db, "INSERT INTO saldos_estoque (produto_id, data, quantidade, ultimo_movimento) VALUES (?, ?, ?, ?)",
+                  ((produto_id, fim, saldos[produto_id], ultimo) for produto_id, _, _ in por_mes[mes]))
+
+
+def _medir(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return {
+        "repeticoes": repeticoes,
+        "min_ms": round(min(tempos), 3),
+        "mediana_ms": round(statistics.median(tempos), 3),
+        "media_ms": round(statistics.fmean(tempos), 3),
+        "max_ms": round(max(tempos), 3),
+    }
+
+
+def casos_database(db, rnd):
+    """Operações do Database com argumentos válidos sorteados do banco"""
+    # Ids lidos uma vez por tabela e sorteados com rnd (reproduzível pela semente);
+    # os produtos com estoque continuam com estoque porque cada caso repõe o que baixou
+    ids = {}
+
+    def sortear(tabela, condicao=""):
+        if (tabela, condicao) not in ids:
+            ids[tabela, condicao] = [linha[0] for linha in
+                                     db.conn.execute(f"SELECT id FROM {tabela} {condicao} ORDER BY id")]
+        return rnd.choice(ids[tabela, condicao])
+
+    def com_estoque():
+        return sortear("produtos", "WHERE quantidade > 10")
+
+    def repor(produto_id):
+        db.conn.execute("UPDATE produtos SET quantidade = quantidade + 100 WHERE id = ?", (produto_id,))
+        db.conn.commit()
+        db.invalidar_catalogo()
+
+    ano_passado = datetime.now().year - 1
+
+    def data_passada():
+        return (datetime.now() - timedelta(days=rnd.randrange(1, 1000), seconds=rnd.randrange(86400))).strftime("%Y-%m-%d %H:%M:%S")
+
+    def data_venda():
+        return db.conn.execute("SELECT data FROM vendas WHERE id = ?", (sortear("vendas"),)).fetchone()[0]
+
+    def nova_os():
+        cliente, moto = db.conn.execute("SELECT cliente_id, id FROM motos WHERE id = ?", (sortear("motos"),)).fetchone()
+        return db.criar_ordem_servico(cliente, moto, "Benchmark")
+
+    def excluir_cliente():
+        db.excluir_cliente(db.cadastrar_cliente("Temporário", "", "11999999999"))
+
+    def excluir_funcionario():
+        cpf = f"9{rnd.randrange(10 ** 10):010d}"
+        db.excluir_funcionario(db.cadastrar_funcionario("Temporário", cpf, "", "Vendas", "", 0.0))
+
+    def adicionar_peca():
+        produto = com_estoque()
+        db.adicionar_peca_os(sortear("ordens_servico"), produto, 1)
+        repor(produto)
+
+    def venda():
+        cesta = [(com_estoque(), 1) for _ in range(4)]
+        db.registrar_venda(None, cesta)
+        for produto_id, _ in cesta:
+            repor(produto_id)
+
+    def baixar():
+        produto = com_estoque()
+        db.atualizar_estoque(produto, 1)
+        repor(produto)
+
+    return {
+        "cadastrar_cliente": lambda: db.cadastrar_cliente("Cliente Benchmark", "", "11999999999"),
+        "excluir_cliente": excluir_cliente,
+        "cadastrar_moto": lambda: db.cadastrar_moto(sortear("clientes"), "Honda", "CG 160", "BEN1C23", "2024", "Preta"),
+        "cadastrar_produto": lambda: db.cadastrar_produto("BENCH", "Produto Benchmark", 10, 1.0, 2.0, 1),
+        "listar_clientes": db.listar_clientes,
+        "cliente_existe": lambda: db.cliente_existe(sortear("clientes")),
+        "cliente_por_cpf": lambda: db.cliente_por_cpf(f"{rnd.randrange(10 ** 11):011d}"),
+        "cadastrar_lote": lambda: db.cadastrar_lote("clientes", [("Cliente Lote", "", "11999999999")] * 100),
+        "listar_motos": lambda: db.listar_motos(sortear("clientes")),
+        "listar_produtos": db.listar_produtos,
+        "catalogo_produtos": lambda: (db.invalidar_catalogo(), db.catalogo_produtos()),
+        "obter_produto": lambda: db.obter_produto(sortear("produtos")),
+        "produto_por_codigo": lambda: db.produto_por_codigo(f"P{sortear('produtos'):06d}"),
+        "produto_por_descricao": lambda: db.produto_por_descricao(f"{PECAS[0]} 1"),
+        "cadastrar_funcionario": lambda: db.cadastrar_funcionario("Funcionário", f"8{rnd.randrange(10 ** 10):010d}",
+                                                                   "", "Vendas", "", 0.0),
+        "listar_funcionarios": db.listar_funcionarios,
+        "excluir_funcionario": excluir_funcionario,
+        "verificar_estoque": lambda: db.verificar_estoque(sortear("produtos"), 1),
+        "atualizar_estoque": baixar,
+        "criar_ordem_servico": nova_os,
+        "adicionar_peca_os": adicionar_peca,
+        "concluir_os": lambda: db.concluir_os(sortear("ordens_servico"), 120.0),
+        "calcular_total_os": lambda: db.calcular_total_os(sortear("ordens_servico")),
+        "totais_os": lambda: db.totais_os([sortear("ordens_servico") for _ in range(100)]),
+        "registrar_venda": venda,
+        "listar_os": db.listar_os,
+        "listar_os_mes": lambda: db.listar_os(**sis.filtro_periodo("Este mês")),
+        "relatorio_estoque_baixo": db.relatorio_estoque_baixo,
+        "relatorio_vendas": db.relatorio_vendas,
+        "relatorio_vendas_mes": lambda: db.relatorio_vendas(**sis.filtro_periodo("Este mês")),
+        "relatorio_vendas_pagina": lambda: db.relatorio_vendas(antes=(data_venda(), 0), limite=sis.TAMANHO_PAGINA),
+        "search": lambda: db.search(rnd.choice(NOMES + SOBRENOMES + PECAS).split()[0]),
+        "sugestoes_clientes": lambda: db.sugestoes_clientes(rnd.choice(NOMES)[:rnd.randint(1, 4)]),
+        "sugestoes_produtos": lambda: db.sugestoes_produtos(rnd.choice(PECAS)[:rnd.randint(1, 4)]),
+        "ultima_alteracao": db.ultima_alteracao,
+        "alteracoes_desde": lambda: db.alteracoes_desde(max(db.ultima_alteracao() - 100, 0), 500),
+        "ids_relacionados": lambda: db.ids_relacionados("ordens_servico", "cliente_id",
+                                                        [sortear("clientes") for _ in range(10)]),
+        "atualizar_catalogo": lambda: (db.catalogo_produtos(), db.atualizar_catalogo([sortear("produtos") for _ in range(10)])),
+        "resumo_diario": lambda: db.resumo_diario(f"{ano_passado}-01-01", f"{ano_passado}-12-31"),
+        "resumo_mensal": db.resumo_mensal,
+        "resumo_produtos": lambda: db.resumo_produtos(f"{ano_passado}-01", f"{ano_passado}-12"),
+        "reconstruir_resumos": db.reconstruir_resumos,
+        "arquivar_lote": lambda: db.arquivar_lote(int(time.time()) - sis.DIAS_ARQUIVAMENTO * 86400, 100),
+        "filial": db.filial,
+        "lote_sincronizacao": lambda: db.lote_sincronizacao("benchmark"),
+        "registrar_entrada": lambda: db.registrar_entrada(sortear("produtos"), 10),
+        "estoque_em": lambda: db.estoque_em(sortear("produtos"), data_passada()),
+        "historico_estoque": lambda: db.historico_estoque(sortear("produtos"), f"{ano_passado}-01-01", f"{ano_passado}-12-31"),
+        "registrar_saldos": db.registrar_saldos,
+        "contagem_alertas": db.contagem_alertas,
+        "recontar_alertas": db.recontar_alertas,
+    }
+
+
+def bench_database(db, repeticoes, semente=42):
+    rnd = random.Random(semente)
+    casos = casos_database(db, rnd)
+    resultados = {nome: _medir(funcao, repeticoes) for nome, funcao in casos.items()}
+    # Métodos públicos sem caso de benchmark ficam registrados no resultado
+    publicos = {nome for nome in dir(sis.Database) if not nome.startswith("_")
+                and callable(getattr(sis.Database, nome)) and not nome.startswith("cursor_")}
+    sem_caso = sorted(publicos - set(casos) - {"close", "invalidar_catalogo", "ativar_perfil", "desativar_perfil",
+                                               "perfil_ativo", "perfil_consultas", "limpar_perfil"})
+    return resultados, sem_caso
+
+
+def bench_visoes(db, repeticoes):
+    """Tempo até a primeira página de cada lista/relatório estar pintada"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication([])
+    sis.aplicar_estilo(app)
+    janela = sis.MainWindow(db)
+    janela.resize(1200, 800)
+    janela.show()
+
+    def abrir(visao):
+        def executar():
+            visao()
+            limite = time.perf_counter() + 120
+            while janela._token_tabela is not None and not janela.table.model().linhas:
+                if time.perf_counter() > limite:
+                    raise RuntimeError("tempo esgotado esperando a primeira página")
+                app.processEvents()
+            janela.table.viewport().repaint()
+        return executar
+
+    visoes = {
+        "listar_os": janela.listar_os,
+        "listar_produtos": janela.listar_produtos,
+        "listar_clientes": janela.listar_clientes,
+        "listar_funcionarios": janela.listar_funcionarios,
+        "relatorio_estoque": janela.relatorio_estoque,
+        "relatorio_vendas": janela.relatorio_vendas,
+    }
+    resultados = {nome: _medir(abrir(visao), repeticoes) for nome, visao in visoes.items()}
+    janela.close()
+    return resultados
+
+
+def contar_linhas(db):
+    tabelas = ["clientes", "motos", "produtos", "ordens_servico", "os_pecas", "vendas", "venda_itens", "funcionarios"]
+    return {tabela: db.conn.execute(f"SELECT COUNT(*) FROM {tabela}").fetchone()[0] for tabela in tabelas}
+
+
+def preparar_catalogo(db, produtos):
+    db.cursor.executemany(
+        "INSERT INTO produtos (codigo, descricao, quantidade, preco_custo, preco_venda, estoque_minimo) VALUES (?, ?, ?, ?, ?, ?)",
+        [(f"P{i:06d}", f"Produto {i}", 10 ** 9, 10.0, 15.0 + i % 50, 5) for i in range(produtos)])
+    db.conn.commit()
+    db.cursor.execute("SELECT id FROM produtos")
+    return [linha[0] for linha in db.cursor.fetchall()]
+
+
+def bench_vendas(db, ids, vendas, itens_por_venda, semente=42):
+    rnd = random.Random(semente)
+    cestas = [[(rnd.choice(ids), rnd.randint(1, 3)) for _ in range(itens_por_venda)]
+              for _ in range(vendas)]
+    inicio = time.perf_counter()
+    for cesta in cestas:
+        if db.registrar_venda(None, cesta) is None:
+            raise RuntimeError("venda recusada durante o benchmark")
+    duracao = time.perf_counter() - inicio
+    return {
+        "vendas": vendas,
+        "itens_por_venda": itens_por_venda,
+        "segundos": round(duracao, 4),
+        "vendas_por_segundo": round(vendas / duracao, 1),
+    }
+
+
+def cmd_gerar(args):
+    if os.path.exists(args.db):
+        sys.exit(f"{args.db} já existe; o gerador só preenche bancos novos")
+    sis.init_db(args.db)
+    db = sis.Database(args.db)
+    inicio = time.perf_counter()
+    tamanhos = gerar_dados(db, args.escala, args.semente)
+    db.close()
+    print(f"{args.db}: {json.dumps(tamanhos)} em {time.perf_counter() - inicio:.1f}s")
+
+
+def copiar_banco(origem, destino):
+    """Copia o banco (e o seu arquivo, se houver) pela API de backup do SQLite"""
+    for de, para in ((origem, destino), (sis.caminho_arquivo(origem), sis.caminho_arquivo(destino))):
+        if not os.path.exists(de):
+            continue
+        fonte, copia = sqlite3.connect(de), sqlite3.connect(para)
+        try:
+            fonte.backup(copia)
+        finally:
+            fonte.close()
+            copia.close()
+
+
+def cmd_executar(args):
+    # Os casos de escrita gravam no banco; mede-se uma cópia para não alterar o informado
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "bench.db")
+        copiar_banco(args.db, caminho)
+        resultado = executar_casos(caminho, args)
+
+    saida = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            arquivo.write(saida + "\n")
+    else:
+        print(saida)
+
+
+def executar_casos(caminho, args):
+    sis.init_db(caminho)
+    db = sis.Database(caminho)
+    if args.perfil_consultas:
+        db.ativar_perfil()
+    metodos, sem_caso = bench_database(db, args.repeticoes)
+    resultado = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "maquina": platform.node(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "versao_esquema": db.conn.execute("PRAGMA user_version").fetchone()[0],
+        "linhas": contar_linhas(db),
+        "metodos": metodos,
+        "metodos_sem_caso": sem_caso,
+    }
+    try:
+        resultado["analise_resumos"] = _medir(lambda: sis.analisar_resumos(db), args.repeticoes)
+    except ValueError as e:
+        resultado["analise_resumos"] = str(e)
+    if not args.sem_visoes:
+        resultado["visoes"] = bench_visoes(db, args.repeticoes)
+    if args.perfil_consultas:
+        resultado["perfil_consultas"] = db.perfil_consultas()
+    db.close()
+    return resultado
+
+
+def cmd_vendas(args):
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "bench.db")
+        sis.init_db(caminho)
+        db = sis.Database(caminho)
+        ids = preparar_catalogo(db, args.produtos)
+        resultado = bench_vendas(db, ids, args.vendas, args.itens)
+        db.close()
+
+    print(f"{resultado['vendas']} vendas de {resultado['itens_por_venda']} itens em "
+          f"{resultado['segundos']:.2f}s: {resultado['vendas_por_segundo']:.1f} vendas/s")
+
+
+# Operações de um terminal no balcão e seus pesos na carga simulada
+PESOS_CARGA = {
+    "busca": 30,
+    "listar_motos": 20,
+    "cliente_existe": 15,
+    "estoque_em": 10,
+    "alteracoes_desde": 15,
+    "registrar_venda": 7,
+    "cadastrar_cliente": 3,
+}
+
+
+def _percentis(tempos):
+    tempos = sorted(tempos)
+    if not tempos:
+        return {"operacoes": 0}
+    def percentil(p):
+        return round(tempos[min(len(tempos) - 1, int(len(tempos) * p))], 3)
+    return {
+        "operacoes": len(tempos),
+        "p50_ms": percentil(0.50),
+        "p95_ms": percentil(0.95),
+        "p99_ms": percentil(0.99),
+        "max_ms": round(tempos[-1], 3),
+    }
+
+
+def terminal_carga(url, ids, duracao, semente):
+    """Um terminal: sorteia operações pelos pesos até acabar o tempo; devolve os tempos por operação"""
+    rnd = random.Random(semente)
+    db = sis.DatabaseRemota(url, conexoes=1)
+    ultima = db.ultima_alteracao()
+    operacoes = {
+        "busca": lambda: db.cursor_busca(rnd.choice(NOMES + PECAS)[:4]).fetchall(),
+        "listar_motos": lambda: db.listar_motos(rnd.choice(ids["clientes"])),
+        "cliente_existe": lambda: db.cliente_existe(rnd.choice(ids["clientes"])),
+        "estoque_em": lambda: db.estoque_em(rnd.choice(ids["produtos"]),
+                                            (datetime.now() - timedelta(days=rnd.randint(0, 365))).strftime("%Y-%m-%d %H:%M:%S")),
+        "alteracoes_desde": lambda: db.alteracoes_desde(ultima, sis.LIMITE_ALTERACOES_VISAO),
+        "registrar_venda": lambda: db.registrar_venda(None, [(rnd.choice(ids["produtos"]), 1)]),
+        "cadastrar_cliente": lambda: db.cadastrar_cliente(f"{rnd.choice(NOMES)} {rnd.choice(SOBRENOMES)}",
+                                                          None, f"(82) 9{rnd.randint(0, 99999999):08d}"),
+    }
+    nomes, pesos = list(PESOS_CARGA), list(PESOS_CARGA.values())
+    tempos = {nome: [] for nome in nomes}
+    erros = {}
+    fim = time.perf_counter() + duracao
+    while time.perf_counter() < fim:
+        nome = rnd.choices(nomes, pesos)[0]
+        inicio = time.perf_counter()
+        try:
+            operacoes[nome]()
+        except (sqlite3.Error, ValueError) as e:
+            erros[nome] = erros.get(nome, 0) + 1
+            erros.setdefault("exemplo", str(e))
+            continue
+        tempos[nome].append((time.perf_counter() - inicio) * 1000)
+    db.close()
+    return tempos, erros
+
+
+def bench_carga(url, ids, terminais, duracao, semente=42):
+    resultados = [None] * terminais
+    def executar(indice):
+        resultados[indice] = terminal_carga(url, ids, duracao, semente + indice)
+    threads = [threading.Thread(target=executar, args=(i,)) for i in range(terminais)]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    segundos = time.perf_counter() - inicio
+
+    por_operacao = {nome: [] for nome in PESOS_CARGA}
+    erros = {}
+    for tempos, erros_terminal in resultados:
+        for nome, lista in tempos.items():
+            por_operacao[nome].extend(lista)
+        for nome, quantidade in erros_terminal.items():
+            erros[nome] = quantidade if nome == "exemplo" else erros.get(nome, 0) + quantidade
+    todas = [tempo for lista in por_operacao.values() for tempo in lista]
+    return {
+        "terminais": terminais,
+        "segundos": round(segundos, 2),
+        "operacoes_por_segundo": round(len(todas) / segundos, 1),
+        "geral": _percentis(todas),
+        "operacoes": {nome: _percentis(lista) for nome, lista in por_operacao.items()},
+        "erros": erros,
+    }
+
+
+def cmd_carga(args):
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = args.db or os.path.join(pasta, "carga.db")
+        if not args.db:
+            sis.init_db(caminho)
+            gerar_dados(sis.Database(caminho), args.escala)
+        sis.init_db(caminho)
+        db = sis.Database(caminho)
+        ids = {tabela: [linha[0] for linha in db.conn.execute(f"SELECT id FROM {tabela}")]
+               for tabela in ("clientes", "produtos")}
+        db.close()
+
+        oficina = servidor.ServidorOficina(sis.Database(caminho), "127.0.0.1", 0, args.leitores)
+        url = oficina.iniciar_em_segundo_plano()
+        try:
+            resultado = bench_carga(url, ids, args.terminais, args.duracao)
+        finally:
+            oficina.parar()
+    resultado["leitores"] = args.leitores
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+
+def bench_sincronizacao(a, b, quantidades):
+    """Primeira sincronização (todas as linhas) e, para cada quantidade, a de
+    tantos clientes novos e alterados na filial a (linhas distintas aplicadas em b)"""
+    resultados = {"inicial": sis.sincronizar(a, b)}
+    for quantidade in quantidades:
+        novos = quantidade // 2
+        a.cursor.execute("UPDATE clientes SET telefone = '11988887777' WHERE id IN "
+                         "(SELECT id FROM clientes ORDER BY random() LIMIT ?)", (quantidade - novos,))
+        a.conn.commit()
+        a.cadastrar_lote("clientes", [("Cliente Filial", "", "11999999999")] * novos)
+        inicio = time.perf_counter()
+        relatorio = sis.sincronizar(a, b)
+        segundos = time.perf_counter() - inicio
+        aplicadas = relatorio["enviadas"]["aplicadas"]
+        resultados[str(quantidade)] = {
+            "segundos": round(segundos, 4),
+            "aplicadas": aplicadas,
+            "ms_por_alteracao": round(segundos * 1000 / max(aplicadas, 1), 4),
+        }
+    return resultados
+
+
+def cmd_sincronizacao(args):
+    with tempfile.TemporaryDirectory() as pasta:
+        filiais = []
+        for indice in range(2):
+            caminho = os.path.join(pasta, f"filial{indice}.db")
+            sis.init_db(caminho)
+            db = sis.Database(caminho)
+            gerar_dados(db, args.escala, args.semente + indice)
+            filiais.append(db)
+        resultado = bench_sincronizacao(*filiais, args.quantidades)
+        resultado["linhas"] = [contar_linhas(db) for db in filiais]
+        for db in filiais:
+            db.close()
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ferramentas de desempenho do sistema da oficina")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    gerar = comandos.add_parser("gerar", help="cria um banco com dados sintéticos")
+    gerar.add_argument("--db", required=True)
+    gerar.add_argument("--escala", type=int, default=1000, help="quantidade de OS e de vendas (10^3 a 10^6)")
+    gerar.add_argument("--semente", type=int, default=42)
+    gerar.set_defaults(funcao=cmd_gerar)
+
+    executar = comandos.add_parser("executar", help="cronometra métodos e telas e emite JSON")
+    executar.add_argument("--db", required=True)
+    executar.add_argument("--repeticoes", type=int, default=5)
+    executar.add_argument("--saida", help="arquivo JSON de saída (padrão: saída padrão)")
+    executar.add_argument("--sem-visoes", action="store_true", help="não cronometra as telas")
+    executar.add_argument("--perfil-consultas", action="store_true",
+                          help="mede também cada comando SQL e inclui o perfil (e as consultas lentas) no JSON")
+    executar.set_defaults(funcao=cmd_executar)
+
+    vendas = comandos.add_parser("vendas", help="vendas por segundo no balcão")
+    vendas.add_argument("--vendas", type=int, default=2000)
+    vendas.add_argument("--itens", type=int, default=4, help="itens por venda")
+    vendas.add_argument("--produtos", type=int, default=5000)
+    vendas.set_defaults(funcao=cmd_vendas)
+
+    carga = comandos.add_parser("carga", help="latência e vazão do servidor com vários terminais")
+    carga.add_argument("--db", help="banco gerado a usar (padrão: um temporário com --escala)")
+    carga.add_argument("--escala", type=int, default=1000)
+    carga.add_argument("--terminais", type=int, default=8)
+    carga.add_argument("--duracao", type=float, default=10, help="segundos de carga")
+    carga.add_argument("--leitores", type=int, default=servidor.LEITORES_PADRAO)
+    carga.set_defaults(funcao=cmd_carga)
+
+    sincronizacao = comandos.add_parser("sincronizacao", help="sincronização entre duas filiais geradas")
+    sincronizacao.add_argument("--escala", type=int, default=1000)
+    sincronizacao.add_argument("--semente", type=int, default=42)
+    sincronizacao.add_argument("--quantidades", type=int, nargs="+", default=[10, 100, 1000, 10000],
+                               help="alterações feitas em uma filial antes de cada sincronização")
+    sincronizacao.set_defaults(funcao=cmd_sincronizacao)
+
+    args = parser.parse_args(argv)
+    args.funcao(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
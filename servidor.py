@@ -0,0 +1,290 @@
+import argparse
+import asyncio
+import itertools
+import hmac
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import sis
+
+# Servidor da oficina para vários terminais: um processo asyncio é o único dono
+# do banco e expõe as operações do Database em HTTP/JSON. As gravações passam
+# por uma única thread (uma de cada vez); as leituras, por um grupo de threads,
+# cada uma com a própria conexão WAL. Os terminais usam sis.DatabaseRemota.
+#
+#   POST /chamar            {"metodo", "args", "kwargs"} -> {"resultado"}
+#   POST /cursor            {"metodo", "args", "kwargs", "tamanho"} -> {"cursor", "linhas", "esgotado"}
+#   POST /cursor/proximos   {"cursor", "tamanho"} -> {"linhas", "esgotado"}
+#   POST /cursor/fechar     {"cursor"}
+#   GET  /saude             {"ok", "versao_esquema"}
+#
+# Só os métodos listados abaixo são atendidos; os de administração pedem o
+# cabeçalho "Authorization: Bearer <token>" com o token do servidor.
+
+PORTA_PADRAO = 8765
+LEITORES_PADRAO = 4
+# Conexões sem requisições e cursores sem leitura são fechados depois de
+TEMPO_OCIOSO = 60
+TEMPO_CURSOR = 120
+TAMANHO_MAXIMO_PEDIDO = 16 * 1024 * 1024
+
+METODOS_ESCRITA = {
+    "cadastrar_cliente", "excluir_cliente", "cadastrar_moto", "cadastrar_produto", "cadastrar_lote",
+    "cadastrar_funcionario", "excluir_funcionario", "atualizar_estoque", "registrar_entrada",
+    "criar_ordem_servico", "adicionar_peca_os", "concluir_os", "registrar_venda",
+    "reconstruir_resumos", "registrar_saldos", "arquivar_lote", "lote_sincronizacao", "aplicar_sincronizacao",
+}
+# Métodos que carregam ou alteram os caches do Database (catálogo, alertas,
+# perfil) também passam pela thread de escrita: é a única que mexe neles e lê o
+# banco já com as próprias gravações, sem montar um cache de um retrato antigo
+METODOS_ESTADO = {
+    "ativar_perfil", "desativar_perfil", "limpar_perfil", "invalidar_catalogo", "atualizar_catalogo",
+    "catalogo_produtos", "obter_produto", "produto_por_codigo", "produto_por_descricao",
+    "contagem_alertas", "recontar_alertas",
+}
+# Sem texto, as sugestões vêm da lista de recentes (outro cache); com texto, da busca
+METODOS_RECENTES = {"sugestoes_clientes", "sugestoes_produtos"}
+# Operações do balcão que os terminais podem chamar
+METODOS_TERMINAL = {
+    "cadastrar_cliente", "excluir_cliente", "cliente_existe", "cliente_por_cpf", "listar_clientes",
+    "cadastrar_moto", "listar_motos", "cadastrar_funcionario", "excluir_funcionario", "listar_funcionarios",
+    "cadastrar_produto", "cadastrar_lote", "listar_produtos", "catalogo_produtos", "obter_produto",
+    "produto_por_codigo", "produto_por_descricao", "invalidar_catalogo", "atualizar_catalogo",
+    "verificar_estoque", "atualizar_estoque", "registrar_entrada", "estoque_em", "historico_estoque",
+    "criar_ordem_servico", "adicionar_peca_os", "concluir_os", "calcular_total_os", "totais_os", "listar_os",
+    "registrar_venda", "relatorio_vendas", "relatorio_estoque_baixo", "resumo_diario", "resumo_mensal",
+    "resumo_produtos", "contagem_alertas", "recontar_alertas", "search", "sugestoes_clientes",
+    "sugestoes_produtos", "ids_relacionados", "alteracoes_desde", "ultima_alteracao",
+    "cursor_busca", "cursor_clientes", "cursor_produtos", "cursor_funcionarios", "cursor_os", "cursor_vendas",
+    "cursor_estoque_baixo",
+}
+# Perfil, manutenção, arquivamento e sincronização: só com o token do servidor
+METODOS_ADMINISTRACAO = {
+    "ativar_perfil", "desativar_perfil", "limpar_perfil", "perfil_ativo", "perfil_consultas",
+    "reconstruir_resumos", "registrar_saldos", "arquivar_lote",
+    "filial", "lote_sincronizacao", "aplicar_sincronizacao",
+}
+METODOS = METODOS_TERMINAL | METODOS_ADMINISTRACAO
+
+MENSAGENS_HTTP = {200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found", 413: "Payload Too Large",
+                  500: "Internal Server Error"}
+
+
+class ErroPedido(Exception):
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+
+class ServidorOficina:
+    def __init__(self, db, host="127.0.0.1", porta=PORTA_PADRAO, leitores=LEITORES_PADRAO, token=None):
+        self.db = db
+        self.host = host
+        self.porta = porta
+        # Token compartilhado exigido pelos METODOS_ADMINISTRACAO (sem token, ficam fechados)
+        self.token = token
+        self._escritor = ThreadPoolExecutor(1, thread_name_prefix="escrita")
+        self._leitores = ThreadPoolExecutor(leitores, thread_name_prefix="leitura")
+        # Cursores paginados ficam todos na mesma thread (e conexão)
+        self._paginacao = ThreadPoolExecutor(1, thread_name_prefix="paginacao")
+        self._cursores = {}
+        self._ids_cursores = itertools.count(1)
+        self._servidor = None
+        self._loop = None
+
+    # Operações executadas nas threads do banco; devolvem o JSON já codificado
+    def _executar_metodo(self, nome, args, kwargs):
+        resultado = getattr(self.db, nome)(*args, **kwargs)
+        return {"resultado": sis.codificar_valor(resultado)}
+
+    def _abrir_cursor(self, nome, args, kwargs, tamanho):
+        cursor = getattr(self.db, nome)(*args, **kwargs)
+        cursor_id = next(self._ids_cursores)
+        self._cursores[cursor_id] = [cursor, time.monotonic()]
+        return dict(self._proximos(cursor_id, tamanho), cursor=cursor_id)
+
+    def _proximos(self, cursor_id, tamanho):
+        if cursor_id not in self._cursores:
+            raise ErroPedido(404, "Cursor inexistente ou expirado")
+        cursor = self._cursores[cursor_id][0]
+        linhas = cursor.fetchmany(tamanho)
+        esgotado = len(linhas) < tamanho
+        if esgotado:
+            self._fechar_cursor(cursor_id)
+        else:
+            self._cursores[cursor_id][1] = time.monotonic()
+        return {"linhas": sis.codificar_valor(linhas), "esgotado": esgotado}
+
+    def _fechar_cursor(self, cursor_id):
+        item = self._cursores.pop(cursor_id, None)
+        if item:
+            item[0].close()
+        return {}
+
+    def _expirar_cursores(self):
+        limite = time.monotonic() - TEMPO_CURSOR
+        for cursor_id in [c for c, (_, uso) in self._cursores.items() if uso < limite]:
+            self._fechar_cursor(cursor_id)
+
+    def _executor(self, nome, args, kwargs):
+        if nome in METODOS_ESCRITA or nome in METODOS_ESTADO:
+            return self._escritor
+        if nome in METODOS_RECENTES and not str(args[0] if args else kwargs.get("texto", "")).strip():
+            return self._escritor
+        return self._leitores
+
+    async def _em_thread(self, executor, funcao, *args):
+        return await self._loop.run_in_executor(executor, partial(funcao, *args))
+
+    def _autorizado(self, cabecalhos):
+        tipo, _, token = cabecalhos.get("authorization", "").partition(" ")
+        return bool(self.token) and tipo.lower() == "bearer" and hmac.compare_digest(token.encode(), self.token.encode())
+
+    async def _tratar(self, metodo_http, caminho, corpo, cabecalhos=None):
+        if caminho == "/saude":
+            versao = await self._em_thread(self._leitores, lambda: self.db.conn.execute("PRAGMA user_version").fetchone()[0])
+            return {"ok": True, "versao_esquema": versao}
+        if metodo_http != "POST":
+            raise ErroPedido(404, f"Caminho inexistente: {metodo_http} {caminho}")
+        try:
+            pedido = sis.decodificar_json(corpo or b"{}")
+        except ValueError:
+            raise ErroPedido(400, "JSON inválido")
+
+        if caminho in ("/chamar", "/cursor"):
+            nome = pedido.get("metodo", "")
+            if nome not in METODOS or (caminho == "/cursor") != nome.startswith("cursor_"):
+                raise ErroPedido(404, f"Método inexistente: {nome}")
+            if nome in METODOS_ADMINISTRACAO and not self._autorizado(cabecalhos or {}):
+                raise ErroPedido(403, f"Método restrito ao administrador: {nome}")
+            args, kwargs = pedido.get("args", []), pedido.get("kwargs", {})
+            if caminho == "/cursor":
+                return await self._em_thread(self._paginacao, self._abrir_cursor, nome, args, kwargs,
+                                             int(pedido.get("tamanho", sis.TAMANHO_PAGINA)))
+            return await self._em_thread(self._executor(nome, args, kwargs), self._executar_metodo, nome, args, kwargs)
+        if caminho == "/cursor/proximos":
+            return await self._em_thread(self._paginacao, self._proximos, pedido.get("cursor"),
+                                         int(pedido.get("tamanho", sis.TAMANHO_PAGINA)))
+        if caminho == "/cursor/fechar":
+            return await self._em_thread(self._paginacao, self._fechar_cursor, pedido.get("cursor"))
+        raise ErroPedido(404, f"Caminho inexistente: {caminho}")
+
+    async def _conexao(self, reader, writer):
+        # HTTP/1.1 com keep-alive: várias requisições por conexão
+        try:
+            while True:
+                try:
+                    linha = await asyncio.wait_for(reader.readline(), TEMPO_OCIOSO)
+                except asyncio.TimeoutError:
+                    break
+                if not linha:
+                    break
+                metodo_http, caminho, versao = linha.decode("latin-1").split(" ", 2)
+                cabecalhos = {}
+                while True:
+                    linha = await reader.readline()
+                    if linha in (b"\r\n", b"\n", b""):
+                        break
+                    chave, _, valor = linha.decode("latin-1").partition(":")
+                    cabecalhos[chave.strip().lower()] = valor.strip()
+                tamanho = int(cabecalhos.get("content-length", 0))
+                manter = cabecalhos.get("connection", "").lower() != "close" and versao.strip() == "HTTP/1.1"
+
+                try:
+                    if tamanho > TAMANHO_MAXIMO_PEDIDO:
+                        manter = False
+                        raise ErroPedido(413, "Pedido grande demais")
+                    corpo = await reader.readexactly(tamanho) if tamanho else b""
+                    status, resposta = 200, await self._tratar(metodo_http, caminho, corpo, cabecalhos)
+                except ErroPedido as e:
+                    status, resposta = e.status, {"erro": str(e)}
+                except Exception as e:
+                    status, resposta = 500, {"erro": str(e), "tipo": type(e).__name__}
+
+                dados = json.dumps(resposta, ensure_ascii=False).encode("utf-8")
+                writer.write(f"HTTP/1.1 {status} {MENSAGENS_HTTP[status]}\r\n"
+                             f"Content-Type: application/json; charset=utf-8\r\n"
+                             f"Content-Length: {len(dados)}\r\n"
+                             f"Connection: {'keep-alive' if manter else 'close'}\r\n\r\n".encode("latin-1") + dados)
+                await writer.drain()
+                if not manter:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _limpeza(self):
+        while True:
+            await asyncio.sleep(TEMPO_CURSOR / 4)
+            await self._em_thread(self._paginacao, self._expirar_cursores)
+
+    async def executar(self, pronto=None):
+        self._loop = asyncio.get_running_loop()
+        self._servidor = await asyncio.start_server(self._conexao, self.host, self.porta)
+        self.porta = self._servidor.sockets[0].getsockname()[1]
+        limpeza = asyncio.create_task(self._limpeza())
+        if pronto:
+            pronto.set()
+        try:
+            async with self._servidor:
+                await self._servidor.serve_forever()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            limpeza.cancel()
+            for executor in (self._escritor, self._leitores, self._paginacao):
+                executor.shutdown(wait=True)
+            self.db.close()
+
+    # Execução em uma thread do próprio processo (testes de carga)
+    def iniciar_em_segundo_plano(self):
+        pronto = threading.Event()
+        self._thread = threading.Thread(target=asyncio.run, args=(self.executar(pronto),), daemon=True)
+        self._thread.start()
+        pronto.wait()
+        return f"http://{self.host}:{self.porta}"
+
+    def parar(self):
+        self._loop.call_soon_threadsafe(self._servidor.close)
+        self._thread.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor do sistema da oficina para vários terminais")
+    parser.add_argument("--db", help="arquivo do banco de dados (padrão: OFICINA_DB ou oficina_motos.db)")
+    parser.add_argument("--host", default="127.0.0.1", help="endereço de escuta (0.0.0.0 para a rede local)")
+    parser.add_argument("--porta", type=int, default=PORTA_PADRAO)
+    parser.add_argument("--leitores", type=int, default=LEITORES_PADRAO, help="threads de leitura")
+    parser.add_argument("--perfil-consultas", nargs="?", type=float, const=sis.LIMITE_CONSULTA_LENTA_MS, metavar="MS",
+                        help="mede métodos e comandos SQL (consultado pelo Diagnóstico do Banco dos terminais)")
+    parser.add_argument("--token", default=os.environ.get("OFICINA_TOKEN"),
+                        help="token compartilhado (padrão: OFICINA_TOKEN) exigido para perfil, arquivamento e "
+                             "sincronização pela rede; sem ele essas operações ficam fechadas")
+    parser.add_argument("--backup", metavar="DIRETORIO",
+                        help="faz backups compactados do banco no diretório enquanto o servidor estiver no ar")
+    parser.add_argument("--backup-intervalo", type=float, default=sis.INTERVALO_BACKUP_HORAS, metavar="HORAS")
+    args = parser.parse_args()
+
+    sis.init_db(args.db)
+    db = sis.Database(args.db)
+    if args.perfil_consultas is not None:
+        db.ativar_perfil(args.perfil_consultas)
+    servidor = ServidorOficina(db, args.host, args.porta, args.leitores, args.token)
+    print(f"Servidor da oficina em http://{args.host}:{args.porta} (banco: {sis.caminho_banco(args.db)})")
+    agendador = None
+    if args.backup:
+        # O backup usa a própria conexão e não bloqueia os terminais
+        agendador = sis.AgendadorBackup(args.backup, args.db, args.backup_intervalo, ao_concluir=print)
+        agendador.start()
+    try:
+        asyncio.run(servidor.executar())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if agendador:
+            agendador.parar()
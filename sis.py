@@ -1,18 +1,33 @@
+import os
 import sys
+import re
 import sqlite3
+import csv
+import json
+import time
+# Início da importação, para o perfil de inicialização (--perfil-inicializacao)
+_inicio_importacao = time.perf_counter()
+import argparse
+import threading
+import queue
+from urllib.parse import urlsplit
+from collections import namedtuple, deque
+from functools import wraps
+from enum import Enum
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                              QPushButton, QTableWidget, QTableWidgetItem, QLineEdit, 
                              QLabel, QComboBox, QMessageBox, QFormLayout, QDialog,
-                             QGroupBox, QStatusBar, QHeaderView, QSizePolicy)
-from PyQt5.QtCore import Qt, QRegExp
-from PyQt5.QtGui import QIntValidator, QRegExpValidator
-from datetime import datetime
+                             QGroupBox, QStatusBar, QHeaderView, QSizePolicy, QTableView,
+                             QFileDialog, QCompleter, QTabWidget)
+from PyQt5.QtCore import (Qt, QRegExp, QAbstractTableModel, QModelIndex, QTimer, QObject, QThread,
+                          QStringListModel, pyqtSignal, pyqtSlot)
+from PyQt5.QtGui import QIntValidator, QRegExpValidator, QPdfWriter, QPainter, QPagedPaintDevice
+from datetime import datetime, timedelta
+TEMPO_IMPORTACAO = time.perf_counter() - _inicio_importacao
 
-# Conexão com o banco de dados SQLite
-def init_db():
-    conn = sqlite3.connect('oficina_motos.db')
-    cursor = conn.cursor()
-    
+# Migrações do esquema: cada função leva o banco da versão anterior para a sua
+# versão (posição na lista MIGRACOES), registrada em PRAGMA user_version
+def _migracao_tabelas(cursor):
     # Criação das tabelas
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS clientes (
@@ -98,23 +113,1328 @@ def init_db():
             status TEXT DEFAULT 'Ativo'
         )
     ''')
-    
+
+def _migracao_indices(cursor):
+    # Índices das chaves estrangeiras e da ordenação do relatório de vendas
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_motos_cliente ON motos (cliente_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_os_cliente ON ordens_servico (cliente_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_os_moto ON ordens_servico (moto_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_os_pecas_os ON os_pecas (os_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_os_pecas_produto ON os_pecas (produto_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_vendas_cliente ON vendas (cliente_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_vendas_data ON vendas (data)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_venda_itens_venda ON venda_itens (venda_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_venda_itens_produto ON venda_itens (produto_id)")
+
+def _migracao_totais_vendas(cursor):
+    # Preço unitário gravado no momento da venda e total da venda armazenado
+    cursor.execute("ALTER TABLE venda_itens ADD COLUMN preco_unitario REAL")
+    cursor.execute("ALTER TABLE vendas ADD COLUMN total REAL")
+    # Vendas antigas recebem o preço atual do produto, que era o usado no relatório
+    cursor.execute("""
+        UPDATE venda_itens
+        SET preco_unitario = (SELECT preco_venda FROM produtos WHERE id = venda_itens.produto_id)
+    """)
+    cursor.execute("""
+        UPDATE vendas
+        SET total = COALESCE((SELECT SUM(preco_unitario * quantidade)
+                              FROM venda_itens WHERE venda_id = vendas.id), 0)
+    """)
+
+def _migracao_colunas_motos(cursor):
+    # Bancos criados por versões antigas não têm as colunas ano e cor em motos
+    cursor.execute("PRAGMA table_info(motos)")
+    colunas = {linha[1] for linha in cursor.fetchall()}
+    for coluna in ("ano", "cor"):
+        if coluna not in colunas:
+            cursor.execute(f"ALTER TABLE motos ADD COLUMN {coluna} TEXT")
+
+# Índice de busca textual (FTS5). O rowid de cada documento é id * 4 + código
+# do tipo, para que os gatilhos localizem o documento sem varrer o índice.
+# Cada tipo informa as colunas indexadas (só a alteração delas reindexa o
+# documento) e a expressão do conteúdo, onde {r} é o prefixo da linha
+TIPOS_BUSCA = {
+    "cliente": (0, "clientes", "nome, cpf, telefone",
+                "{r}nome || ' ' || COALESCE({r}cpf, '') || ' ' || REPLACE(REPLACE(COALESCE({r}cpf, ''), '.', ''), '-', '')"
+                " || ' ' || COALESCE({r}telefone, '')"),
+    "moto": (1, "motos", "placa, marca, modelo", "COALESCE({r}placa, '') || ' ' || COALESCE({r}marca, '') || ' ' || COALESCE({r}modelo, '')"),
+    "produto": (2, "produtos", "codigo, descricao", "COALESCE({r}codigo, '') || ' ' || COALESCE({r}descricao, '')"),
+    "os": (3, "ordens_servico", "descricao", "COALESCE({r}descricao, '')"),
+}
+
+def _criar_gatilhos_busca(cursor, tipo):
+    codigo, tabela, colunas, conteudo = TIPOS_BUSCA[tipo]
+    novo = conteudo.format(r="new.")
+    cursor.execute(f"""
+        CREATE TRIGGER busca_{tabela}_ai AFTER INSERT ON {tabela} BEGIN
+            INSERT INTO busca (rowid, tipo, conteudo) VALUES (new.id * 4 + {codigo}, '{tipo}', {novo});
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER busca_{tabela}_au AFTER UPDATE OF {colunas} ON {tabela} BEGIN
+            DELETE FROM busca WHERE rowid = old.id * 4 + {codigo};
+            INSERT INTO busca (rowid, tipo, conteudo) VALUES (new.id * 4 + {codigo}, '{tipo}', {novo});
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER busca_{tabela}_ad AFTER DELETE ON {tabela} BEGIN
+            DELETE FROM busca WHERE rowid = old.id * 4 + {codigo};
+        END
+    """)
+
+def _migracao_busca(cursor):
+    cursor.execute("CREATE VIRTUAL TABLE busca USING fts5(tipo, conteudo, tokenize = 'unicode61 remove_diacritics 2')")
+    for tipo, (codigo, tabela, colunas, conteudo) in TIPOS_BUSCA.items():
+        _criar_gatilhos_busca(cursor, tipo)
+        cursor.execute(f"INSERT INTO busca (rowid, tipo, conteudo) SELECT id * 4 + {codigo}, '{tipo}', {conteudo.format(r='')} FROM {tabela}")
+
+def _migracao_indice_cpf(cursor):
+    # Localização de clientes pelo CPF na importação de motos
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_clientes_cpf ON clientes (cpf)")
+
+# Registro de alterações: cada inclusão, alteração ou exclusão nas tabelas
+# exibidas pela janela principal grava (tabela, id, operação) em "alteracoes",
+# de onde as visões abertas (neste ou em outro terminal) leem só o que mudou
+TABELAS_ALTERACOES = ["clientes", "motos", "produtos", "funcionarios", "ordens_servico", "vendas"]
+# Por quanto tempo as alterações ficam registradas (limpeza na abertura do banco)
+RETENCAO_ALTERACOES = 24 * 3600
+
+def _criar_gatilhos_alteracoes(cursor, tabela, uid=True):
+    # uid: grava também o identificador global da linha (desde a sincronização entre filiais)
+    for sufixo, evento, linha, operacao in (("ai", "INSERT", "new", "I"), ("au", "UPDATE", "new", "U"),
+                                            ("ad", "DELETE", "old", "D")):
+        colunas, valores = ("tabela, registro, operacao, uid", f"'{tabela}', {linha}.id, '{operacao}', {linha}.uid") if uid \
+            else ("tabela, registro, operacao", f"'{tabela}', {linha}.id, '{operacao}'")
+        cursor.execute(f"""
+            CREATE TRIGGER alteracoes_{tabela}_{sufixo} AFTER {evento} ON {tabela} BEGIN
+                INSERT INTO alteracoes ({colunas}) VALUES ({valores});
+            END
+        """)
+
+def _migracao_alteracoes(cursor):
+    cursor.execute('''
+        CREATE TABLE alteracoes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            tabela TEXT NOT NULL,
+            registro INTEGER NOT NULL,
+            operacao TEXT NOT NULL,
+            momento INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
+        )
+    ''')
+    for tabela in TABELAS_ALTERACOES:
+        _criar_gatilhos_alteracoes(cursor, tabela, uid=False)
+
+# Resumos diário, mensal e mensal por produto de vendas, peças de OS e mão de
+# obra, mantidos por gatilhos a cada gravação (os painéis leem só os resumos)
+COLUNAS_RESUMO = ["vendas", "receita_vendas", "custo_vendas", "itens_vendidos", "ordens", "os_concluidas",
+                  "mao_obra", "receita_pecas_os", "custo_pecas_os", "pecas_os"]
+COLUNAS_RESUMO_PRODUTOS = ["quantidade", "receita", "custo"]
+
+# Origens dos resumos: tabela, junções, data da linha, valores somados ao
+# período e valores somados ao produto. {r} é o prefixo da linha de origem
+# ("new." no gatilho de inclusão, o alias da tabela na reconstrução) e
+# {vendas}/{ordens_servico} as tabelas lidas nas junções
+FONTES_RESUMO = [
+    ("vendas", "", "{r}data", {"vendas": "1"}, None),
+    ("venda_itens", "JOIN {vendas} v ON v.id = {r}venda_id LEFT JOIN produtos p ON p.id = {r}produto_id", "v.data",
+     {"receita_vendas": "{r}quantidade * {r}preco_unitario",
+      "custo_vendas": "{r}quantidade * COALESCE(p.preco_custo, 0)",
+      "itens_vendidos": "{r}quantidade"},
+     {"quantidade": "{r}quantidade", "receita": "{r}quantidade * {r}preco_unitario",
+      "custo": "{r}quantidade * COALESCE(p.preco_custo, 0)"}),
+    ("ordens_servico", "", "{r}data",
+     {"ordens": "1", "os_concluidas": "{r}status = 'Concluída'", "mao_obra": "COALESCE({r}mao_obra, 0)"}, None),
+    ("os_pecas", "JOIN {ordens_servico} o ON o.id = {r}os_id LEFT JOIN produtos p ON p.id = {r}produto_id", "o.data",
+     {"receita_pecas_os": "{r}quantidade * COALESCE(p.preco_venda, 0)",
+      "custo_pecas_os": "{r}quantidade * COALESCE(p.preco_custo, 0)",
+      "pecas_os": "{r}quantidade"},
+     {"quantidade": "{r}quantidade", "receita": "{r}quantidade * COALESCE(p.preco_venda, 0)",
+      "custo": "{r}quantidade * COALESCE(p.preco_custo, 0)"}),
+]
+
+def _sql_resumo(destino, chaves, valores, origem, agrupar=False):
+    # INSERT ... SELECT que soma os valores ao resumo (upsert pela chave)
+    colunas = list(chaves) + list(valores)
+    expressoes = list(chaves.values()) + [f"SUM({v})" if agrupar else v for v in valores.values()]
+    soma = ", ".join(f"{c} = {c} + excluded.{c}" for c in valores)
+    grupo = " GROUP BY " + ", ".join(str(i + 1) for i in range(len(chaves))) if agrupar else ""
+    return (f"INSERT INTO {destino} ({', '.join(colunas)}) SELECT {', '.join(expressoes)} {origem} WHERE true{grupo} "
+            f"ON CONFLICT ({', '.join(chaves)}) DO UPDATE SET {soma}")
+
+# Dia (AAAA-MM-DD) e mês (AAAA-MM) locais de uma data {d}. As datas de vendas e
+# OS são segundos desde 1970; até a migração 12 eram texto AAAA-MM-DD HH:MM:SS
+DIA_MES = ("date({d}, 'unixepoch', 'localtime')", "strftime('%Y-%m', {d}, 'unixepoch', 'localtime')")
+DIA_MES_TEXTO = ("substr({d}, 1, 10)", "substr({d}, 1, 7)")
+
+def _sql_resumos_fonte(juncoes, data, valores, valores_produto, prefixo, origem, agrupar=False, dia_mes=DIA_MES):
+    valores = {c: v.format(r=prefixo) for c, v in valores.items()}
+    dia, mes = (expressao.format(d=data.format(r=prefixo)) for expressao in dia_mes)
+    comandos = [_sql_resumo("resumo_diario", {"dia": dia}, valores, origem, agrupar)]
+    if not agrupar:
+        # Na reconstrução o resumo mensal é somado a partir do diário
+        comandos.append(_sql_resumo("resumo_mensal", {"mes": mes}, valores, origem))
+    if valores_produto:
+        comandos.append(_sql_resumo("resumo_produtos", {"mes": mes, "produto_id": f"{prefixo}produto_id"},
+                                    {c: v.format(r=prefixo) for c, v in valores_produto.items()}, origem, agrupar))
+    return comandos
+
+def _reconstruir_resumos(cursor, dia_mes=DIA_MES, origens=None):
+    # origens: tabela -> expressão lida no lugar dela (com as linhas arquivadas)
+    origens = dict({tabela: tabela for tabela in TABELAS_ARQUIVO}, **(origens or {}))
+    for tabela in ("resumo_diario", "resumo_mensal", "resumo_produtos"):
+        cursor.execute(f"DELETE FROM {tabela}")
+    for tabela, juncoes, data, valores, valores_produto in FONTES_RESUMO:
+        origem = f"FROM {origens[tabela]} x " + juncoes.format(r="x.", **origens)
+        for comando in _sql_resumos_fonte(juncoes, data, valores, valores_produto, "x.", origem, True, dia_mes):
+            cursor.execute(comando)
+    cursor.execute(_sql_resumo("resumo_mensal", {"mes": "substr(dia, 1, 7)"}, {c: c for c in COLUNAS_RESUMO},
+                               "FROM resumo_diario", agrupar=True))
+
+def _criar_gatilhos_resumos(cursor, dia_mes=DIA_MES):
+    for tabela, juncoes, data, valores, valores_produto in FONTES_RESUMO:
+        origem = "FROM (SELECT 1) " + juncoes.format(r="new.", vendas="vendas", ordens_servico="ordens_servico") if juncoes else ""
+        comandos = _sql_resumos_fonte(juncoes, data, valores, valores_produto, "new.", origem, dia_mes=dia_mes)
+        cursor.execute(f"CREATE TRIGGER resumos_{tabela}_ai AFTER INSERT ON {tabela} BEGIN {'; '.join(comandos)}; END")
+    # Conclusão da OS: a diferença de status e de mão de obra entra no dia da OS
+    diferenca = {"os_concluidas": "(new.status = 'Concluída') - (old.status = 'Concluída')",
+                 "mao_obra": "COALESCE(new.mao_obra, 0) - COALESCE(old.mao_obra, 0)"}
+    comandos = _sql_resumos_fonte("", "{r}data", diferenca, None, "new.", "", dia_mes=dia_mes)
+    cursor.execute(f"CREATE TRIGGER resumos_ordens_servico_au AFTER UPDATE OF status, mao_obra ON ordens_servico BEGIN {'; '.join(comandos)}; END")
+
+def _migracao_resumos(cursor):
+    colunas = ", ".join(f"{c} {'INTEGER' if c in ('vendas', 'itens_vendidos', 'ordens', 'os_concluidas', 'pecas_os') else 'REAL'} NOT NULL DEFAULT 0"
+                        for c in COLUNAS_RESUMO)
+    cursor.execute(f"CREATE TABLE resumo_diario (dia TEXT PRIMARY KEY, {colunas}) WITHOUT ROWID")
+    cursor.execute(f"CREATE TABLE resumo_mensal (mes TEXT PRIMARY KEY, {colunas}) WITHOUT ROWID")
+    cursor.execute('''
+        CREATE TABLE resumo_produtos (
+            mes TEXT NOT NULL,
+            produto_id INTEGER NOT NULL,
+            quantidade INTEGER NOT NULL DEFAULT 0,
+            receita REAL NOT NULL DEFAULT 0,
+            custo REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (mes, produto_id)
+        ) WITHOUT ROWID
+    ''')
+    _criar_gatilhos_resumos(cursor, DIA_MES_TEXTO)
+    _reconstruir_resumos(cursor, DIA_MES_TEXTO)
+
+# Movimentação de estoque: cada entrada ou saída é gravada (só inclusão) em
+# movimentos_estoque e, de tempos em tempos, o saldo dos produtos que se moveram
+# é fotografado em saldos_estoque. O saldo em uma data sai do saldo mais próximo
+# somado aos movimentos entre as duas datas; o saldo atual continua em produtos
+PERIODO_SALDOS_DIAS = 7
+
+def _registrar_saldos(cursor, data):
+    # Saldo atual dos produtos movimentados desde o último registro. O campo
+    # ultimo_movimento marca o maior movimento já incluído no saldo
+    cursor.execute("SELECT ultimo_movimento FROM saldos_estoque ORDER BY data DESC LIMIT 1")
+    linha = cursor.fetchone()
+    anterior = linha[0] if linha else 0
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM movimentos_estoque")
+    ultimo = cursor.fetchone()[0]
+    cursor.execute("""
+        INSERT OR REPLACE INTO saldos_estoque (produto_id, data, quantidade, ultimo_movimento)
+        SELECT p.id, ?, p.quantidade, ?
+        FROM produtos p
+        WHERE p.id IN (SELECT produto_id FROM movimentos_estoque WHERE id > ?)
+    """, (data, ultimo, anterior))
+
+def _migracao_movimentos_estoque(cursor):
+    cursor.execute('''
+        CREATE TABLE movimentos_estoque (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            produto_id INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            quantidade INTEGER NOT NULL,
+            tipo TEXT NOT NULL,
+            referencia INTEGER,
+            FOREIGN KEY (produto_id) REFERENCES produtos(id)
+        )
+    ''')
+    cursor.execute("CREATE INDEX idx_movimentos_produto_data ON movimentos_estoque (produto_id, data)")
+    cursor.execute('''
+        CREATE TABLE saldos_estoque (
+            produto_id INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            quantidade INTEGER NOT NULL,
+            ultimo_movimento INTEGER NOT NULL,
+            PRIMARY KEY (produto_id, data)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute("CREATE INDEX idx_saldos_data ON saldos_estoque (data)")
+    # O histórico começa com o saldo atual de todos os produtos
+    cursor.execute("INSERT INTO saldos_estoque SELECT id, ?, COALESCE(quantidade, 0), 0 FROM produtos",
+                   (datetime.now().strftime("%Y-%m-%d %H:%M:%S"),))
+
+# Alertas de estoque baixo: os gatilhos mantêm em alertas_estoque os produtos
+# com quantidade menor ou igual ao estoque mínimo, e desde quando estão assim
+ESTOQUE_BAIXO_NOVO = "IFNULL(new.quantidade <= new.estoque_minimo, 0)"
+ESTOQUE_BAIXO_ANTIGO = "IFNULL(old.quantidade <= old.estoque_minimo, 0)"
+
+def _migracao_alertas_estoque(cursor):
+    cursor.execute("CREATE TABLE alertas_estoque (produto_id INTEGER PRIMARY KEY, desde TEXT NOT NULL)")
+    cursor.execute(f"""
+        CREATE TRIGGER alertas_produtos_ai AFTER INSERT ON produtos WHEN {ESTOQUE_BAIXO_NOVO} BEGIN
+            INSERT OR IGNORE INTO alertas_estoque (produto_id, desde) VALUES (new.id, datetime('now', 'localtime'));
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER alertas_produtos_au_baixo AFTER UPDATE OF quantidade, estoque_minimo ON produtos
+        WHEN {ESTOQUE_BAIXO_NOVO} AND NOT {ESTOQUE_BAIXO_ANTIGO} BEGIN
+            INSERT OR IGNORE INTO alertas_estoque (produto_id, desde) VALUES (new.id, datetime('now', 'localtime'));
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER alertas_produtos_au_normal AFTER UPDATE OF quantidade, estoque_minimo ON produtos
+        WHEN {ESTOQUE_BAIXO_ANTIGO} AND NOT {ESTOQUE_BAIXO_NOVO} BEGIN
+            DELETE FROM alertas_estoque WHERE produto_id = new.id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER alertas_produtos_ad AFTER DELETE ON produtos BEGIN
+            DELETE FROM alertas_estoque WHERE produto_id = old.id;
+        END
+    """)
+    cursor.execute("INSERT INTO alertas_estoque SELECT id, datetime('now', 'localtime') FROM produtos WHERE quantidade <= estoque_minimo")
+
+# Totais da OS armazenados: peças (pelo preço gravado na inclusão da peça),
+# mão de obra e total geral. As peças são somadas pelos gatilhos de os_pecas e
+# a mão de obra entra no total em concluir_os
+def _criar_gatilhos_totais_os(cursor):
+    cursor.execute("""
+        CREATE TRIGGER totais_os_pecas_ai AFTER INSERT ON os_pecas BEGIN
+            UPDATE ordens_servico SET total_pecas = ROUND(total_pecas + new.quantidade * COALESCE(new.preco_unitario, 0), 2),
+                                      total = ROUND(total + new.quantidade * COALESCE(new.preco_unitario, 0), 2)
+            WHERE id = new.os_id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER totais_os_pecas_au AFTER UPDATE OF os_id, quantidade, preco_unitario ON os_pecas BEGIN
+            UPDATE ordens_servico SET total_pecas = ROUND(total_pecas - old.quantidade * COALESCE(old.preco_unitario, 0), 2),
+                                      total = ROUND(total - old.quantidade * COALESCE(old.preco_unitario, 0), 2)
+            WHERE id = old.os_id;
+            UPDATE ordens_servico SET total_pecas = ROUND(total_pecas + new.quantidade * COALESCE(new.preco_unitario, 0), 2),
+                                      total = ROUND(total + new.quantidade * COALESCE(new.preco_unitario, 0), 2)
+            WHERE id = new.os_id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER totais_os_pecas_ad AFTER DELETE ON os_pecas BEGIN
+            UPDATE ordens_servico SET total_pecas = ROUND(total_pecas - old.quantidade * COALESCE(old.preco_unitario, 0), 2),
+                                      total = ROUND(total - old.quantidade * COALESCE(old.preco_unitario, 0), 2)
+            WHERE id = old.os_id;
+        END
+    """)
+
+def _migracao_totais_os(cursor):
+    cursor.execute("ALTER TABLE os_pecas ADD COLUMN preco_unitario REAL")
+    cursor.execute("ALTER TABLE ordens_servico ADD COLUMN total_pecas REAL NOT NULL DEFAULT 0")
+    cursor.execute("ALTER TABLE ordens_servico ADD COLUMN total REAL NOT NULL DEFAULT 0")
+    # Peças antigas recebem o preço atual do produto, que era o usado em calcular_total_os
+    cursor.execute("""
+        UPDATE os_pecas
+        SET preco_unitario = COALESCE((SELECT preco_venda FROM produtos WHERE id = os_pecas.produto_id), 0)
+    """)
+    cursor.execute("""
+        UPDATE ordens_servico
+        SET total_pecas = ROUND(COALESCE((SELECT SUM(preco_unitario * quantidade) FROM os_pecas
+                                          WHERE os_id = ordens_servico.id), 0), 2)
+    """)
+    cursor.execute("UPDATE ordens_servico SET total = ROUND(total_pecas + COALESCE(mao_obra, 0), 2)")
+    _criar_gatilhos_totais_os(cursor)
+
+# Datas de vendas e OS em segundos desde 1970 (INTEGER, indexadas): os filtros
+# por período e a paginação usam faixas do índice em vez de comparar texto.
+# O SQLite não altera o tipo de uma coluna, então as duas tabelas são refeitas
+TABELAS_DATA_INTEIRA = {
+    "ordens_servico": '''
+        CREATE TABLE ordens_servico (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cliente_id INTEGER,
+            moto_id INTEGER,
+            descricao TEXT,
+            status TEXT,
+            mao_obra REAL,
+            data INTEGER,
+            total_pecas REAL NOT NULL DEFAULT 0,
+            total REAL NOT NULL DEFAULT 0,
+            FOREIGN KEY (cliente_id) REFERENCES clientes(id),
+            FOREIGN KEY (moto_id) REFERENCES motos(id)
+        )
+    ''',
+    "vendas": '''
+        CREATE TABLE vendas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cliente_id INTEGER,
+            data INTEGER,
+            total REAL,
+            FOREIGN KEY (cliente_id) REFERENCES clientes(id)
+        )
+    ''',
+}
+
+def _migracao_datas_inteiras(cursor):
+    # Os gatilhos das tabelas refeitas e das que as referenciam são recriados no fim
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' "
+                   "AND tbl_name IN ('ordens_servico', 'vendas', 'os_pecas', 'venda_itens')")
+    for (gatilho,) in cursor.fetchall():
+        cursor.execute(f"DROP TRIGGER {gatilho}")
+    for tabela, criacao in TABELAS_DATA_INTEIRA.items():
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (tabela,))
+        sequencia = cursor.fetchone()
+        cursor.execute(criacao.replace(f"CREATE TABLE {tabela}", f"CREATE TABLE {tabela}_nova"))
+        cursor.execute(f"PRAGMA table_info({tabela}_nova)")
+        colunas = [linha[1] for linha in cursor.fetchall()]
+        # O texto gravado é a hora local; o modificador 'utc' converte para o instante
+        valores = ["CAST(strftime('%s', data, 'utc') AS INTEGER)" if coluna == "data" else coluna for coluna in colunas]
+        cursor.execute(f"INSERT INTO {tabela}_nova ({', '.join(colunas)}) SELECT {', '.join(valores)} FROM {tabela}")
+        cursor.execute(f"DROP TABLE {tabela}")
+        cursor.execute(f"ALTER TABLE {tabela}_nova RENAME TO {tabela}")
+        if sequencia:
+            # Mantém a numeração de ids já usados (e excluídos)
+            cursor.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", (sequencia[0], tabela))
+    cursor.execute("CREATE INDEX idx_os_cliente ON ordens_servico (cliente_id)")
+    cursor.execute("CREATE INDEX idx_os_moto ON ordens_servico (moto_id)")
+    cursor.execute("CREATE INDEX idx_os_data ON ordens_servico (data)")
+    cursor.execute("CREATE INDEX idx_vendas_cliente ON vendas (cliente_id)")
+    cursor.execute("CREATE INDEX idx_vendas_data ON vendas (data)")
+    _criar_gatilhos_busca(cursor, "os")
+    for tabela in TABELAS_DATA_INTEIRA:
+        _criar_gatilhos_alteracoes(cursor, tabela, uid=False)
+    _criar_gatilhos_resumos(cursor)
+    _criar_gatilhos_totais_os(cursor)
+
+# Sincronização entre filiais: cada banco é uma filial com um identificador
+# próprio e cada linha das tabelas sincronizadas tem um identificador global
+# "filial:id". As linhas criadas aqui usam o id local (uid fica NULL); as
+# recebidas de outra filial guardam o uid de origem. Todas as alterações das
+# oito tabelas entram no registro de alterações, que passa a guardar o uid e,
+# para as recebidas, a versão de origem (momento, filial, seq)
+TABELAS_SINCRONIZACAO = ["clientes", "funcionarios", "produtos", "motos", "ordens_servico", "vendas",
+                         "os_pecas", "venda_itens"]
+
+def _migracao_sincronizacao(cursor):
+    for tabela in TABELAS_SINCRONIZACAO:
+        cursor.execute(f"ALTER TABLE {tabela} ADD COLUMN uid TEXT")
+        cursor.execute(f"CREATE UNIQUE INDEX idx_{tabela}_uid ON {tabela} (uid) WHERE uid IS NOT NULL")
+    for coluna in ("uid TEXT", "filial TEXT", "seq_origem INTEGER"):
+        cursor.execute(f"ALTER TABLE alteracoes ADD COLUMN {coluna}")
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name GLOB 'alteracoes_*'")
+    for (gatilho,) in cursor.fetchall():
+        cursor.execute(f"DROP TRIGGER {gatilho}")
+    for tabela in TABELAS_SINCRONIZACAO:
+        _criar_gatilhos_alteracoes(cursor, tabela)
+    # Identificador desta filial e até onde o registro já foi consolidado em versoes.
+    # O registro anterior (sem uid, com as exclusões de arquivamentos) fica de
+    # fora: a primeira sincronização com cada filial envia as linhas atuais
+    cursor.execute("CREATE TABLE sincronizacao (filial TEXT NOT NULL, dobrado_ate INTEGER NOT NULL DEFAULT 0)")
+    cursor.execute("INSERT INTO sincronizacao (filial, dobrado_ate) "
+                   "SELECT lower(hex(randomblob(8))), COALESCE(MAX(seq), 0) FROM alteracoes")
+    # Versão mais recente de cada linha (também das excluídas), lida nos conflitos
+    cursor.execute("""
+        CREATE TABLE versoes (
+            tabela TEXT NOT NULL,
+            uid TEXT NOT NULL,
+            registro INTEGER,
+            operacao TEXT NOT NULL,
+            momento INTEGER NOT NULL,
+            filial TEXT,
+            seq INTEGER NOT NULL,
+            alteracao INTEGER NOT NULL,
+            PRIMARY KEY (tabela, uid)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX idx_versoes_alteracao ON versoes (tabela, alteracao)")
+    # Outras filiais: última alteração delas aplicada aqui (recebido) e última
+    # alteração daqui que elas confirmaram ter aplicado (confirmado)
+    cursor.execute("""
+        CREATE TABLE pares_sincronizacao (
+            filial TEXT PRIMARY KEY,
+            recebido INTEGER NOT NULL DEFAULT 0,
+            confirmado INTEGER,
+            momento INTEGER
+        ) WITHOUT ROWID
+    """)
+
+def _dobrar_versoes(cursor):
+    # Consolida em versoes a última alteração de cada linha registrada desde a
+    # consolidação anterior ('T' são efeitos de gatilhos das alterações recebidas).
+    # Uma alteração local nunca fica com versão menor que a que ela sobrescreveu
+    cursor.execute("""
+        INSERT INTO versoes (tabela, uid, registro, operacao, momento, filial, seq, alteracao)
+        SELECT a.tabela, COALESCE(a.uid, s.filial || ':' || a.registro), a.registro, a.operacao, a.momento,
+               a.filial, COALESCE(a.seq_origem, a.seq), a.seq
+        FROM alteracoes a, sincronizacao s
+        WHERE a.seq IN (SELECT MAX(seq) FROM alteracoes WHERE seq > s.dobrado_ate AND operacao <> 'T'
+                        GROUP BY tabela, COALESCE(uid, registro))
+        ON CONFLICT (tabela, uid) DO UPDATE SET
+            registro = excluded.registro, operacao = excluded.operacao,
+            momento = CASE WHEN excluded.filial IS NULL AND excluded.momento <= versoes.momento
+                           THEN versoes.momento + 1 ELSE excluded.momento END,
+            filial = excluded.filial, seq = excluded.seq, alteracao = excluded.alteracao
+    """)
+    cursor.execute("UPDATE sincronizacao SET dobrado_ate = (SELECT COALESCE(MAX(seq), dobrado_ate) FROM alteracoes)")
+
+MIGRACOES = [
+    _migracao_tabelas,
+    _migracao_indices,
+    _migracao_totais_vendas,
+    _migracao_colunas_motos,
+    _migracao_busca,
+    _migracao_indice_cpf,
+    _migracao_alteracoes,
+    _migracao_resumos,
+    _migracao_movimentos_estoque,
+    _migracao_alertas_estoque,
+    _migracao_totais_os,
+    _migracao_datas_inteiras,
+    _migracao_sincronizacao,
+]
+
+def migrar(conn):
+    versao = conn.execute("PRAGMA user_version").fetchone()[0]
+    cursor = conn.cursor()
+    for numero in range(versao + 1, len(MIGRACOES) + 1):
+        # Cada migração roda em uma transação própria junto com a nova versão
+        try:
+            cursor.execute("BEGIN")
+            MIGRACOES[numero - 1](cursor)
+            cursor.execute(f"PRAGMA user_version = {numero}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return versao
+
+# Arquivo do banco: argumento --db, variável OFICINA_DB ou o padrão no diretório atual
+CAMINHO_BANCO_PADRAO = 'oficina_motos.db'
+BUSY_TIMEOUT_MS = 5000
+
+def caminho_banco(caminho=None):
+    return caminho or os.environ.get("OFICINA_DB") or CAMINHO_BANCO_PADRAO
+
+# Gerenciador de conexões: uma conexão (e um cursor) por thread, em modo WAL,
+# para que leitores de outras threads ou terminais não bloqueiem quem grava
+class GerenciadorConexoes:
+    def __init__(self, caminho=None, busy_timeout=BUSY_TIMEOUT_MS):
+        self.caminho = caminho_banco(caminho)
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._conexoes = []
+        self._lock = threading.Lock()
+        # Função de set_trace_callback das conexões (perfil de consultas)
+        self.rastreamento = None
+
+    def rastrear(self, funcao):
+        # Aplica a função às conexões já abertas e às próximas
+        with self._lock:
+            self.rastreamento = funcao
+            for conn in self._conexoes:
+                conn.set_trace_callback(funcao)
+
+    def conexao(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Cada conexão só é usada pela thread que a abriu; check_same_thread
+            # desligado permite apenas fechá-las todas no encerramento
+            conn = sqlite3.connect(self.caminho, timeout=self.busy_timeout / 1000, check_same_thread=False,
+                                   cached_statements=CACHE_COMANDOS)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute(f"PRAGMA busy_timeout = {self.busy_timeout}")
+            self._local.arquivo = _anexar_arquivo(conn, self.caminho)
+            if self.rastreamento:
+                conn.set_trace_callback(self.rastreamento)
+            self._local.conn = conn
+            self._local.cursor = conn.cursor()
+            with self._lock:
+                self._conexoes.append(conn)
+        return conn
+
+    def cursor(self):
+        self.conexao()
+        return self._local.cursor
+
+    def arquivo_anexado(self):
+        self.conexao()
+        return self._local.arquivo
+
+    def fechar_thread(self):
+        # Fecha a conexão da thread atual (threads de trabalho que terminam)
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            with self._lock:
+                self._conexoes.remove(conn)
+            conn.close()
+            self._local.conn = self._local.cursor = None
+
+    def fechar(self):
+        with self._lock:
+            conexoes, self._conexoes = self._conexoes, []
+        for conn in conexoes:
+            conn.close()
+        self._local = threading.local()
+
+# Perfil de consultas (opcional): tempo de cada método público do Database e
+# de cada comando SQL, visto pelo set_trace_callback das conexões. O tempo de um
+# comando vai do seu início até o início do próximo comando da mesma thread ou
+# o fim do método que o executou; comandos fora dos métodos não são medidos
+LIMITE_CONSULTA_LENTA_MS = 100
+# Tempos guardados por método/comando para o p95 e consultas lentas guardadas
+AMOSTRAS_PERFIL = 1000
+MAXIMO_CONSULTAS_LENTAS = 200
+
+# Valores literais do SQL expandido pelo SQLite (os parâmetros do comando)
+_LITERAIS_SQL = re.compile(r"'(?:[^']|'')*'|(?<![\w.])-?\d+(?:\.\d+)?(?:e[+-]?\d+)?(?![\w.])", re.IGNORECASE)
+
+class EstatisticaTempo:
+    def __init__(self):
+        self.chamadas = 0
+        self.total = 0.0
+        self.maximo = 0.0
+        self.amostras = deque(maxlen=AMOSTRAS_PERFIL)
+
+    def registrar(self, segundos):
+        self.chamadas += 1
+        self.total += segundos
+        self.maximo = max(self.maximo, segundos)
+        self.amostras.append(segundos)
+
+    def resumo(self):
+        amostras = sorted(self.amostras)
+        return {
+            "chamadas": self.chamadas,
+            "total_ms": round(self.total * 1000, 3),
+            "media_ms": round(self.total / self.chamadas * 1000, 3),
+            "p95_ms": round(amostras[int((len(amostras) - 1) * 0.95)] * 1000, 3),
+            "max_ms": round(self.maximo * 1000, 3),
+        }
+
+class PerfilBanco:
+    def __init__(self, limite_lento_ms=LIMITE_CONSULTA_LENTA_MS):
+        self.limite_lento = limite_lento_ms / 1000
+        self.metodos = {}
+        self.comandos = {}
+        self.lentas = deque(maxlen=MAXIMO_CONSULTAS_LENTAS)
+        self._lock = threading.Lock()
+        # Por thread: métodos em execução e comando em andamento (sql, início)
+        self._local = threading.local()
+
+    def _pilha(self):
+        pilha = getattr(self._local, "pilha", None)
+        if pilha is None:
+            pilha = self._local.pilha = []
+            self._local.comando = None
+        return pilha
+
+    def medir(self, nome, metodo):
+        @wraps(metodo)
+        def medido(*args, **kwargs):
+            pilha = self._pilha()
+            pilha.append(nome)
+            inicio = time.perf_counter()
+            try:
+                return metodo(*args, **kwargs)
+            finally:
+                fim = time.perf_counter()
+                self._encerrar_comando(fim)
+                pilha.pop()
+                with self._lock:
+                    self.metodos.setdefault(nome, EstatisticaTempo()).registrar(fim - inicio)
+        return medido
+
+    def rastrear(self, sql):
+        # Chamado pelo SQLite no início de cada comando. Os gatilhos repetem o
+        # comando que os disparou e os comandos internos (do FTS5, por exemplo)
+        # começam com "--": ambos contam como parte do comando em andamento
+        if not self._pilha() or sql.startswith("--"):
+            return
+        agora = time.perf_counter()
+        atual = self._local.comando
+        if atual and atual[0] == sql:
+            return
+        self._encerrar_comando(agora)
+        self._local.comando = (sql, agora)
+
+    def _encerrar_comando(self, fim):
+        atual = self._local.comando
+        if atual is None:
+            return
+        self._local.comando = None
+        sql, inicio = atual
+        duracao = fim - inicio
+        chave = " ".join(_LITERAIS_SQL.sub("?", sql).split())
+        with self._lock:
+            self.comandos.setdefault(chave, EstatisticaTempo()).registrar(duracao)
+            if duracao >= self.limite_lento:
+                self.lentas.append({
+                    "momento": datetime.now().isoformat(timespec="seconds"),
+                    "metodo": self._local.pilha[0],
+                    "ms": round(duracao * 1000, 3),
+                    "sql": chave,
+                    "parametros": _LITERAIS_SQL.findall(sql),
+                    "sql_completo": sql,
+                    "plano": None,
+                })
+
+    def resumo(self, caminho):
+        with self._lock:
+            metodos = {nome: e.resumo() for nome, e in self.metodos.items()}
+            comandos = {sql: e.resumo() for sql, e in self.comandos.items()}
+            lentas = list(self.lentas)
+        # O plano das consultas lentas é obtido só na leitura do perfil, em uma
+        # conexão à parte (sem rastreamento), e guardado para as próximas
+        pendentes = [lenta for lenta in lentas if lenta["plano"] is None]
+        if pendentes:
+            conn = sqlite3.connect(caminho)
+            _anexar_arquivo(conn, caminho)
+            for lenta in pendentes:
+                try:
+                    lenta["plano"] = [linha[3] for linha in conn.execute("EXPLAIN QUERY PLAN " + lenta["sql_completo"])]
+                except sqlite3.Error as e:
+                    lenta["plano"] = [f"indisponível: {e}"]
+            conn.close()
+        return {
+            "limite_lento_ms": round(self.limite_lento * 1000, 3),
+            "metodos": dict(sorted(metodos.items(), key=lambda item: -item[1]["total_ms"])),
+            "comandos": dict(sorted(comandos.items(), key=lambda item: -item[1]["total_ms"])),
+            "lentas": lentas,
+        }
+
+# Conexão com o banco de dados SQLite
+def init_db(caminho=None):
+    conn = sqlite3.connect(caminho_banco(caminho))
+    # Com o esquema atualizado a abertura é só a leitura da versão; o modo WAL
+    # fica gravado no arquivo desde a primeira migração
+    if conn.execute("PRAGMA user_version").fetchone()[0] < len(MIGRACOES):
+        conn.execute("PRAGMA journal_mode = WAL")
+        migrar(conn)
+    # A limpeza do registro de alterações percorre a tabela: só quando há o que apagar
+    limite = int(time.time()) - RETENCAO_ALTERACOES
+    mais_antiga = conn.execute("SELECT momento FROM alteracoes ORDER BY seq LIMIT 1").fetchone()
+    if mais_antiga and mais_antiga[0] < limite:
+        # Com outras filiais, o que será apagado fica antes consolidado em versoes
+        if conn.execute("SELECT 1 FROM pares_sincronizacao LIMIT 1").fetchone():
+            _dobrar_versoes(conn.cursor())
+        conn.execute("DELETE FROM alteracoes WHERE momento < ?", (limite,))
+    ultimo_saldo = conn.execute("SELECT MAX(data) FROM saldos_estoque").fetchone()[0]
+    agora = datetime.now()
+    if ultimo_saldo is None or ultimo_saldo < (agora - timedelta(days=PERIODO_SALDOS_DIAS)).strftime("%Y-%m-%d %H:%M:%S"):
+        _registrar_saldos(conn.cursor(), agora.strftime("%Y-%m-%d %H:%M:%S"))
     conn.commit()
+    _preparar_arquivo(conn, caminho_banco(caminho))
     conn.close()
 
+# Cópias de segurança online: a API de backup do SQLite copia o banco aberto em
+# passos de PAGINAS_POR_PASSO_BACKUP páginas, sem impedir as gravações dos
+# terminais. A cópia é verificada (integrity_check), compactada com gzip e as
+# mais antigas são apagadas conforme RETENCAO_BACKUP
+PAGINAS_POR_PASSO_BACKUP = 1024
+# Gravações de outras conexões reiniciam a cópia; depois de tantos reinícios
+# ela é feita em um passo só (no modo WAL a leitura não bloqueia as gravações)
+MAXIMO_REINICIOS_BACKUP = 3
+# Mantidos: os mais recentes e o mais novo de cada um dos últimos dias e meses
+RETENCAO_BACKUP = {"recentes": 7, "diarios": 14, "mensais": 12}
+INTERVALO_BACKUP_HORAS = 6
+TAMANHO_BLOCO_BACKUP = 1024 * 1024
+# Nível do gzip: o 1 compacta três vezes mais rápido que o padrão (6) e gera
+# arquivos pouco maiores
+COMPACTACAO_BACKUP = 1
+
+class _BackupReiniciado(Exception):
+    pass
+
+def listar_backups(diretorio, caminho=None):
+    """(momento, arquivo) dos backups do banco em diretorio, do mais novo para o mais antigo"""
+    base = os.path.splitext(os.path.basename(caminho_banco(caminho)))[0]
+    padrao = re.compile(re.escape(base) + r"-(\d{8}-\d{6})\.db\.gz$")
+    backups = []
+    for nome in os.listdir(diretorio) if os.path.isdir(diretorio) else ():
+        achado = padrao.match(nome)
+        if achado:
+            backups.append((datetime.strptime(achado.group(1), "%Y%m%d-%H%M%S"), os.path.join(diretorio, nome)))
+    return sorted(backups, reverse=True)
+
+def _rotacionar_backups(diretorio, caminho, retencao):
+    backups = listar_backups(diretorio, caminho)
+    manter = {arquivo for _, arquivo in backups[:retencao["recentes"]]}
+    for formato, quantidade in (("%Y-%m-%d", retencao["diarios"]), ("%Y-%m", retencao["mensais"])):
+        periodos = {}
+        for momento, arquivo in backups:
+            periodos.setdefault(momento.strftime(formato), arquivo)
+        manter.update(list(periodos.values())[:quantidade])
+    removidos = [arquivo for _, arquivo in backups if arquivo not in manter]
+    for arquivo in removidos:
+        os.remove(arquivo)
+        # Com a cópia do arquivo morto feita junto
+        if os.path.exists(backup_do_arquivo(arquivo)):
+            os.remove(backup_do_arquivo(arquivo))
+    return removidos
+
+def backup_do_arquivo(backup):
+    """Cópia do arquivo morto feita junto com o backup (nome-arquivo.db.gz)"""
+    compactado = backup.endswith(".gz")
+    return caminho_arquivo(backup[:-3] if compactado else backup) + (".gz" if compactado else "")
+
+def _copia_compactada(caminho, arquivo, paginas, progresso=None):
+    # Copia o banco pela API de backup, verifica a cópia e a grava compactada em arquivo
+    import gzip
+    import shutil
+    temporario = arquivo[:-3] + ".tmp"
+    marca = time.perf_counter()
+    fases = {}
+    reinicios = 0
+    anterior = None
+
+    def passo(status, restantes, total):
+        # Restantes aumentando: o banco foi alterado e a cópia recomeçou
+        nonlocal reinicios, anterior
+        if anterior is not None and restantes > anterior:
+            reinicios += 1
+            if reinicios > MAXIMO_REINICIOS_BACKUP:
+                raise _BackupReiniciado()
+        anterior = restantes
+        if progresso:
+            progresso(restantes, total)
+
+    origem = sqlite3.connect(caminho, timeout=BUSY_TIMEOUT_MS / 1000)
+    copia = sqlite3.connect(temporario)
+    try:
+        try:
+            origem.backup(copia, pages=paginas, progress=passo)
+        except _BackupReiniciado:
+            origem.backup(copia, pages=-1)
+        # A cópia fica em um arquivo só (sem -wal), pronta para ser restaurada
+        copia.execute("PRAGMA journal_mode = DELETE")
+        fases["copia"], marca = time.perf_counter() - marca, time.perf_counter()
+        integridade = [linha[0] for linha in copia.execute("PRAGMA integrity_check")]
+        fases["verificacao"], marca = time.perf_counter() - marca, time.perf_counter()
+        paginas_copiadas = copia.execute("PRAGMA page_count").fetchone()[0]
+        tamanho = paginas_copiadas * copia.execute("PRAGMA page_size").fetchone()[0]
+    except BaseException:
+        copia.close()
+        os.remove(temporario)
+        raise
+    finally:
+        origem.close()
+    copia.close()
+    try:
+        if integridade != ["ok"]:
+            raise sqlite3.DatabaseError("Cópia com erros de integridade: " + "; ".join(integridade[:5]))
+        with open(temporario, "rb") as entrada, \
+                gzip.open(arquivo + ".parcial", "wb", compresslevel=COMPACTACAO_BACKUP) as saida:
+            shutil.copyfileobj(entrada, saida, TAMANHO_BLOCO_BACKUP)
+        os.replace(arquivo + ".parcial", arquivo)
+        fases["compactacao"] = time.perf_counter() - marca
+    finally:
+        os.remove(temporario)
+    return {
+        "arquivo": arquivo,
+        "paginas": paginas_copiadas,
+        "bytes": tamanho,
+        "bytes_compactados": os.path.getsize(arquivo),
+        "reinicios": reinicios,
+        "fases": {nome: round(segundos, 3) for nome, segundos in fases.items()},
+    }
+
+def fazer_backup(diretorio, caminho=None, paginas=PAGINAS_POR_PASSO_BACKUP, retencao=RETENCAO_BACKUP, progresso=None):
+    """Cópia online, verificada e compactada do banco (e do arquivo morto, se houver)
+    em diretorio; progresso recebe as páginas restantes e o total a cada passo da
+    cópia do banco; devolve o relatório do backup"""
+    caminho = caminho_banco(caminho)
+    os.makedirs(diretorio, exist_ok=True)
+    base = os.path.splitext(os.path.basename(caminho))[0]
+    arquivo = os.path.join(diretorio, f"{base}-{datetime.now():%Y%m%d-%H%M%S}.db.gz")
+    inicio = time.perf_counter()
+    relatorio = _copia_compactada(caminho, arquivo, paginas, progresso)
+    # O arquivo morto é copiado depois do banco: um lote arquivado entre as duas
+    # cópias fica nas duas (e o próximo arquivamento o tira do banco), nunca em nenhuma
+    relatorio["arquivo_morto"] = None
+    if os.path.exists(caminho_arquivo(caminho)):
+        try:
+            relatorio["arquivo_morto"] = _copia_compactada(caminho_arquivo(caminho), backup_do_arquivo(arquivo), paginas)
+        except BaseException:
+            os.remove(arquivo)
+            raise
+    relatorio["segundos"] = round(time.perf_counter() - inicio, 3)
+    relatorio["removidos"] = _rotacionar_backups(diretorio, caminho, retencao)
+    return relatorio
+
+def _descompactar_verificado(arquivo, temporario):
+    # Descompacta o backup em temporario e devolve o seu tamanho, se íntegro
+    import gzip
+    import shutil
+    abrir = gzip.open if arquivo.endswith(".gz") else open
+    with abrir(arquivo, "rb") as entrada, open(temporario, "wb") as saida:
+        shutil.copyfileobj(entrada, saida, TAMANHO_BLOCO_BACKUP)
+    conn = sqlite3.connect(temporario)
+    try:
+        integridade = [linha[0] for linha in conn.execute("PRAGMA integrity_check")]
+        if integridade != ["ok"]:
+            raise sqlite3.DatabaseError("Backup com erros de integridade: " + "; ".join(integridade[:5]))
+        return conn.execute("PRAGMA page_count").fetchone()[0] * conn.execute("PRAGMA page_size").fetchone()[0]
+    finally:
+        conn.close()
+
+def restaurar_backup(arquivo, caminho=None):
+    """Substitui o banco (e o arquivo morto, se o backup tiver a cópia dele) pelo
+    backup (.db.gz ou .db), verificado antes; usar com o sistema fechado"""
+    caminho = caminho_banco(caminho)
+    inicio = time.perf_counter()
+    # Banco e arquivo morto são verificados antes de qualquer um ser substituído
+    restauracoes = [(arquivo, caminho)]
+    if os.path.exists(backup_do_arquivo(arquivo)):
+        restauracoes.append((backup_do_arquivo(arquivo), caminho_arquivo(caminho)))
+    temporarios = []
+    try:
+        tamanho = 0
+        for origem, destino in restauracoes:
+            temporarios.append(destino + ".restauracao")
+            tamanho += _descompactar_verificado(origem, temporarios[-1])
+        for temporario, (_, destino) in zip(temporarios, restauracoes):
+            # Pela API de backup o banco de destino (e o seu -wal) é substituído de uma vez
+            origem, copia = sqlite3.connect(temporario), sqlite3.connect(destino, timeout=BUSY_TIMEOUT_MS / 1000)
+            try:
+                origem.backup(copia)
+            finally:
+                origem.close()
+                copia.close()
+    finally:
+        for temporario in temporarios:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+    segundos = time.perf_counter() - inicio
+    return {
+        "arquivo": arquivo,
+        "banco": caminho,
+        "arquivo_morto": len(restauracoes) > 1,
+        "bytes": tamanho,
+        "segundos": round(segundos, 3),
+        "mb_por_segundo": round(tamanho / 1e6 / segundos, 1) if segundos else None,
+    }
+
+class AgendadorBackup(threading.Thread):
+    """Faz um backup a cada intervalo (em horas) enquanto o programa estiver aberto"""
+    def __init__(self, diretorio, caminho=None, intervalo=INTERVALO_BACKUP_HORAS, ao_concluir=None):
+        super().__init__(name="backup", daemon=True)
+        self.diretorio = diretorio
+        self.caminho = caminho
+        self.intervalo = intervalo * 3600
+        # Chamada (na thread do backup) com o relatório ou {"erro": mensagem}
+        self.ao_concluir = ao_concluir
+        self._parar = threading.Event()
+        self._ultima_tentativa = 0
+
+    def proximo(self):
+        # O primeiro backup sai quando o mais recente existente completar o intervalo
+        backups = listar_backups(self.diretorio, self.caminho)
+        ultimo = max(backups[0][0].timestamp() if backups else 0, self._ultima_tentativa)
+        return ultimo + self.intervalo
+
+    def run(self):
+        while not self._parar.wait(max(self.proximo() - time.time(), 0)):
+            self._ultima_tentativa = time.time()
+            try:
+                relatorio = fazer_backup(self.diretorio, self.caminho)
+            except (OSError, sqlite3.Error) as e:
+                relatorio = {"erro": str(e)}
+            if self.ao_concluir:
+                self.ao_concluir(relatorio)
+
+    def parar(self):
+        self._parar.set()
+        self.join()
+
+# Arquivo morto: OS concluídas e vendas mais antigas que DIAS_ARQUIVAMENTO,
+# com seus itens, são movidas em lotes para um segundo banco ao lado do
+# principal (oficina_motos-arquivo.db), anexado a cada conexão como "arquivo".
+# As listagens e a reconstrução dos resumos leem os dois bancos; os resumos já
+# somados não mudam com o arquivamento
+DIAS_ARQUIVAMENTO = 365
+TAMANHO_LOTE_ARQUIVAMENTO = 500
+# Intervalo entre os lotes, para que as gravações dos terminais que esperam a
+# vez (busy_timeout) não fiquem para trás
+PAUSA_ARQUIVAMENTO = 0.05
+# Tabela arquivada -> (condição das linhas, tabela dos itens, coluna do item que a referencia)
+ARQUIVAMENTO = {
+    "ordens_servico": ("status = 'Concluída'", "os_pecas", "os_id"),
+    "vendas": ("1", "venda_itens", "venda_id"),
+}
+TABELAS_ARQUIVO = ["ordens_servico", "os_pecas", "vendas", "venda_itens"]
+INDICES_ARQUIVO = {
+    "idx_os_data": "ordens_servico (data)",
+    "idx_os_cliente": "ordens_servico (cliente_id)",
+    "idx_os_pecas_os": "os_pecas (os_id)",
+    "idx_vendas_data": "vendas (data)",
+    "idx_vendas_cliente": "vendas (cliente_id)",
+    "idx_venda_itens_venda": "venda_itens (venda_id)",
+    "idx_ordens_servico_uid": "ordens_servico (uid)",
+    "idx_vendas_uid": "vendas (uid)",
+    "idx_os_pecas_uid": "os_pecas (uid)",
+    "idx_venda_itens_uid": "venda_itens (uid)",
+}
+
+def caminho_arquivo(caminho=None):
+    base, extensao = os.path.splitext(caminho_banco(caminho))
+    return f"{base}-arquivo{extensao or '.db'}"
+
+def _anexar_arquivo(conn, caminho):
+    # O arquivo é criado por init_db; sem ele as consultas leem só o banco principal
+    arquivo = caminho_arquivo(caminho)
+    if os.path.exists(arquivo):
+        conn.execute("ATTACH DATABASE ? AS arquivo", (arquivo,))
+        return True
+    return False
+
+def _preparar_arquivo(conn, caminho):
+    # As tabelas do arquivo têm as colunas das principais (sem AUTOINCREMENT,
+    # os ids vêm do banco principal) e recebem as colunas que as migrações incluírem
+    conn.execute("ATTACH DATABASE ? AS arquivo", (caminho_arquivo(caminho),))
+    versao = conn.execute("PRAGMA user_version").fetchone()[0]
+    if conn.execute("PRAGMA arquivo.user_version").fetchone()[0] != versao:
+        conn.execute("PRAGMA arquivo.journal_mode = WAL")
+        for tabela in TABELAS_ARQUIVO:
+            existentes = {linha[1] for linha in conn.execute(f"PRAGMA arquivo.table_info({tabela})")}
+            definicoes = []
+            for _, nome, tipo, obrigatorio, padrao, chave in conn.execute(f"PRAGMA main.table_info({tabela})"):
+                definicao = f"{nome} {tipo}" + (" PRIMARY KEY" if chave else "") + (" NOT NULL" if obrigatorio else "")
+                definicoes.append((nome, definicao + ("" if padrao is None else f" DEFAULT {padrao}")))
+            if not existentes:
+                conn.execute(f"CREATE TABLE arquivo.{tabela} ({', '.join(d for _, d in definicoes)})")
+            for nome, definicao in definicoes:
+                if existentes and nome not in existentes:
+                    conn.execute(f"ALTER TABLE arquivo.{tabela} ADD COLUMN {definicao}")
+        for indice, colunas in INDICES_ARQUIVO.items():
+            conn.execute(f"CREATE INDEX IF NOT EXISTS arquivo.{indice} ON {colunas}")
+        conn.execute(f"PRAGMA arquivo.user_version = {versao}")
+        conn.commit()
+    conn.execute("DETACH DATABASE arquivo")
+
+def _colunas(conn, tabela):
+    return ", ".join(linha[1] for linha in conn.execute(f"PRAGMA main.table_info({tabela})"))
+
+def _origens_com_arquivo(conn):
+    # Cada tabela arquivada seguida das suas linhas no arquivo
+    return {tabela: f"(SELECT {colunas} FROM main.{tabela} UNION ALL SELECT {colunas} FROM arquivo.{tabela})"
+            for tabela, colunas in ((t, _colunas(conn, t)) for t in TABELAS_ARQUIVO)}
+
+def _arquivar_lote(caminho, limite, lote):
+    # A conexão abre o arquivo como banco principal e anexa o banco da oficina:
+    # no modo WAL cada banco confirma a transação por conta própria, na ordem
+    # em que foram abertos, então uma queda entre os dois deixa o lote copiado
+    # sem ter sido apagado (e INSERT OR REPLACE permite refazê-lo), nunca o contrário
+    conn = sqlite3.connect(caminho_arquivo(caminho), timeout=BUSY_TIMEOUT_MS / 1000)
+    try:
+        conn.execute("PRAGMA synchronous = FULL")
+        conn.execute("ATTACH DATABASE ? AS oficina", (caminho,))
+        conn.execute("PRAGMA oficina.synchronous = NORMAL")
+        conn.execute("BEGIN IMMEDIATE")
+        ultima_alteracao = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM oficina.alteracoes").fetchone()[0]
+        movidos = {}
+        for tabela, (condicao, itens, referencia) in ARQUIVAMENTO.items():
+            # Pela ordem dos ids cada lote fica em páginas vizinhas do banco
+            ids = json.dumps([linha[0] for linha in conn.execute(
+                f"SELECT id FROM oficina.{tabela} WHERE data < ? AND {condicao} ORDER BY id LIMIT ?", (limite, lote))])
+            for origem, coluna in ((tabela, "id"), (itens, referencia)):
+                colunas = _colunas(conn, origem)
+                conn.execute(f"INSERT OR REPLACE INTO main.{origem} ({colunas}) SELECT {colunas} FROM oficina.{origem} "
+                             f"WHERE {coluna} IN (SELECT value FROM json_each(?))", (ids,))
+            # A OS sai antes das peças para que o gatilho dos totais não a atualize
+            cursor = conn.execute(f"DELETE FROM oficina.{tabela} WHERE id IN (SELECT value FROM json_each(?))", (ids,))
+            movidos[tabela] = cursor.rowcount
+            # O gatilho de exclusão tirou o documento da busca; ele volta, lido da
+            # cópia no arquivo, para a OS arquivada continuar sendo encontrada
+            for tipo, (codigo, tabela_busca, _, conteudo) in TIPOS_BUSCA.items():
+                if tabela_busca == tabela:
+                    conn.execute(f"INSERT INTO oficina.busca (rowid, tipo, conteudo) "
+                                 f"SELECT id * 4 + {codigo}, '{tipo}', {conteudo.format(r='')} FROM main.{tabela} "
+                                 f"WHERE id IN (SELECT value FROM json_each(?))", (ids,))
+            cursor = conn.execute(f"DELETE FROM oficina.{itens} WHERE {referencia} IN (SELECT value FROM json_each(?))", (ids,))
+            movidos[itens] = cursor.rowcount
+        # As exclusões do arquivamento não são enviadas às outras filiais
+        conn.execute("UPDATE oficina.alteracoes SET operacao = 'A' WHERE seq > ? AND operacao = 'D'", (ultima_alteracao,))
+        conn.commit()
+        return movidos
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def arquivar(db, dias=DIAS_ARQUIVAMENTO, lote=TAMANHO_LOTE_ARQUIVAMENTO, progresso=None):
+    """Move para o arquivo, em transações de até lote OS e lote vendas, tudo o que
+    passou de dias; progresso recebe os totais movidos a cada lote"""
+    limite = int(time.time()) - dias * 86400
+    inicio = time.perf_counter()
+    totais = dict.fromkeys(TABELAS_ARQUIVO, 0)
+    while True:
+        movidos = db.arquivar_lote(limite, lote)
+        for tabela, quantidade in movidos.items():
+            totais[tabela] += quantidade
+        if not any(movidos.values()):
+            break
+        if progresso:
+            progresso(totais)
+        time.sleep(PAUSA_ARQUIVAMENTO)
+    return dict(totais, segundos=round(time.perf_counter() - inicio, 3))
+
+# Sincronização entre filiais: lote_sincronizacao() junta as alterações que a
+# outra filial ainda não confirmou (a versão mais recente de cada linha, com as
+# referências traduzidas para uid) e aplicar_sincronizacao() as grava em
+# transações de até LOTE_SINCRONIZACAO linhas. Os lotes trafegam em arquivos
+# JSON compactados (enviar_alteracoes/receber_alteracoes) ou direto entre dois
+# bancos (sincronizar). Conflitos: vale a versão maior (momento, filial, seq),
+# igual em todas as filiais; linhas arquivadas não mudam mais; a exclusão de
+# uma linha que tem dependentes aqui é recusada e a linha é reenviada
+LOTE_SINCRONIZACAO = 1000
+VERSAO_LOTE = 1
+# Colunas de cada filial, fora da sincronização, com o valor das linhas recebidas
+COLUNAS_LOCAIS = {"produtos": {"quantidade": 0}, "ordens_servico": {"total_pecas": 0, "total": 0}}
+# Tabela -> {coluna: tabela referenciada}
+REFERENCIAS = {
+    "motos": {"cliente_id": "clientes"},
+    "ordens_servico": {"cliente_id": "clientes", "moto_id": "motos"},
+    "vendas": {"cliente_id": "clientes"},
+    "os_pecas": {"os_id": "ordens_servico", "produto_id": "produtos"},
+    "venda_itens": {"venda_id": "vendas", "produto_id": "produtos"},
+}
+
+def _colunas_sincronizadas(conn, tabela):
+    locais = COLUNAS_LOCAIS.get(tabela, {})
+    return [linha[1] for linha in conn.execute(f"PRAGMA main.table_info({tabela})")
+            if linha[1] not in ("id", "uid") and linha[1] not in locais]
+
+def _sql_lote(tabela, colunas, incremental):
+    # Linhas do lote: uid, operação, versão (momento, filial, seq) e os valores
+    referencias = REFERENCIAS.get(tabela, {})
+    valores, juncoes = [], []
+    for i, coluna in enumerate(colunas):
+        if coluna in referencias:
+            juncoes.append(f"LEFT JOIN {referencias[coluna]} r{i} ON r{i}.id = t.{coluna}")
+            valores.append(f"CASE WHEN t.{coluna} IS NULL THEN NULL ELSE COALESCE(r{i}.uid, :filial || ':' || t.{coluna}) END")
+        else:
+            valores.append(f"t.{coluna}")
+    valores, juncoes = ", ".join(valores), " ".join(juncoes)
+    if incremental:
+        return f"""
+            SELECT v.uid, v.operacao, v.momento, COALESCE(v.filial, :filial), v.seq, {valores}
+            FROM versoes v LEFT JOIN {tabela} t ON t.id = v.registro AND v.operacao <> 'D' {juncoes}
+            WHERE v.tabela = :tabela AND v.alteracao > :confirmado AND v.operacao IN ('I', 'U', 'D')
+              AND COALESCE(v.filial, :filial) <> :par AND (t.id IS NOT NULL OR v.operacao = 'D')
+            ORDER BY v.alteracao
+        """
+    # Primeiro lote para a filial: todas as linhas e as exclusões conhecidas
+    return f"""
+        SELECT COALESCE(t.uid, :filial || ':' || t.id), COALESCE(v.operacao, 'I'), COALESCE(v.momento, 0),
+               COALESCE(v.filial, :filial), COALESCE(v.seq, 0), {valores}
+        FROM {tabela} t LEFT JOIN versoes v ON v.tabela = :tabela AND v.uid = COALESCE(t.uid, :filial || ':' || t.id) {juncoes}
+        WHERE COALESCE(v.filial, :filial) <> :par
+        UNION ALL
+        SELECT v.uid, v.operacao, v.momento, COALESCE(v.filial, :filial), v.seq, {", ".join(["NULL"] * len(colunas))}
+        FROM versoes v WHERE v.tabela = :tabela AND v.operacao = 'D' AND COALESCE(v.filial, :filial) <> :par
+    """
+
+def enviar_alteracoes(db, par, caminho):
+    """Grava em caminho (JSON compactado) o lote de alterações para a filial par"""
+    import gzip
+    lote = db.lote_sincronizacao(par)
+    with gzip.open(caminho, "wt", encoding="utf-8", compresslevel=COMPACTACAO_BACKUP) as arquivo:
+        json.dump(lote, arquivo, ensure_ascii=False)
+    return {"alteracoes": sum(len(dados["linhas"]) for dados in lote["tabelas"].values()), "ate": lote["ate"]}
+
+def receber_alteracoes(db, caminho):
+    import gzip
+    with gzip.open(caminho, "rt", encoding="utf-8") as arquivo:
+        return db.aplicar_sincronizacao(json.load(arquivo))
+
+def sincronizar(db, outro):
+    """Troca as alterações entre dois bancos, nos dois sentidos"""
+    enviadas = outro.aplicar_sincronizacao(db.lote_sincronizacao(outro.filial()))
+    recebidas = db.aplicar_sincronizacao(outro.lote_sincronizacao(db.filial()))
+    return {"enviadas": enviadas, "recebidas": recebidas}
+
+# Expressão FTS5 de uma busca digitada: cada palavra vira um prefixo e todas
+# precisam aparecer no documento; None quando não há palavras
+def _expressao_busca(texto, tipo=None):
+    termos = re.findall(r"\w+", texto)
+    if not termos:
+        return None
+    expressao = "conteudo : (" + " AND ".join(f'"{termo}"*' for termo in termos) + ")"
+    if tipo:
+        expressao = f'tipo : "{tipo}" AND ' + expressao
+    return expressao
+
+# Sugestões dos campos de busca de cliente e produto e quantos itens usados
+# por último são lembrados
+LIMITE_SUGESTOES = 20
+RECENTES = 15
+
+# Tipos das linhas devolvidas pelo Database. São namedtuples (sem __dict__) e
+# são criadas direto da tupla do SQLite pela row_factory de cada consulta
+Cliente = namedtuple("Cliente", "id nome telefone")
+Moto = namedtuple("Moto", "id marca modelo placa")
+Produto = namedtuple("Produto", "id codigo descricao quantidade preco_venda")
+Funcionario = namedtuple("Funcionario", "id nome funcao telefone status")
+OrdemServico = namedtuple("OrdemServico", "id cliente moto descricao status data total")
+Venda = namedtuple("Venda", "id cliente data total")
+# Tabela das listagens por data (que também leem o arquivo)
+TABELAS_LISTAGEM = {OrdemServico: "ordens_servico", Venda: "vendas"}
+EstoqueBaixo = namedtuple("EstoqueBaixo", "id codigo descricao quantidade")
+ResultadoBusca = namedtuple("ResultadoBusca", "tipo id conteudo")
+Alteracao = namedtuple("Alteracao", "seq tabela registro operacao")
+ResumoPeriodo = namedtuple("ResumoPeriodo", ["periodo"] + COLUNAS_RESUMO)
+MovimentoEstoque = namedtuple("MovimentoEstoque", "id data tipo quantidade referencia")
+ResumoProduto = namedtuple("ResumoProduto", "produto_id " + " ".join(COLUNAS_RESUMO_PRODUTOS))
+TotalOS = namedtuple("TotalOS", "id total_pecas mao_obra total")
+
+# Tipos de linha por nome, para reconstruir as linhas recebidas do servidor
+TIPOS_LINHA = {tipo.__name__: tipo for tipo in (Cliente, Moto, Produto, Funcionario, OrdemServico, Venda, EstoqueBaixo,
+                                                 ResultadoBusca, Alteracao, ResumoPeriodo, MovimentoEstoque, ResumoProduto,
+                                                 TotalOS)}
+
+def _fabrica_linhas(tipo):
+    novo = tuple.__new__
+    return lambda cursor, linha: novo(tipo, linha)
+
+# Tamanho do cache de comandos preparados de cada conexão
+CACHE_COMANDOS = 256
+
+# Comandos de inclusão em lote, por tipo de cadastro
+SQL_CADASTRO_LOTE = {
+    "produtos": "INSERT INTO produtos (codigo, descricao, quantidade, preco_custo, preco_venda, estoque_minimo) VALUES (?, ?, ?, ?, ?, ?)",
+    "clientes": "INSERT INTO clientes (nome, cpf, telefone) VALUES (?, ?, ?)",
+    "motos": "INSERT INTO motos (cliente_id, marca, modelo, placa, ano, cor) VALUES (?, ?, ?, ?, ?, ?)",
+}
+
 # Classe para gerenciar o banco de dados
 class Database:
-    def __init__(self):
-        self.conn = sqlite3.connect('oficina_motos.db')
-        self.cursor = self.conn.cursor()
+    def __init__(self, caminho=None):
+        self.conexoes = GerenciadorConexoes(caminho)
+        # Catálogo de produtos em memória, carregado no primeiro uso
+        self._catalogo = None
+        # Quantidade de alertas de estoque baixo (carregada no primeiro uso) e
+        # função chamada com a nova quantidade quando um produto cruza o mínimo
+        self._alertas = None
+        self.ao_alterar_alertas = None
+        # Clientes e produtos usados por último (ids, o mais recente primeiro),
+        # lidos do histórico no primeiro uso e atualizados a cada gravação
+        self._recentes = {}
+        # Perfil de consultas, criado por ativar_perfil()
+        self.perfil = None
+        # Identificador desta filial, lido no primeiro uso
+        self._filial = None
+
+    # Conexão e cursor da thread atual
+    @property
+    def conn(self):
+        return self.conexoes.conexao()
+
+    @property
+    def cursor(self):
+        return self.conexoes.cursor()
 
     def close(self):
-        self.conn.close()
+        self.conexoes.fechar()
+
+    # Perfil de consultas: cada método público passa a ser medido (por um
+    # atributo da instância que encobre o da classe) e cada comando SQL rastreado
+    def ativar_perfil(self, limite_lento_ms=LIMITE_CONSULTA_LENTA_MS):
+        if self.perfil is None:
+            self.perfil = PerfilBanco(limite_lento_ms)
+        self.perfil.limite_lento = limite_lento_ms / 1000
+        for nome in METODOS_PERFIL:
+            setattr(self, nome, self.perfil.medir(nome, getattr(type(self), nome).__get__(self)))
+        self.conexoes.rastrear(self.perfil.rastrear)
+
+    def desativar_perfil(self):
+        # As estatísticas continuam disponíveis até limpar_perfil()
+        self.conexoes.rastrear(None)
+        for nome in METODOS_PERFIL:
+            self.__dict__.pop(nome, None)
+
+    def perfil_ativo(self):
+        return self.conexoes.rastreamento is not None
+
+    def perfil_consultas(self):
+        if self.perfil is None:
+            return {"ativo": False, "metodos": {}, "comandos": {}, "lentas": []}
+        return dict(self.perfil.resumo(self.conexoes.caminho), ativo=self.perfil_ativo())
+
+    def limpar_perfil(self):
+        if self.perfil is not None:
+            self.perfil = PerfilBanco(self.perfil.limite_lento * 1000)
+            if self.perfil_ativo():
+                self.ativar_perfil(self.perfil.limite_lento * 1000)
+
+    def _consultar(self, tipo, sql, parametros=()):
+        # Cursor próprio, com as linhas já convertidas para o tipo informado
+        cursor = self.conn.cursor()
+        cursor.row_factory = _fabrica_linhas(tipo)
+        return cursor.execute(sql, parametros)
+
+    @staticmethod
+    def _filtrar(sql, coluna_id, ids, condicoes, parametros):
+        # Só as linhas dos ids informados (atualização das visões), com as
+        # condições adicionais informadas
+        condicoes, parametros = list(condicoes), list(parametros)
+        if ids is not None:
+            condicoes.append(f"{coluna_id} IN (SELECT value FROM json_each(?))")
+            parametros.append(json.dumps(list(ids)))
+        if condicoes:
+            sql += (" AND " if " WHERE " in sql else " WHERE ") + " AND ".join(condicoes)
+        return sql, parametros
+
+    def _listagem(self, tipo, sql, coluna_id, ids=None, ordem="", condicoes=(), parametros=()):
+        # Listagem completa ou só as linhas dos ids informados
+        sql, parametros = self._filtrar(sql, coluna_id, ids, condicoes, parametros)
+        return self._consultar(tipo, sql + ordem, parametros)
+
+    def _tabelas(self, tabela, inicio=None):
+        # A tabela principal e, quando o arquivo pode ter linhas a partir de
+        # inicio, a arquivada
+        if not self.conexoes.arquivo_anexado():
+            return [tabela]
+        ultima = self.conn.execute(f"SELECT MAX(data) FROM arquivo.{tabela}").fetchone()[0]
+        if ultima is None or (inicio is not None and inicio > ultima):
+            return [tabela]
+        return [tabela, f"arquivo.{tabela}"]
+
+    def _listagem_por_data(self, tipo, sql, alias, ids, inicio, fim, antes, limite):
+        # Listagem da mais recente para a mais antiga, opcionalmente só do período
+        # inicio <= data < fim (segundos desde 1970). antes=(data, id) da última
+        # linha recebida continua a listagem a partir dela (paginação por chave).
+        # {tabela} em sql é a tabela lida; com linhas no arquivo a consulta é
+        # repetida para ele e as duas partes são intercaladas pela ordem
+        condicoes, parametros = [], []
+        if inicio is not None:
+            condicoes.append(f"{alias}.data >= ?")
+            parametros.append(inicio)
+        if fim is not None:
+            condicoes.append(f"{alias}.data < ?")
+            parametros.append(fim)
+        if antes is not None:
+            condicoes.append(f"({alias}.data, {alias}.id) < (?, ?)")
+            parametros.extend(antes)
+        partes = [self._filtrar(sql.format(tabela=tabela), f"{alias}.id", ids, condicoes, parametros)
+                  for tabela in self._tabelas(TABELAS_LISTAGEM[tipo], inicio)]
+        sql = " UNION ALL ".join(parte for parte, _ in partes)
+        parametros = [valor for _, valores in partes for valor in valores]
+        if len(partes) == 1:
+            sql += f" ORDER BY {alias}.data DESC, {alias}.id DESC"
+        else:
+            # Na união a ordem é dada pela posição das colunas
+            sql += f" ORDER BY {tipo._fields.index('data') + 1} DESC, {tipo._fields.index('id') + 1} DESC"
+        if limite is not None:
+            sql += " LIMIT ?"
+            parametros.append(limite)
+        return self._consultar(tipo, sql, parametros)
 
     def cadastrar_cliente(self, nome, cpf, telefone):
         self.cursor.execute("INSERT INTO clientes (nome, cpf, telefone) VALUES (?, ?, ?)", 
                            (nome, cpf, telefone))
         self.conn.commit()
+        self._usar_recentes("clientes", [self.cursor.lastrowid])
         return self.cursor.lastrowid
 
     def excluir_cliente(self, cliente_id):
@@ -126,16 +1446,16 @@ class Database:
             if motos_count > 0:
                 return False, f"Não é possível excluir o cliente. Ele possui {motos_count} moto(s) cadastrada(s)."
             
-            # Verificar se o cliente tem ordens de serviço
-            self.cursor.execute("SELECT COUNT(*) FROM ordens_servico WHERE cliente_id = ?", (cliente_id,))
-            os_count = self.cursor.fetchone()[0]
+            # Verificar se o cliente tem ordens de serviço (também as arquivadas)
+            os_count = sum(self.conn.execute(f"SELECT COUNT(*) FROM {tabela} WHERE cliente_id = ?", (cliente_id,)).fetchone()[0]
+                           for tabela in self._tabelas("ordens_servico"))
             
             if os_count > 0:
                 return False, f"Não é possível excluir o cliente. Ele possui {os_count} ordem(ns) de serviço."
             
             # Verificar se o cliente tem vendas
-            self.cursor.execute("SELECT COUNT(*) FROM vendas WHERE cliente_id = ?", (cliente_id,))
-            vendas_count = self.cursor.fetchone()[0]
+            vendas_count = sum(self.conn.execute(f"SELECT COUNT(*) FROM {tabela} WHERE cliente_id = ?", (cliente_id,)).fetchone()[0]
+                               for tabela in self._tabelas("vendas"))
             
             if vendas_count > 0:
                 return False, f"Não é possível excluir o cliente. Ele possui {vendas_count} venda(s) registrada(s)."
@@ -153,117 +1473,1600 @@ class Database:
         self.cursor.execute("INSERT INTO motos (cliente_id, marca, modelo, placa, ano, cor) VALUES (?, ?, ?, ?, ?, ?)", 
                            (cliente_id, marca, modelo, placa, ano, cor))
         self.conn.commit()
+        self._usar_recentes("clientes", [cliente_id])
         return self.cursor.lastrowid
 
     def cadastrar_produto(self, codigo, descricao, quantidade, preco_custo, preco_venda, estoque_minimo):
         self.cursor.execute("INSERT INTO produtos (codigo, descricao, quantidade, preco_custo, preco_venda, estoque_minimo) VALUES (?, ?, ?, ?, ?, ?)", 
                            (codigo, descricao, quantidade, preco_custo, preco_venda, estoque_minimo))
+        produto_id = self.cursor.lastrowid
+        if quantidade:
+            self._movimentar({produto_id: quantidade}, "inicial")
         self.conn.commit()
+        # Mesma regra do gatilho (IFNULL): sem mínimo ou sem quantidade, sem alerta
+        if quantidade is not None and estoque_minimo is not None and quantidade <= estoque_minimo:
+            self._notificar_alertas(1)
+        if self._catalogo is not None:
+            self._indexar_produto(Produto(produto_id, codigo, descricao, quantidade, preco_venda))
+        self._usar_recentes("produtos", [produto_id])
+        return produto_id
+
+    def listar_clientes(self):
+        return self.cursor_clientes().fetchall()
+
+    def cliente_existe(self, cliente_id):
+        self.cursor.execute("SELECT 1 FROM clientes WHERE id = ?", (cliente_id,))
+        return self.cursor.fetchone() is not None
+
+    def cliente_por_cpf(self, cpf):
+        self.cursor.execute("SELECT id FROM clientes WHERE cpf = ? LIMIT 1", (cpf,))
+        linha = self.cursor.fetchone()
+        return linha[0] if linha else None
+
+    def cadastrar_lote(self, tipo, linhas):
+        # Inclusão de vários cadastros do mesmo tipo em uma única transação
+        try:
+            self.cursor.execute("BEGIN IMMEDIATE")
+            self.cursor.execute("SELECT COALESCE(MAX(id), 0) FROM produtos")
+            ultimo_produto = self.cursor.fetchone()[0]
+            self.cursor.executemany(SQL_CADASTRO_LOTE[tipo], linhas)
+            if tipo == "produtos":
+                # Saldo inicial dos produtos incluídos
+                self.cursor.execute("""
+                    INSERT INTO movimentos_estoque (produto_id, data, quantidade, tipo)
+                    SELECT id, ?, quantidade, 'inicial' FROM produtos WHERE id > ? AND quantidade <> 0
+                """, (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), ultimo_produto))
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+        if tipo == "produtos":
+            self.invalidar_catalogo()
+            self.recontar_alertas()
+
+    # Consultas das listagens: devolvem um cursor próprio para leitura paginada
+    # (ids restringe a consulta às linhas informadas)
+    def cursor_clientes(self, ids=None):
+        return self._listagem(Cliente, "SELECT id, nome, telefone FROM clientes", "id", ids)
+
+    def cursor_produtos(self, ids=None):
+        return self._listagem(Produto, "SELECT id, codigo, descricao, quantidade, preco_venda FROM produtos", "id", ids)
+
+    def cursor_funcionarios(self, ids=None):
+        return self._listagem(Funcionario, "SELECT id, nome, funcao, telefone, status FROM funcionarios", "id", ids,
+                              " ORDER BY nome")
+
+    def cursor_os(self, ids=None, inicio=None, fim=None, antes=None, limite=None):
+        # CROSS JOIN fixa ordens_servico como tabela externa, percorrida pelo índice da data
+        return self._listagem_por_data(OrdemServico, "SELECT os.id, c.nome, m.modelo, os.descricao, os.status, os.data, os.total FROM {tabela} os CROSS JOIN clientes c ON os.cliente_id = c.id CROSS JOIN motos m ON os.moto_id = m.id",
+                                       "os", ids, inicio, fim, antes, limite)
+
+    def cursor_estoque_baixo(self, ids=None):
+        return self._listagem(EstoqueBaixo, "SELECT p.id, p.codigo, p.descricao, p.quantidade FROM alertas_estoque a "
+                                            "JOIN produtos p ON p.id = a.produto_id", "a.produto_id", ids)
+
+    def cursor_vendas(self, ids=None, inicio=None, fim=None, antes=None, limite=None):
+        return self._listagem_por_data(Venda, """
+            SELECT v.id, COALESCE(c.nome, 'Cliente Avulso'), v.data, v.total
+            FROM {tabela} v
+            LEFT JOIN clientes c ON v.cliente_id = c.id
+        """, "v", ids, inicio, fim, antes, limite)
+
+    # Registro de alterações
+    def ultima_alteracao(self):
+        self.cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM alteracoes")
+        return self.cursor.fetchone()[0]
+
+    def alteracoes_desde(self, seq, limite=None):
+        """Alterações gravadas depois de seq, em ordem (no máximo limite + 1 linhas)"""
+        return self._consultar(Alteracao, "SELECT seq, tabela, registro, operacao FROM alteracoes WHERE seq > ? ORDER BY seq LIMIT ?",
+                               (seq, -1 if limite is None else limite + 1)).fetchall()
+
+    def ids_relacionados(self, tabela, coluna, ids):
+        # Ids de tabela cuja coluna referencia um dos ids informados
+        self.cursor.execute(f"SELECT id FROM {tabela} WHERE {coluna} IN (SELECT value FROM json_each(?))",
+                            (json.dumps(list(ids)),))
+        return [linha[0] for linha in self.cursor.fetchall()]
+
+    def listar_motos(self, cliente_id):
+        return self._consultar(Moto, "SELECT id, marca, modelo, placa FROM motos WHERE cliente_id = ?", (cliente_id,)).fetchall()
+
+    def listar_produtos(self):
+        return self.cursor_produtos().fetchall()
+
+    # Catálogo de produtos: Produto por id, com índices auxiliares de código e
+    # descrição apontando para o id
+    def _carregar_catalogo(self):
+        catalogo = self._catalogo
+        if catalogo is None:
+            # Monta tudo em variáveis locais e publica o catálogo por último:
+            # quem o vê diferente de None já o encontra completo
+            catalogo, por_codigo, por_descricao = {}, {}, {}
+            for produto in self.cursor_produtos():
+                self._indexar_produto(produto, catalogo, por_codigo, por_descricao)
+            self._produtos_por_codigo = por_codigo
+            self._produtos_por_descricao = por_descricao
+            self._catalogo = catalogo
+        return catalogo
+
+    def _indexar_produto(self, produto, catalogo=None, por_codigo=None, por_descricao=None):
+        if catalogo is None:
+            catalogo, por_codigo, por_descricao = (self._catalogo, self._produtos_por_codigo,
+                                                   self._produtos_por_descricao)
+        catalogo[produto.id] = produto
+        if produto.codigo:
+            por_codigo[produto.codigo] = produto.id
+        por_descricao[produto.descricao] = produto.id
+
+    def _baixar_catalogo(self, quantidades):
+        # Mantém o saldo em memória igual ao gravado, sem recarregar o catálogo
+        if self._catalogo is None:
+            return
+        for produto_id, quantidade in quantidades.items():
+            produto = self._catalogo.get(produto_id)
+            if produto:
+                self._catalogo[produto_id] = produto._replace(quantidade=produto.quantidade - quantidade)
+
+    def invalidar_catalogo(self):
+        self._catalogo = None
+
+    def atualizar_catalogo(self, ids):
+        # Relê do banco só os produtos alterados (por exemplo, em outro terminal)
+        if self._catalogo is None:
+            return
+        # Lê antes de mexer no catálogo, para o produto não sumir no meio da troca
+        produtos = self.cursor_produtos(ids).fetchall()
+        for produto_id in set(ids) - {produto.id for produto in produtos}:
+            self._catalogo.pop(produto_id, None)
+        for produto in produtos:
+            self._indexar_produto(produto)
+
+    def catalogo_produtos(self):
+        return list(self._carregar_catalogo().values())
+
+    def obter_produto(self, produto_id):
+        return self._carregar_catalogo().get(produto_id)
+
+    def produto_por_codigo(self, codigo):
+        catalogo = self._carregar_catalogo()
+        return catalogo.get(self._produtos_por_codigo.get(codigo))
+
+    def produto_por_descricao(self, descricao):
+        catalogo = self._carregar_catalogo()
+        return catalogo.get(self._produtos_por_descricao.get(descricao))
+
+    def cadastrar_funcionario(self, nome, cpf, telefone, funcao, data_admissao, salario):
+        try:
+            self.cursor.execute("""INSERT INTO funcionarios (nome, cpf, telefone, funcao, data_admissao, salario) 
+                                 VALUES (?, ?, ?, ?, ?, ?)""", 
+                               (nome, cpf, telefone, funcao, data_admissao, salario))
+            self.conn.commit()
+            return self.cursor.lastrowid
+        except sqlite3.IntegrityError:
+            return None  # CPF já existe
+
+    def listar_funcionarios(self):
+        return self.cursor_funcionarios().fetchall()
+
+    def excluir_funcionario(self, funcionario_id):
+        try:
+            # Verificar se o funcionário tem ordens de serviço associadas
+            self.cursor.execute("SELECT COUNT(*) FROM ordens_servico WHERE cliente_id IN (SELECT id FROM clientes WHERE id = ?)", (funcionario_id,))
+            # Por enquanto, vamos permitir exclusão - pode ser expandido depois
+            self.cursor.execute("DELETE FROM funcionarios WHERE id = ?", (funcionario_id,))
+            self.conn.commit()
+            return True, "Funcionário excluído com sucesso!"
+        except Exception as e:
+            self.conn.rollback()
+            return False, f"Erro ao excluir funcionário: {str(e)}"
+
+    def verificar_estoque(self, produto_id, quantidade):
+        self.cursor.execute("SELECT quantidade FROM produtos WHERE id = ?", (produto_id,))
+        result = self.cursor.fetchone()
+        return result[0] >= quantidade if result else False
+
+    def atualizar_estoque(self, produto_id, quantidade):
+        self.cursor.execute("UPDATE produtos SET quantidade = quantidade - ? WHERE id = ?", 
+                           (quantidade, produto_id))
+        self._movimentar({produto_id: -quantidade}, "ajuste")
+        cruzamentos = self._cruzamentos_minimo({produto_id: -quantidade})
+        self.conn.commit()
+        self._baixar_catalogo({produto_id: quantidade})
+        self._notificar_alertas(cruzamentos)
+
+    def registrar_entrada(self, produto_id, quantidade, preco_custo=None):
+        # Recebimento de mercadoria; o preço de custo informado passa a valer para o produto
+        try:
+            self.cursor.execute("UPDATE produtos SET quantidade = quantidade + ?, preco_custo = COALESCE(?, preco_custo) WHERE id = ?",
+                                (quantidade, preco_custo, produto_id))
+            if self.cursor.rowcount != 1:
+                self.conn.rollback()
+                return False
+            self._movimentar({produto_id: quantidade}, "entrada")
+            cruzamentos = self._cruzamentos_minimo({produto_id: quantidade})
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            return False
+        self._baixar_catalogo({produto_id: -quantidade})
+        self._notificar_alertas(cruzamentos)
+        self._usar_recentes("produtos", [produto_id])
+        return True
+
+    # Alertas de estoque baixo
+    def _cruzamentos_minimo(self, variacoes):
+        # Produtos que entraram (+1) ou saíram (-1) do estoque baixo com as
+        # variações (produto -> quantidade com sinal) já gravadas na transação
+        self.cursor.execute("SELECT id, quantidade, estoque_minimo FROM produtos WHERE id IN (SELECT value FROM json_each(?))",
+                            (json.dumps(list(variacoes)),))
+        saldo = 0
+        for produto_id, quantidade, minimo in self.cursor.fetchall():
+            if quantidade is None or minimo is None:
+                continue
+            saldo += (quantidade <= minimo) - (quantidade - variacoes[produto_id] <= minimo)
+        return saldo
+
+    def _notificar_alertas(self, diferenca):
+        if not diferenca:
+            return
+        if self._alertas is not None:
+            self._alertas += diferenca
+        if self.ao_alterar_alertas:
+            self.ao_alterar_alertas(self.contagem_alertas())
+
+    def contagem_alertas(self):
+        if self._alertas is None:
+            self.cursor.execute("SELECT COUNT(*) FROM alertas_estoque")
+            self._alertas = self.cursor.fetchone()[0]
+        return self._alertas
+
+    def recontar_alertas(self):
+        # Relê a quantidade depois de gravações de outros terminais ou em lote
+        anterior = self._alertas
+        self._alertas = None
+        if self.contagem_alertas() != anterior and self.ao_alterar_alertas:
+            self.ao_alterar_alertas(self._alertas)
+
+    # Movimentação de estoque
+    def _movimentar(self, quantidades, tipo, referencia=None, data=None):
+        # Grava os movimentos (produto -> quantidade com sinal) na transação em andamento
+        data = data or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.cursor.executemany("INSERT INTO movimentos_estoque (produto_id, data, quantidade, tipo, referencia) VALUES (?, ?, ?, ?, ?)",
+                                [(produto_id, data, quantidade, tipo, referencia) for produto_id, quantidade in quantidades.items()])
+
+    def estoque_em(self, produto_id, data):
+        """Saldo do produto na data (AAAA-MM-DD HH:MM:SS), a partir do saldo registrado mais próximo"""
+        self.cursor.execute("SELECT data, quantidade, ultimo_movimento FROM saldos_estoque "
+                            "WHERE produto_id = ? AND data <= ? ORDER BY data DESC LIMIT 1", (produto_id, data))
+        saldo = self.cursor.fetchone()
+        if saldo:
+            # Para frente: movimentos posteriores ao saldo até a data
+            self.cursor.execute("SELECT COALESCE(SUM(quantidade), 0) FROM movimentos_estoque "
+                                "WHERE produto_id = ? AND data BETWEEN ? AND ? AND id > ?",
+                                (produto_id, saldo[0], data, saldo[2]))
+            return saldo[1] + self.cursor.fetchone()[0]
+        self.cursor.execute("SELECT data, quantidade, ultimo_movimento FROM saldos_estoque "
+                            "WHERE produto_id = ? AND data > ? ORDER BY data LIMIT 1", (produto_id, data))
+        saldo = self.cursor.fetchone()
+        if saldo:
+            # Para trás: desfaz os movimentos entre a data e o saldo
+            self.cursor.execute("SELECT COALESCE(SUM(quantidade), 0) FROM movimentos_estoque "
+                                "WHERE produto_id = ? AND data > ? AND data <= ? AND id <= ?",
+                                (produto_id, data, saldo[0], saldo[2]))
+            return saldo[1] - self.cursor.fetchone()[0]
+        # Produto sem saldo registrado: todos os movimentos até a data
+        self.cursor.execute("SELECT COALESCE(SUM(quantidade), 0) FROM movimentos_estoque WHERE produto_id = ? AND data <= ?",
+                            (produto_id, data))
+        return self.cursor.fetchone()[0]
+
+    def historico_estoque(self, produto_id, inicio="", fim="9999"):
+        return self._consultar(MovimentoEstoque, "SELECT id, data, tipo, quantidade, referencia FROM movimentos_estoque "
+                                                 "WHERE produto_id = ? AND data BETWEEN ? AND ? ORDER BY data, id",
+                               (produto_id, inicio, fim)).fetchall()
+
+    def registrar_saldos(self):
+        try:
+            self.cursor.execute("BEGIN IMMEDIATE")
+            _registrar_saldos(self.cursor, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+
+    def criar_ordem_servico(self, cliente_id, moto_id, descricao):
+        data = int(time.time())
+        self.cursor.execute("INSERT INTO ordens_servico (cliente_id, moto_id, descricao, status, mao_obra, data) VALUES (?, ?, ?, ?, ?, ?)", 
+                           (cliente_id, moto_id, descricao, "Aberta", 0.0, data))
+        self.conn.commit()
+        self._usar_recentes("clientes", [cliente_id])
         return self.cursor.lastrowid
 
-    def listar_clientes(self):
-        self.cursor.execute("SELECT id, nome FROM clientes")
-        return self.cursor.fetchall()
+    def adicionar_peca_os(self, os_id, produto_id, quantidade):
+        # Baixa condicional do estoque, peça e movimento na mesma transação
+        self.cursor.execute("UPDATE produtos SET quantidade = quantidade - ? WHERE id = ? AND quantidade >= ?",
+                            (quantidade, produto_id, quantidade))
+        if self.cursor.rowcount != 1:
+            self.conn.rollback()
+            return False
+        # O preço de venda do momento fica gravado na peça (e soma no total da OS)
+        self.cursor.execute("INSERT INTO os_pecas (os_id, produto_id, quantidade, preco_unitario) "
+                            "SELECT ?, id, ?, preco_venda FROM produtos WHERE id = ?",
+                            (os_id, quantidade, produto_id))
+        self._movimentar({produto_id: -quantidade}, "os", os_id)
+        cruzamentos = self._cruzamentos_minimo({produto_id: -quantidade})
+        self.conn.commit()
+        self._baixar_catalogo({produto_id: quantidade})
+        self._notificar_alertas(cruzamentos)
+        self._usar_recentes("produtos", [produto_id])
+        return True
+
+    def concluir_os(self, os_id, mao_obra):
+        self.cursor.execute("UPDATE ordens_servico SET status = ?, mao_obra = ?, total = ROUND(total_pecas + ?, 2) WHERE id = ?", 
+                           ("Concluída", mao_obra, mao_obra, os_id))
+        self.conn.commit()
+
+    def calcular_total_os(self, os_id):
+        # A OS pode já estar no arquivo
+        for tabela in self._tabelas("ordens_servico"):
+            linha = self.conn.execute(f"SELECT total FROM {tabela} WHERE id = ?", (os_id,)).fetchone()
+            if linha:
+                return linha[0]
+        return 0
+
+    def totais_os(self, ids=None):
+        # Peças, mão de obra e total de várias OS (ou de todas) em uma consulta
+        return self._listagem(TotalOS, "SELECT id, total_pecas, COALESCE(mao_obra, 0), total FROM ordens_servico",
+                              "id", ids).fetchall()
+
+    def registrar_venda(self, cliente_id, produtos_quantidades):
+        # Quantidades somadas por produto, caso o mesmo item apareça mais de uma vez
+        quantidades = {}
+        for produto_id, quantidade in produtos_quantidades:
+            quantidades[produto_id] = quantidades.get(produto_id, 0) + quantidade
+
+        agora = datetime.now()
+        try:
+            # Baixa condicional do estoque: um produto sem saldo suficiente não é
+            # atualizado e a venda inteira é desfeita (tudo em uma única transação)
+            self.cursor.executemany("UPDATE produtos SET quantidade = quantidade - ? WHERE id = ? AND quantidade >= ?",
+                                    [(quantidade, produto_id, quantidade) for produto_id, quantidade in quantidades.items()])
+            if self.cursor.rowcount != len(quantidades):
+                self.conn.rollback()
+                return None
+
+            # Lista de ids em JSON: o mesmo comando preparado serve para qualquer cesta
+            self.cursor.execute("SELECT id, preco_venda FROM produtos WHERE id IN (SELECT value FROM json_each(?))",
+                                (json.dumps(list(quantidades)),))
+            precos = dict(self.cursor.fetchall())
+            total = sum(precos[produto_id] * quantidade for produto_id, quantidade in produtos_quantidades)
+
+            self.cursor.execute("INSERT INTO vendas (cliente_id, data, total) VALUES (?, ?, ?)",
+                                (cliente_id, int(agora.timestamp()), total))
+            venda_id = self.cursor.lastrowid
+            self.cursor.executemany("INSERT INTO venda_itens (venda_id, produto_id, quantidade, preco_unitario) VALUES (?, ?, ?, ?)",
+                                    [(venda_id, produto_id, quantidade, precos[produto_id])
+                                     for produto_id, quantidade in produtos_quantidades])
+            saidas = {produto_id: -quantidade for produto_id, quantidade in quantidades.items()}
+            self._movimentar(saidas, "venda", venda_id, agora.strftime("%Y-%m-%d %H:%M:%S"))
+            cruzamentos = self._cruzamentos_minimo(saidas)
+            self.conn.commit()
+            self._baixar_catalogo(quantidades)
+            self._notificar_alertas(cruzamentos)
+            if cliente_id:
+                self._usar_recentes("clientes", [cliente_id])
+            self._usar_recentes("produtos", quantidades)
+            return total
+        except sqlite3.Error:
+            self.conn.rollback()
+            return None
+
+    def listar_os(self, inicio=None, fim=None, antes=None, limite=None):
+        return self.cursor_os(None, inicio, fim, antes, limite).fetchall()
+
+    def cursor_busca(self, query, limit=50, tipo=None):
+        expressao = _expressao_busca(query, tipo)
+        if expressao is None:
+            return self._consultar(ResultadoBusca, "SELECT tipo, rowid / 4, conteudo FROM busca WHERE 0")
+        return self._consultar(ResultadoBusca,
+                               "SELECT tipo, rowid / 4, conteudo FROM busca WHERE busca MATCH ? ORDER BY rank LIMIT ?",
+                               (expressao, limit))
+
+    def search(self, query, limit=50):
+        return self.cursor_busca(query, limit).fetchall()
+
+    # Sugestões dos campos de cliente e produto: sem texto, os usados por
+    # último; com texto, as primeiras ocorrências no índice de busca
+    def sugestoes_clientes(self, texto="", limite=LIMITE_SUGESTOES):
+        return self._sugestoes(Cliente, "clientes", "cliente", "c.id, c.nome, c.telefone", texto, limite)
+
+    def sugestoes_produtos(self, texto="", limite=LIMITE_SUGESTOES):
+        return self._sugestoes(Produto, "produtos", "produto", "p.id, p.codigo, p.descricao, p.quantidade, p.preco_venda",
+                               texto, limite)
+
+    def _sugestoes(self, tipo_linha, tabela, tipo, colunas, texto, limite):
+        expressao = _expressao_busca(texto, tipo)
+        if expressao is None:
+            ids = self._carregar_recentes(tabela)[:limite]
+            linhas = {linha.id: linha for linha in getattr(self, f"cursor_{tabela}")(ids)}
+            return [linhas[i] for i in ids if i in linhas]
+        alias = tabela[0]
+        # Com um só caractere há ocorrências demais para ordenar por relevância
+        ordem = " ORDER BY rank" if len(texto.strip()) > 1 else ""
+        return self._consultar(tipo_linha, f"SELECT {colunas} FROM busca JOIN {tabela} {alias} ON {alias}.id = busca.rowid / 4 "
+                                           f"WHERE busca MATCH ?{ordem} LIMIT ?", (expressao, limite)).fetchall()
+
+    def _carregar_recentes(self, tabela):
+        if tabela not in self._recentes:
+            if tabela == "clientes":
+                sql = """SELECT cliente_id FROM (
+                             SELECT * FROM (SELECT cliente_id, data FROM ordens_servico ORDER BY id DESC LIMIT ?)
+                             UNION ALL
+                             SELECT * FROM (SELECT cliente_id, data FROM vendas WHERE cliente_id ORDER BY id DESC LIMIT ?)
+                         ) ORDER BY data DESC"""
+            else:
+                sql = """SELECT * FROM (SELECT produto_id FROM venda_itens ORDER BY rowid DESC LIMIT ?)
+                         UNION ALL
+                         SELECT * FROM (SELECT produto_id FROM os_pecas ORDER BY rowid DESC LIMIT ?)"""
+            # Os mesmos ids se repetem no histórico: busca alguns a mais e remove as repetições
+            ids = [linha[0] for linha in self.conn.execute(sql, (RECENTES * 4, RECENTES * 4))]
+            self._recentes[tabela] = list(dict.fromkeys(ids))[:RECENTES]
+        return self._recentes[tabela]
+
+    def _usar_recentes(self, tabela, ids):
+        recentes = self._recentes.get(tabela)
+        if recentes is not None:
+            ids = list(ids)
+            self._recentes[tabela] = (ids + [i for i in recentes if i not in ids])[:RECENTES]
+
+    def relatorio_estoque_baixo(self):
+        return self.cursor_estoque_baixo().fetchall()
+
+    def relatorio_vendas(self, inicio=None, fim=None, antes=None, limite=None):
+        return self.cursor_vendas(None, inicio, fim, antes, limite).fetchall()
+
+    # Resumos de vendas, peças de OS e mão de obra (períodos AAAA-MM-DD ou AAAA-MM)
+    def resumo_diario(self, inicio, fim):
+        return self._consultar(ResumoPeriodo, f"SELECT dia, {', '.join(COLUNAS_RESUMO)} FROM resumo_diario "
+                                              "WHERE dia BETWEEN ? AND ? ORDER BY dia", (inicio, fim)).fetchall()
+
+    def resumo_mensal(self, inicio="", fim="9999-12"):
+        return self._consultar(ResumoPeriodo, f"SELECT mes, {', '.join(COLUNAS_RESUMO)} FROM resumo_mensal "
+                                              "WHERE mes BETWEEN ? AND ? ORDER BY mes", (inicio, fim)).fetchall()
+
+    def resumo_produtos(self, inicio, fim):
+        # Totais de cada produto nos meses informados
+        somas = ", ".join(f"SUM({c})" for c in COLUNAS_RESUMO_PRODUTOS)
+        return self._consultar(ResumoProduto, f"SELECT produto_id, {somas} FROM resumo_produtos "
+                                              "WHERE mes BETWEEN ? AND ? GROUP BY produto_id", (inicio, fim)).fetchall()
+
+    def arquivar_lote(self, limite, lote=TAMANHO_LOTE_ARQUIVAMENTO):
+        """Move para o arquivo até lote OS concluídas e lote vendas com data < limite
+        (com os itens); devolve quantas linhas de cada tabela saíram do banco"""
+        return _arquivar_lote(self.conexoes.caminho, limite, lote)
+
+    def reconstruir_resumos(self):
+        # Recalcula os resumos a partir de todo o histórico, em uma transação
+        try:
+            self.cursor.execute("BEGIN")
+            _reconstruir_resumos(self.cursor, origens=_origens_com_arquivo(self.conn) if self.conexoes.arquivo_anexado() else None)
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+
+    # Sincronização entre filiais
+    def filial(self):
+        if self._filial is None:
+            self._filial = self.conn.execute("SELECT filial FROM sincronizacao").fetchone()[0]
+        return self._filial
+
+    def lote_sincronizacao(self, par):
+        """Alterações que a filial par ainda não confirmou ter recebido daqui
+        (todas as linhas no primeiro lote), agrupadas por tabela"""
+        filial = self.filial()
+        if par == filial:
+            raise ValueError("A filial de destino é esta mesma")
+        try:
+            self.cursor.execute("BEGIN IMMEDIATE")
+            _dobrar_versoes(self.cursor)
+            ate = self.conn.execute("SELECT dobrado_ate FROM sincronizacao").fetchone()[0]
+            recebido, confirmado = self.conn.execute(
+                "SELECT recebido, confirmado FROM pares_sincronizacao WHERE filial = ?", (par,)).fetchone() or (None, None)
+            tabelas = {}
+            for tabela in TABELAS_SINCRONIZACAO:
+                colunas = _colunas_sincronizadas(self.conn, tabela)
+                linhas = [list(linha) for linha in self.conn.execute(
+                    _sql_lote(tabela, colunas, confirmado is not None),
+                    {"filial": filial, "tabela": tabela, "par": par, "confirmado": confirmado})]
+                if linhas:
+                    tabelas[tabela] = {"colunas": colunas, "linhas": linhas}
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+        # recebido: última alteração de par aplicada aqui, que par passa a dar como confirmada
+        return {"versao": VERSAO_LOTE, "origem": filial, "destino": par, "ate": ate, "recebido": recebido,
+                "tabelas": tabelas}
+
+    def _registro_sincronizado(self, tabela, uid):
+        # (id local da linha ou None, se ela está no arquivo)
+        conn = self.conn
+        prefixo, _, numero = uid.rpartition(":")
+        condicao, valor = ("id = ? AND uid IS NULL", int(numero)) if prefixo == self.filial() else ("uid = ?", uid)
+        linha = conn.execute(f"SELECT id FROM {tabela} WHERE {condicao}", (valor,)).fetchone()
+        if linha:
+            return linha[0], False
+        arquivado = (tabela in TABELAS_ARQUIVO and self.conexoes.arquivo_anexado() and
+                     conn.execute(f"SELECT 1 FROM arquivo.{tabela} WHERE {condicao}", (valor,)).fetchone() is not None)
+        return None, arquivado
+
+    def _possui_dependentes(self, tabela, registro):
+        for filho, referencias in REFERENCIAS.items():
+            for coluna, pai in referencias.items():
+                if pai != tabela:
+                    continue
+                origens = [filho] + ([f"arquivo.{filho}"] if filho in TABELAS_ARQUIVO and self.conexoes.arquivo_anexado() else [])
+                if any(self.conn.execute(f"SELECT 1 FROM {origem} WHERE {coluna} = ? LIMIT 1", (registro,)).fetchone()
+                       for origem in origens):
+                    return True
+        return False
+
+    def _reenviar(self, tabela, ids):
+        # Registra as linhas, e as que dependem delas, como alteradas aqui
+        ids = json.dumps(ids)
+        self.conn.execute(f"UPDATE {tabela} SET id = id WHERE id IN (SELECT value FROM json_each(?))", (ids,))
+        for filho, referencias in REFERENCIAS.items():
+            for coluna, pai in referencias.items():
+                if pai == tabela:
+                    dependentes = [linha[0] for linha in self.conn.execute(
+                        f"SELECT id FROM {filho} WHERE {coluna} IN (SELECT value FROM json_each(?))", (ids,))]
+                    if dependentes:
+                        self._reenviar(filho, dependentes)
+
+    def _aplicar_alteracao(self, tabela, colunas, linha):
+        # Devolve (situação, mensagem de erro)
+        conn, cursor, filial = self.conn, self.cursor, self.filial()
+        uid, operacao, momento, origem, seq = linha[:5]
+        registro, arquivado = self._registro_sincronizado(tabela, uid)
+        if arquivado:
+            return "ignorada", None
+        local = conn.execute("SELECT operacao, momento, COALESCE(filial, ?), seq FROM versoes WHERE tabela = ? AND uid = ?",
+                             (filial, tabela, uid)).fetchone()
+        if local is None and registro is not None:
+            # Linha anterior ao registro de alterações
+            local = ("I", 0, filial, 0)
+        if local and (local[0] == "A" or (momento, origem, seq) <= tuple(local[1:])):
+            return "ignorada", None
+        antes = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM alteracoes").fetchone()[0]
+        if operacao == "D":
+            if registro is None:
+                # Exclusão de linha que não chegou aqui: fica só a versão, para as outras filiais
+                cursor.execute("INSERT INTO alteracoes (tabela, registro, operacao, uid, momento, filial, seq_origem) "
+                               "VALUES (?, 0, 'D', ?, ?, ?, ?)", (tabela, uid, momento, origem, seq))
+                return "aplicada", None
+            if self._possui_dependentes(tabela, registro):
+                # A linha continua aqui e volta para as outras filiais como alteração
+                # local, com versão maior que a da exclusão; as dependentes voltam
+                # junto, porque a filial que excluiu a linha recusou as que chegaram depois
+                self._reenviar(tabela, [registro])
+                cursor.execute("UPDATE alteracoes SET momento = MAX(momento, ?) WHERE seq > ?", (momento + 1, antes))
+                return "rejeitada", f"{tabela} {uid}: excluída na filial {origem}, mas possui registros dependentes"
+            cursor.execute(f"DELETE FROM {tabela} WHERE id = ?", (registro,))
+        else:
+            valores = dict(zip(colunas, linha[5:]))
+            for coluna, referencia in REFERENCIAS.get(tabela, {}).items():
+                if valores.get(coluna) is not None:
+                    referenciado, _ = self._registro_sincronizado(referencia, valores[coluna])
+                    if referenciado is None:
+                        return "rejeitada", f"{tabela} {uid}: {coluna} {valores[coluna]} não encontrado"
+                    valores[coluna] = referenciado
+            try:
+                if registro is not None:
+                    atribuicoes = ", ".join(f"{coluna} = ?" for coluna in valores)
+                    cursor.execute(f"UPDATE {tabela} SET {atribuicoes} WHERE id = ?", list(valores.values()) + [registro])
+                else:
+                    valores.update(COLUNAS_LOCAIS.get(tabela, {}))
+                    prefixo, _, numero = uid.rpartition(":")
+                    if prefixo == filial:
+                        valores["id"] = int(numero)
+                    else:
+                        valores["uid"] = uid
+                    cursor.execute(f"INSERT INTO {tabela} ({', '.join(valores)}) VALUES ({', '.join('?' * len(valores))})",
+                                   list(valores.values()))
+                    registro = cursor.lastrowid
+                if tabela == "ordens_servico":
+                    cursor.execute("UPDATE ordens_servico SET total = ROUND(total_pecas + COALESCE(mao_obra, 0), 2) "
+                                   "WHERE id = ?", (registro,))
+            except sqlite3.IntegrityError as e:
+                return "rejeitada", f"{tabela} {uid}: {e}"
+        # A alteração gravada leva a versão de origem; as causadas pelos gatilhos
+        # (totais da OS) não são enviadas
+        cursor.execute("UPDATE alteracoes SET momento = ?, filial = ?, seq_origem = ?, "
+                       "operacao = CASE WHEN tabela = ? AND registro = ? THEN operacao ELSE 'T' END WHERE seq > ?",
+                       (momento, origem, seq, tabela, registro, antes))
+        return "aplicada", None
+
+    def aplicar_sincronizacao(self, lote, tamanho=LOTE_SINCRONIZACAO):
+        """Grava um lote de lote_sincronizacao() de outra filial; devolve quantas
+        alterações foram aplicadas, ignoradas (versão local igual ou mais nova) e rejeitadas"""
+        inicio = time.perf_counter()
+        if lote.get("versao") != VERSAO_LOTE:
+            raise ValueError(f"Versão de lote desconhecida: {lote.get('versao')}")
+        if lote["origem"] == self.filial():
+            raise ValueError("O lote foi gerado por esta filial")
+        # Inclusões e alterações das tabelas pai para as filhas; exclusões no sentido inverso
+        alteracoes = []
+        for exclusoes, tabelas in ((False, TABELAS_SINCRONIZACAO), (True, TABELAS_SINCRONIZACAO[::-1])):
+            for tabela in tabelas:
+                dados = lote["tabelas"].get(tabela)
+                if not dados:
+                    continue
+                desconhecidas = set(dados["colunas"]) - set(_colunas_sincronizadas(self.conn, tabela))
+                if desconhecidas:
+                    raise ValueError(f"Colunas desconhecidas em {tabela}: {', '.join(sorted(desconhecidas))}")
+                alteracoes.extend((tabela, dados["colunas"], linha) for linha in dados["linhas"]
+                                  if (linha[1] == "D") == exclusoes)
+        relatorio = {"aplicadas": 0, "ignoradas": 0, "rejeitadas": 0, "erros": []}
+        try:
+            for i in range(0, len(alteracoes), tamanho):
+                self.cursor.execute("BEGIN IMMEDIATE")
+                # As alterações locais ainda não consolidadas também contam nos conflitos
+                _dobrar_versoes(self.cursor)
+                for tabela, colunas, linha in alteracoes[i:i + tamanho]:
+                    situacao, erro = self._aplicar_alteracao(tabela, colunas, linha)
+                    relatorio[situacao + "s"] += 1
+                    if erro:
+                        relatorio["erros"].append(erro)
+                self.conn.commit()
+            self.cursor.execute("BEGIN IMMEDIATE")
+            self.cursor.execute("""
+                INSERT INTO pares_sincronizacao (filial, recebido, confirmado, momento) VALUES (?, ?, ?, ?)
+                ON CONFLICT (filial) DO UPDATE SET recebido = MAX(recebido, excluded.recebido),
+                    confirmado = MAX(COALESCE(confirmado, excluded.confirmado), COALESCE(excluded.confirmado, confirmado)),
+                    momento = excluded.momento
+            """, (lote["origem"], lote["ate"], lote["recebido"] if lote["destino"] == self.filial() else None,
+                  int(time.time())))
+            _dobrar_versoes(self.cursor)
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+        self.invalidar_catalogo()
+        self.recontar_alertas()
+        return dict(relatorio, segundos=round(time.perf_counter() - inicio, 3))
+
+# Métodos medidos pelo perfil: os públicos, menos os de controle do próprio perfil
+METODOS_PERFIL = [nome for nome in dir(Database) if not nome.startswith("_") and callable(getattr(Database, nome))
+                  and nome not in ("close", "ativar_perfil", "desativar_perfil", "perfil_ativo", "perfil_consultas",
+                                   "limpar_perfil")]
+
+# Modo servidor: os valores (pedidos e respostas) trafegam em JSON; linhas (namedtuples) levam o nome
+# do tipo e listas de linhas do mesmo tipo são enviadas como uma tabela compacta
+def codificar_valor(valor):
+    if isinstance(valor, tuple) and hasattr(valor, "_fields"):
+        return {"$linha": type(valor).__name__, "v": [codificar_valor(v) for v in valor]}
+    if isinstance(valor, (list, tuple)):
+        if valor and hasattr(valor[0], "_fields") and all(type(v) is type(valor[0]) for v in valor):
+            return {"$linhas": type(valor[0]).__name__, "v": [[codificar_valor(c) for c in v] for v in valor]}
+        return [codificar_valor(v) for v in valor]
+    if isinstance(valor, (set, frozenset)):
+        # Conjuntos de ids (alterações da visão) vão como listas
+        return [codificar_valor(v) for v in valor]
+    if isinstance(valor, dict):
+        return {chave: codificar_valor(v) for chave, v in valor.items()}
+    return valor
+
+def _decodificar_objeto(objeto):
+    if "$linha" in objeto:
+        return tuple.__new__(TIPOS_LINHA[objeto["$linha"]], objeto["v"])
+    if "$linhas" in objeto:
+        tipo = TIPOS_LINHA[objeto["$linhas"]]
+        return [tuple.__new__(tipo, linha) for linha in objeto["v"]]
+    return objeto
+
+def decodificar_json(dados):
+    return json.loads(dados, object_hook=_decodificar_objeto)
+
+class ErroRemoto(sqlite3.Error):
+    pass
+
+# Conexões HTTP mantidas abertas (keep-alive) e reaproveitadas entre chamadas
+# de qualquer thread; no máximo "tamanho" requisições simultâneas
+class PoolConexoes:
+    def __init__(self, url, tamanho=4, timeout=30, token=None):
+        partes = urlsplit(url)
+        self.host = partes.hostname or "127.0.0.1"
+        self.porta = partes.port or 80
+        self.timeout = timeout
+        self.cabecalhos = {"Content-Type": "application/json"}
+        if token:
+            # Libera as operações de administração (perfil, arquivamento, sincronização)
+            self.cabecalhos["Authorization"] = f"Bearer {token}"
+        self._livres = queue.LifoQueue()
+        self._vagas = threading.BoundedSemaphore(tamanho)
+
+    def requisitar(self, caminho, pedido):
+        # Importado só no modo cliente, para não atrasar a abertura local
+        import http.client
+        corpo = json.dumps(codificar_valor(pedido), ensure_ascii=False).encode("utf-8")
+        with self._vagas:
+            for tentativa in range(2):
+                try:
+                    conn = self._livres.get_nowait()
+                except queue.Empty:
+                    conn = http.client.HTTPConnection(self.host, self.porta, timeout=self.timeout)
+                try:
+                    conn.request("POST", caminho, corpo, self.cabecalhos)
+                    resposta = conn.getresponse()
+                    dados = resposta.read()
+                except (OSError, http.client.HTTPException) as e:
+                    # Conexão ociosa fechada pelo servidor: tenta uma vez com outra
+                    conn.close()
+                    if tentativa:
+                        raise ErroRemoto(f"Servidor indisponível: {e}")
+                    continue
+                self._livres.put(conn)
+                break
+        resultado = decodificar_json(dados)
+        if resposta.status != 200:
+            if resultado.get("tipo") == "ValueError":
+                raise ValueError(resultado["erro"])
+            raise ErroRemoto(resultado.get("erro", f"HTTP {resposta.status}"))
+        return resultado
+
+    # Mesma interface do GerenciadorConexoes usada pelas threads de trabalho
+    def fechar_thread(self):
+        pass
+
+    def fechar(self):
+        while True:
+            try:
+                self._livres.get_nowait().close()
+            except queue.Empty:
+                break
+
+# Cursor paginado aberto no servidor
+class CursorRemoto:
+    def __init__(self, pool, metodo, args, kwargs):
+        self.pool = pool
+        self.id = None
+        self._metodo = (metodo, args, kwargs)
+        self._linhas = []
+        self._esgotado = False
+
+    def _buscar(self, tamanho):
+        if self.id is None:
+            metodo, args, kwargs = self._metodo
+            resposta = self.pool.requisitar("/cursor", {"metodo": metodo, "args": args, "kwargs": kwargs,
+                                                        "tamanho": tamanho})
+            self.id = resposta["cursor"]
+        else:
+            resposta = self.pool.requisitar("/cursor/proximos", {"cursor": self.id, "tamanho": tamanho})
+        self._esgotado = resposta["esgotado"]
+        return resposta["linhas"]
+
+    def fetchmany(self, tamanho=1):
+        if not self._esgotado and len(self._linhas) < tamanho:
+            self._linhas.extend(self._buscar(tamanho - len(self._linhas)))
+        lote, self._linhas = self._linhas[:tamanho], self._linhas[tamanho:]
+        return lote
+
+    def fetchall(self):
+        return list(self)
+
+    def __iter__(self):
+        while True:
+            lote = self.fetchmany(TAMANHO_PAGINA)
+            yield from lote
+            if len(lote) < TAMANHO_PAGINA:
+                return
+
+    def close(self):
+        if self.id is not None and not self._esgotado:
+            self.pool.requisitar("/cursor/fechar", {"cursor": self.id})
+        self._esgotado = True
+
+# Database que repassa cada operação a um servidor (servidor.py). Os métodos
+# cursor_* devolvem cursores paginados no servidor; os demais, o resultado
+class DatabaseRemota:
+    def __init__(self, url, conexoes=4, token=None):
+        self.conexoes = PoolConexoes(url, conexoes, token=token)
+        self.conn = None
+        self._alertas = None
+        self.ao_alterar_alertas = None
+
+    def __getattr__(self, nome):
+        if nome.startswith("_") or not callable(getattr(Database, nome, None)):
+            raise AttributeError(nome)
+        if nome.startswith("cursor_"):
+            return lambda *args, **kwargs: CursorRemoto(self.conexoes, nome, args, kwargs)
+        return lambda *args, **kwargs: self._chamar(nome, *args, **kwargs)
+
+    def _chamar(self, metodo, *args, **kwargs):
+        return self.conexoes.requisitar("/chamar", {"metodo": metodo, "args": args, "kwargs": kwargs})["resultado"]
+
+    def close(self):
+        self.conexoes.fechar()
+
+    # A quantidade de alertas fica em cache também no cliente
+    def contagem_alertas(self):
+        if self._alertas is None:
+            self._alertas = self._chamar("contagem_alertas")
+        return self._alertas
+
+    def recontar_alertas(self):
+        anterior = self._alertas
+        self._chamar("recontar_alertas")
+        self._alertas = None
+        if self.contagem_alertas() != anterior and self.ao_alterar_alertas:
+            self.ao_alterar_alertas(self._alertas)
+
+# Análise dos resumos mensais com NumPy: mês de referência comparado com o
+# anterior, com o mesmo mês do ano anterior e 12 meses contra os 12 anteriores
+TOP_PRODUTOS = 10
+
+def _mes_deslocado(mes, meses):
+    ano, numero = map(int, mes.split("-"))
+    indice = ano * 12 + numero - 1 + meses
+    return f"{indice // 12:04d}-{indice % 12 + 1:02d}"
+
+def _variacao(atual, anterior):
+    return round((atual - anterior) / anterior * 100, 1) if anterior else None
+
+def analisar_resumos(db, referencia=None, top=TOP_PRODUTOS):
+    """Indicadores do mês de referência (AAAA-MM, padrão o mês atual) e os produtos de maior receita em 12 meses"""
+    try:
+        import numpy as np
+    except ImportError:
+        raise ValueError("A análise de vendas precisa do pacote numpy (pip install numpy)")
+    referencia = referencia or datetime.now().strftime("%Y-%m")
+    meses = [_mes_deslocado(referencia, i) for i in range(-23, 1)]
+    resumos = {linha.periodo: linha[1:] for linha in db.resumo_mensal(meses[0], meses[-1])}
+    vazio = (0,) * len(COLUNAS_RESUMO)
+    dados = np.array([resumos.get(mes, vazio) for mes in meses], dtype=float)
+    coluna = {nome: dados[:, i] for i, nome in enumerate(COLUNAS_RESUMO)}
+
+    receita = coluna["receita_vendas"] + coluna["receita_pecas_os"] + coluna["mao_obra"]
+    custo = coluna["custo_vendas"] + coluna["custo_pecas_os"]
+    series = {
+        "receita": receita,
+        "custo": custo,
+        "margem": receita - custo,
+        "receita_vendas": coluna["receita_vendas"],
+        "receita_pecas_os": coluna["receita_pecas_os"],
+        "mao_obra": coluna["mao_obra"],
+        "vendas": coluna["vendas"],
+        "ordens": coluna["ordens"],
+    }
+    comparacoes = {}
+    for nome, serie in series.items():
+        atual, anterior, ano_anterior = serie[-1], serie[-2], serie[-13]
+        ultimos, anteriores = serie[12:].sum(), serie[:12].sum()
+        comparacoes[nome] = {
+            "mes": round(float(atual), 2),
+            "mes_anterior": round(float(anterior), 2),
+            "variacao_mes": _variacao(atual, anterior),
+            "mesmo_mes_ano_anterior": round(float(ano_anterior), 2),
+            "variacao_ano": _variacao(atual, ano_anterior),
+            "12_meses": round(float(ultimos), 2),
+            "12_meses_anteriores": round(float(anteriores), 2),
+            "variacao_12_meses": _variacao(ultimos, anteriores),
+        }
+
+    # Produtos dos últimos 12 meses, ordenados pela receita
+    top_produtos = []
+    linhas = db.resumo_produtos(meses[12], meses[-1])
+    if linhas:
+        valores = np.array(linhas, dtype=float)
+        produtos, quantidade, receita_produto, custo_produto = valores.T
+        ordem = np.argsort(-receita_produto, kind="stable")[:top]
+        for i in ordem:
+            produto = db.obter_produto(int(produtos[i]))
+            margem = receita_produto[i] - custo_produto[i]
+            top_produtos.append({
+                "produto_id": int(produtos[i]),
+                "codigo": produto.codigo if produto else "",
+                "descricao": produto.descricao if produto else "(excluído)",
+                "quantidade": int(quantidade[i]),
+                "receita": round(float(receita_produto[i]), 2),
+                "margem": round(float(margem), 2),
+                "margem_percentual": round(float(margem / receita_produto[i] * 100), 1) if receita_produto[i] else None,
+            })
+
+    return {
+        "referencia": referencia,
+        "meses": meses[12:],
+        "series": {nome: [round(float(v), 2) for v in serie[12:]] for nome, serie in series.items()},
+        "comparacoes": comparacoes,
+        "top_produtos": top_produtos,
+    }
+
+# Regras de validação compartilhadas pelos cadastros e pela importação
+REGEX_PLACA = re.compile(r'^[A-Z]{3}\d{4}$|^[A-Z]{3}\d[A-Z]\d{2}$')
+
+def validar_telefone(telefone):
+    return len(telefone) == 11 and telefone.isdigit()
+
+def validar_placa(placa):
+    return bool(REGEX_PLACA.match(placa))
+
+# Importação de dados em lote (CSV ou XLSX). O arquivo é lido linha a linha e
+# gravado em transações de TAMANHO_LOTE_IMPORTACAO linhas com executemany
+TAMANHO_LOTE_IMPORTACAO = 1000
+# Quantidade máxima de linhas rejeitadas guardadas para o relatório
+MAX_REJEITADAS = 1000
+
+def _numero(texto, tipo=float):
+    # Aceita vírgula decimal e inteiros vindos de planilhas como "10.0"
+    valor = float(str(texto).strip().replace(",", "."))
+    if tipo is int and not valor.is_integer():
+        raise ValueError(texto)
+    return tipo(valor)
+
+def ler_planilha(caminho):
+    """Gera (número da linha, dicionário coluna -> valor) de um arquivo CSV ou XLSX"""
+    if caminho.lower().endswith(".xlsx"):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ValueError("A importação de XLSX precisa do pacote openpyxl (pip install openpyxl)")
+        planilha = load_workbook(caminho, read_only=True, data_only=True)
+        try:
+            linhas = planilha.active.iter_rows(values_only=True)
+            cabecalho = [str(coluna or "").strip().lower() for coluna in next(linhas, ())]
+            for numero, valores in enumerate(linhas, start=2):
+                if any(valor is not None for valor in valores):
+                    yield numero, {coluna: ("" if valor is None else str(valor))
+                                   for coluna, valor in zip(cabecalho, valores)}
+        finally:
+            planilha.close()
+    else:
+        with open(caminho, newline="", encoding="utf-8-sig") as arquivo:
+            amostra = arquivo.read(4096)
+            arquivo.seek(0)
+            try:
+                dialeto = csv.Sniffer().sniff(amostra, delimiters=",;\t")
+            except csv.Error:
+                dialeto = csv.excel
+            leitor = csv.reader(arquivo, dialeto)
+            cabecalho = [coluna.strip().lower() for coluna in next(leitor, [])]
+            for numero, valores in enumerate(leitor, start=2):
+                if any(valor.strip() for valor in valores):
+                    yield numero, dict(zip(cabecalho, valores))
+
+# Conversão de uma linha importada para os parâmetros do INSERT; erros de
+# validação são informados com ValueError e a linha é rejeitada
+def _linha_produto(db, linha):
+    descricao = linha.get("descricao", "").strip()
+    if not descricao:
+        raise ValueError("descrição é obrigatória")
+    try:
+        quantidade = _numero(linha.get("quantidade", ""), int)
+        preco_custo = _numero(linha.get("preco_custo", ""))
+        preco_venda = _numero(linha.get("preco_venda", ""))
+        estoque_minimo = _numero(linha.get("estoque_minimo") or 0, int)
+    except ValueError:
+        raise ValueError("valores numéricos inválidos")
+    if quantidade < 0:
+        raise ValueError("quantidade deve ser maior ou igual a zero")
+    return (linha.get("codigo", "").strip(), descricao, quantidade, preco_custo, preco_venda, estoque_minimo)
+
+def _linha_cliente(db, linha):
+    nome = linha.get("nome", "").strip()
+    telefone = linha.get("telefone", "").strip()
+    if not nome:
+        raise ValueError("nome é obrigatório")
+    if not validar_telefone(telefone):
+        raise ValueError("telefone deve conter exatamente 11 dígitos")
+    return (nome, linha.get("cpf", "").strip(), telefone)
+
+def _linha_moto(db, linha):
+    cliente_id = linha.get("cliente_id", "").strip()
+    cpf = linha.get("cliente_cpf", "").strip()
+    if cliente_id:
+        cliente_id = int(cliente_id) if cliente_id.isdigit() and db.cliente_existe(int(cliente_id)) else None
+    elif cpf:
+        cliente_id = db.cliente_por_cpf(cpf)
+    if not cliente_id:
+        raise ValueError("cliente não encontrado")
+    marca = linha.get("marca", "").strip()
+    modelo = linha.get("modelo", "").strip()
+    placa = linha.get("placa", "").strip().upper()
+    if not marca or not modelo:
+        raise ValueError("marca e modelo são obrigatórios")
+    if not validar_placa(placa):
+        raise ValueError("formato de placa inválido")
+    return (cliente_id, marca, modelo, placa, linha.get("ano", "").strip(), linha.get("cor", "").strip())
+
+TIPOS_IMPORTACAO = {
+    "produtos": _linha_produto,
+    "clientes": _linha_cliente,
+    "motos": _linha_moto,
+}
+
+def importar_arquivo(db, tipo, caminho, progresso=None, tamanho_lote=TAMANHO_LOTE_IMPORTACAO):
+    """Importa o arquivo para a tabela do tipo informado e devolve o relatório da importação"""
+    converter = TIPOS_IMPORTACAO[tipo]
+    relatorio = {"importados": 0, "rejeitados": 0, "erros": [], "segundos": 0.0, "linhas_por_segundo": 0.0}
+    inicio = time.perf_counter()
+    lote = []
+
+    def gravar():
+        db.cadastrar_lote(tipo, lote)
+        relatorio["importados"] += len(lote)
+        lote.clear()
+        if progresso:
+            progresso(relatorio["importados"], relatorio["rejeitados"], time.perf_counter() - inicio)
+
+    for numero, linha in ler_planilha(caminho):
+        try:
+            lote.append(converter(db, linha))
+        except ValueError as e:
+            relatorio["rejeitados"] += 1
+            if len(relatorio["erros"]) < MAX_REJEITADAS:
+                relatorio["erros"].append((numero, str(e)))
+            continue
+        if len(lote) >= tamanho_lote:
+            gravar()
+    if lote:
+        gravar()
+
+    relatorio["segundos"] = time.perf_counter() - inicio
+    total = relatorio["importados"] + relatorio["rejeitados"]
+    relatorio["linhas_por_segundo"] = total / relatorio["segundos"] if relatorio["segundos"] else 0.0
+    return relatorio
+
+# Quantidade de linhas buscadas do cursor a cada rolagem da tabela
+TAMANHO_PAGINA = 200
+# Quantidade de linhas usadas para calcular a largura das colunas
+AMOSTRA_COLUNAS = 100
+
+ROTULOS_BUSCA = {"cliente": "Cliente", "moto": "Moto", "produto": "Produto", "os": "Ordem de Serviço"}
+
+def formatar_moeda(valor):
+    return f"R$ {valor:.2f}" if valor is not None else ""
+
+def formatar_data(valor):
+    # Datas gravadas em segundos desde 1970, exibidas na hora local
+    return datetime.fromtimestamp(valor).strftime("%Y-%m-%d %H:%M:%S") if valor is not None else ""
+
+# Períodos do filtro das visões de OS e vendas: nome -> função que recebe o
+# início do dia atual e devolve o início e o fim (exclusivo) do período
+def _mes_seguinte(dia):
+    return (dia.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+PERIODOS = {
+    "Todo o período": None,
+    "Hoje": lambda hoje: (hoje, hoje + timedelta(days=1)),
+    "Últimos 7 dias": lambda hoje: (hoje - timedelta(days=6), hoje + timedelta(days=1)),
+    "Últimos 30 dias": lambda hoje: (hoje - timedelta(days=29), hoje + timedelta(days=1)),
+    "Este mês": lambda hoje: (hoje.replace(day=1), _mes_seguinte(hoje)),
+    "Mês anterior": lambda hoje: ((hoje.replace(day=1) - timedelta(days=1)).replace(day=1), hoje.replace(day=1)),
+    "Este ano": lambda hoje: (hoje.replace(month=1, day=1), hoje.replace(year=hoje.year + 1, month=1, day=1)),
+}
+
+def filtro_periodo(periodo, agora=None):
+    """Argumentos inicio e fim (segundos desde 1970) de cursor_os e cursor_vendas para o período"""
+    intervalo = PERIODOS[periodo]
+    if intervalo is None:
+        return {}
+    hoje = (agora or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+    inicio, fim = intervalo(hoje)
+    return {"inicio": int(inicio.timestamp()), "fim": int(fim.timestamp())}
+
+# Visões da janela principal
+class Visao(str, Enum):
+    OS = "os"
+    ESTOQUE_BAIXO = "estoque_baixo"
+    VENDAS = "vendas"
+    PRODUTOS = "produtos"
+    CLIENTES = "clientes"
+    FUNCIONARIOS = "funcionarios"
+    BUSCA = "busca"
+
+# Listas e relatórios da janela principal: título, cabeçalhos, método do
+# Database que abre o cursor da consulta e formatadores de coluna
+RELATORIOS = {
+    Visao.OS: ("Ordens de Serviço", ["ID", "Cliente", "Moto", "Descrição", "Status", "Data", "Total"], "cursor_os",
+               {5: formatar_data, 6: formatar_moeda}),
+    Visao.ESTOQUE_BAIXO: ("Relatório de Estoque Baixo", ["ID", "Código", "Descrição", "Quantidade"], "cursor_estoque_baixo", {}),
+    Visao.VENDAS: ("Relatório de Vendas", ["ID", "Cliente", "Data", "Total"], "cursor_vendas",
+                   {2: formatar_data, 3: formatar_moeda}),
+    Visao.PRODUTOS: ("Lista de Produtos", ["ID", "Código", "Descrição", "Estoque", "Preço Venda"], "cursor_produtos", {}),
+    Visao.CLIENTES: ("Lista de Clientes", ["ID", "Nome", "Telefone"], "cursor_clientes", {}),
+    Visao.FUNCIONARIOS: ("Lista de Funcionários", ["ID", "Nome", "Função", "Telefone", "Status"], "cursor_funcionarios", {}),
+}
+
+# Tabelas cujas alterações afetam cada visão: a tabela principal traz o id da
+# própria linha; as relacionadas são traduzidas pela coluna que as referencia
+ALTERACOES_VISOES = {
+    Visao.OS: ("ordens_servico", {"clientes": "cliente_id", "motos": "moto_id"}),
+    Visao.ESTOQUE_BAIXO: ("produtos", {}),
+    Visao.VENDAS: ("vendas", {"clientes": "cliente_id"}),
+    Visao.PRODUTOS: ("produtos", {}),
+    Visao.CLIENTES: ("clientes", {}),
+    Visao.FUNCIONARIOS: ("funcionarios", {}),
+}
+# Visões em ordem decrescente de data, filtradas pelo período escolhido: linhas
+# novas entram no topo
+VISOES_RECENTES_PRIMEIRO = {Visao.OS, Visao.VENDAS}
+# Intervalo da verificação de alterações e quantidade acima da qual a visão é recarregada
+INTERVALO_ALTERACOES_MS = 1000
+LIMITE_ALTERACOES_VISAO = 500
+
+def calcular_alteracoes(db, ultima, visao, filtro):
+    """Alterações gravadas depois de ultima, na thread do banco: atualiza os caches
+    e devolve {"ultima", "recarregar", "atuais", "removidos"} para a visão aberta"""
+    resultado = {"ultima": ultima, "recarregar": False, "atuais": {}, "removidos": set()}
+    alteracoes = db.alteracoes_desde(ultima, LIMITE_ALTERACOES_VISAO)
+    if not alteracoes:
+        return resultado
+    if len(alteracoes) > LIMITE_ALTERACOES_VISAO:
+        # Muitas alterações: a visão é recarregada
+        resultado["ultima"] = db.ultima_alteracao()
+        resultado["recarregar"] = True
+        db.invalidar_catalogo()
+        db.recontar_alertas()
+        return resultado
+    resultado["ultima"] = alteracoes[-1].seq
+    por_tabela = {}
+    for alteracao in alteracoes:
+        por_tabela.setdefault(alteracao.tabela, set()).add(alteracao.registro)
+    if "produtos" in por_tabela:
+        db.atualizar_catalogo(por_tabela["produtos"])
+        db.recontar_alertas()
+
+    if visao not in ALTERACOES_VISOES:
+        return resultado
+    principal, relacionadas = ALTERACOES_VISOES[visao]
+    ids = set(por_tabela.get(principal, ()))
+    for tabela, coluna in relacionadas.items():
+        if tabela in por_tabela:
+            ids.update(db.ids_relacionados(principal, coluna, por_tabela[tabela]))
+    if ids:
+        # Com o mesmo período da visão: linhas fora dele saem da lista
+        consulta = getattr(db, RELATORIOS[visao][2])
+        resultado["atuais"] = {linha[0]: linha for linha in consulta(ids, **filtro)}
+        resultado["removidos"] = ids - resultado["atuais"].keys()
+    return resultado
+
+# Exportação de relatórios: o cursor é percorrido linha a linha e gravado no
+# arquivo aos poucos, então a memória usada não depende do tamanho do relatório
+INTERVALO_PROGRESSO_EXPORTACAO = 5000
+
+def _exportar_csv(linhas, cabecalhos, formatadores, caminho, progresso):
+    with open(caminho, "w", newline="", encoding="utf-8-sig") as arquivo:
+        escritor = csv.writer(arquivo, delimiter=";")
+        escritor.writerow(cabecalhos)
+        total = 0
+        for total, linha in enumerate(linhas, start=1):
+            escritor.writerow([formatadores[coluna](valor) if coluna in formatadores else "" if valor is None else valor
+                               for coluna, valor in enumerate(linha)])
+            if progresso and total % INTERVALO_PROGRESSO_EXPORTACAO == 0:
+                progresso(total)
+    return total
+
+def _exportar_pdf(linhas, titulo, cabecalhos, formatadores, caminho, progresso):
+    escritor = QPdfWriter(caminho)
+    escritor.setPageSize(QPagedPaintDevice.A4)
+    escritor.setResolution(96)
+    escritor.setTitle(titulo)
+    pintor = QPainter(escritor)
+    try:
+        metricas = pintor.fontMetrics()
+        altura_linha = metricas.height() + 4
+        largura = escritor.width()
+        altura = escritor.height()
+        largura_coluna = largura / len(cabecalhos)
+        pagina = 0
+
+        def cabecalho():
+            nonlocal pagina
+            pagina += 1
+            fonte = pintor.font()
+            fonte.setBold(True)
+            pintor.setFont(fonte)
+            pintor.drawText(0, altura_linha, f"{titulo} - página {pagina}")
+            for coluna, texto in enumerate(cabecalhos):
+                pintor.drawText(int(coluna * largura_coluna), altura_linha * 3, texto)
+            fonte.setBold(False)
+            pintor.setFont(fonte)
+            return altura_linha * 4
+
+        y = cabecalho()
+        total = 0
+        for total, linha in enumerate(linhas, start=1):
+            if y + altura_linha > altura:
+                escritor.newPage()
+                y = cabecalho()
+            y += altura_linha
+            for coluna, valor in enumerate(linha):
+                formatador = formatadores.get(coluna)
+                texto = formatador(valor) if formatador else ("" if valor is None else str(valor))
+                texto = metricas.elidedText(texto, Qt.ElideRight, int(largura_coluna) - 6)
+                pintor.drawText(int(coluna * largura_coluna), y, texto)
+            if progresso and total % INTERVALO_PROGRESSO_EXPORTACAO == 0:
+                progresso(total)
+    finally:
+        pintor.end()
+    return total
+
+def exportar_relatorio(db, relatorio, caminho, progresso=None, filtro=None):
+    """Exporta um dos RELATORIOS para CSV ou PDF (pela extensão) e devolve o número de linhas"""
+    titulo, cabecalhos, consulta, formatadores = RELATORIOS[relatorio]
+    cursor = getattr(db, consulta)(**(filtro or {}))
+    try:
+        if caminho.lower().endswith(".pdf"):
+            return _exportar_pdf(cursor, titulo, cabecalhos, formatadores, caminho, progresso)
+        # No CSV os números vão sem formatação, para as planilhas; as datas, como texto
+        datas = {coluna: formatador for coluna, formatador in formatadores.items() if formatador is formatar_data}
+        return _exportar_csv(cursor, cabecalhos, datas, caminho, progresso)
+    finally:
+        cursor.close()
+
+# Modelo de tabela com carregamento paginado: as páginas são pedidas pela
+# função buscar_pagina e entregues (na hora ou depois) por acrescentar()
+class TabelaPaginadaModel(QAbstractTableModel):
+    def __init__(self, cabecalhos, buscar_pagina, formatadores=None, parent=None):
+        super().__init__(parent)
+        self.cabecalhos = cabecalhos
+        self.buscar_pagina = buscar_pagina
+        self.formatadores = formatadores or {}
+        self.linhas = []
+        self.esgotado = False
+        self.aguardando = False
+        # Alterações de linhas ainda não carregadas: id -> linha atual (None se
+        # excluída ou já exibida), aplicadas quando a página chegar
+        self.pendentes = {}
+
+    @classmethod
+    def de_cursor(cls, cabecalhos, cursor, formatadores=None, parent=None):
+        # Leitura síncrona de um cursor aberto na própria thread da interface
+        def buscar_pagina(quantidade):
+            lote = cursor.fetchmany(quantidade)
+            model.acrescentar(lote, len(lote) < quantidade)
+        model = cls(cabecalhos, buscar_pagina, formatadores, parent)
+        model.fetchMore()
+        return model
+
+    def acrescentar(self, lote, esgotado):
+        self.aguardando = False
+        self.esgotado = esgotado
+        if self.pendentes:
+            lote = [linha for linha in (self.pendentes.pop(linha[0], linha) for linha in lote) if linha is not None]
+            if esgotado:
+                # Linhas incluídas depois da abertura da consulta vão para o fim
+                lote.extend(linha for linha in self.pendentes.values() if linha is not None)
+                self.pendentes = {}
+        if lote:
+            inicio = len(self.linhas)
+            self.beginInsertRows(QModelIndex(), inicio, inicio + len(lote) - 1)
+            self.linhas.extend(lote)
+            self.endInsertRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.linhas)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.cabecalhos)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        # Só as células visíveis são formatadas, quando a view pede
+        valor = self.linhas[index.row()][index.column()]
+        formatador = self.formatadores.get(index.column())
+        if formatador:
+            return formatador(valor)
+        return str(valor) if valor is not None else ""
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.cabecalhos[section]
+        return super().headerData(section, orientation, role)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.esgotado and not self.aguardando
+
+    def fetchMore(self, parent=QModelIndex()):
+        if self.canFetchMore(parent):
+            self.aguardando = True
+            self.buscar_pagina(TAMANHO_PAGINA)
+
+    def valor(self, row, col):
+        return self.linhas[row][col]
+
+    def aplicar_alteracoes(self, atuais, removidos, no_inicio=False):
+        """Aplica as linhas alteradas (id -> linha) e excluídas, identificadas pela primeira coluna"""
+        posicoes = {linha[0]: i for i, linha in enumerate(self.linhas)}
+        for i in sorted((posicoes[chave] for chave in removidos if chave in posicoes), reverse=True):
+            self.beginRemoveRows(QModelIndex(), i, i)
+            del self.linhas[i]
+            self.endRemoveRows()
+        if not self.esgotado:
+            self.pendentes.update((chave, None) for chave in removidos if chave not in posicoes)
+
+        posicoes = {linha[0]: i for i, linha in enumerate(self.linhas)}
+        novas = []
+        for chave, linha in atuais.items():
+            i = posicoes.get(chave)
+            if i is not None:
+                self.linhas[i] = linha
+                self.dataChanged.emit(self.index(i, 0), self.index(i, len(self.cabecalhos) - 1))
+            elif self.esgotado or no_inicio:
+                novas.append(linha)
+                if not self.esgotado:
+                    # Já exibida no topo: ignorada se a consulta aberta também a trouxer
+                    self.pendentes[chave] = None
+            else:
+                self.pendentes[chave] = linha
+        if novas:
+            inicio = 0 if no_inicio else len(self.linhas)
+            self.beginInsertRows(QModelIndex(), inicio, inicio + len(novas) - 1)
+            self.linhas[inicio:inicio] = novas
+            self.endInsertRows()
+
+# Executor de consultas em uma thread dedicada ao banco. Cada consulta aberta
+# recebe um token; as páginas voltam para a interface pelo sinal "pagina" e uma
+# consulta substituída por outra é cancelada (interrompida, se ainda estiver rodando).
+# Tarefas avulsas (tarefa()) também rodam ali e devolvem o retorno pelo sinal "resultado"
+class ExecutorBanco(QObject):
+    pagina = pyqtSignal(int, list, bool)
+    resultado = pyqtSignal(int, object)
+    erro = pyqtSignal(int, str)
+    _abrir = pyqtSignal(int, object, int)
+    _tarefa = pyqtSignal(int, object)
+    _buscar = pyqtSignal(int, int)
+    _cancelar = pyqtSignal(int)
+
+    def __init__(self, db):
+        super().__init__()
+        self.db = db
+        self._proximo_token = 0
+        self._cursores = {}
+        self._cancelados = set()
+        self._em_execucao = None
+        self._lock = threading.Lock()
+        self._conn = None
+        self._thread = QThread()
+        self.moveToThread(self._thread)
+        self._abrir.connect(self._executar)
+        self._buscar.connect(self._proxima_pagina)
+        self._cancelar.connect(self._fechar)
+        self._tarefa.connect(self._executar_tarefa)
+        self._thread.start()
+
+    # Chamados pela thread da interface
+    def abrir(self, consulta, tamanho=TAMANHO_PAGINA):
+        """Executa consulta() na thread do banco e devolve o token da consulta"""
+        self._proximo_token += 1
+        self._abrir.emit(self._proximo_token, consulta, tamanho)
+        return self._proximo_token
+
+    def tarefa(self, funcao):
+        """Executa funcao() na thread do banco; o retorno chega pelo sinal resultado"""
+        self._proximo_token += 1
+        self._tarefa.emit(self._proximo_token, funcao)
+        return self._proximo_token
+
+    def buscar(self, token, tamanho=TAMANHO_PAGINA):
+        self._buscar.emit(token, tamanho)
+
+    def cancelar(self, token):
+        with self._lock:
+            self._cancelados.add(token)
+            if self._em_execucao == token and self._conn is not None:
+                self._conn.interrupt()
+        self._cancelar.emit(token)
+
+    def encerrar(self):
+        self._thread.quit()
+        self._thread.wait()
 
-    def listar_motos(self, cliente_id):
-        self.cursor.execute("SELECT id, marca, modelo, placa FROM motos WHERE cliente_id = ?", (cliente_id,))
-        return self.cursor.fetchall()
+    # Executados na thread do banco
+    def _iniciar(self, token):
+        with self._lock:
+            if token in self._cancelados:
+                return False
+            self._em_execucao = token
+            return True
 
-    def listar_produtos(self):
-        self.cursor.execute("SELECT id, codigo, descricao, quantidade, preco_venda FROM produtos")
-        return self.cursor.fetchall()
+    def _terminar(self):
+        with self._lock:
+            self._em_execucao = None
 
-    def cadastrar_funcionario(self, nome, cpf, telefone, funcao, data_admissao, salario):
+    @pyqtSlot(int, object, int)
+    def _executar(self, token, consulta, tamanho):
+        self._conn = self.db.conn
+        if not self._iniciar(token):
+            return
         try:
-            self.cursor.execute("""INSERT INTO funcionarios (nome, cpf, telefone, funcao, data_admissao, salario) 
-                                 VALUES (?, ?, ?, ?, ?, ?)""", 
-                               (nome, cpf, telefone, funcao, data_admissao, salario))
-            self.conn.commit()
-            return self.cursor.lastrowid
-        except sqlite3.IntegrityError:
-            return None  # CPF já existe
+            self._cursores[token] = consulta()
+        except sqlite3.Error as e:
+            self._terminar()
+            if token not in self._cancelados:
+                self.erro.emit(token, str(e))
+            return
+        self._terminar()
+        self._proxima_pagina(token, tamanho)
 
-    def listar_funcionarios(self):
-        self.cursor.execute("SELECT id, nome, funcao, telefone, status FROM funcionarios ORDER BY nome")
-        return self.cursor.fetchall()
+    @pyqtSlot(int, object)
+    def _executar_tarefa(self, token, funcao):
+        try:
+            retorno = funcao()
+        except sqlite3.Error as e:
+            self.erro.emit(token, str(e))
+            return
+        self.resultado.emit(token, retorno)
 
-    def excluir_funcionario(self, funcionario_id):
+    @pyqtSlot(int, int)
+    def _proxima_pagina(self, token, tamanho):
+        cursor = self._cursores.get(token)
+        if cursor is None or not self._iniciar(token):
+            return
         try:
-            # Verificar se o funcionário tem ordens de serviço associadas
-            self.cursor.execute("SELECT COUNT(*) FROM ordens_servico WHERE cliente_id IN (SELECT id FROM clientes WHERE id = ?)", (funcionario_id,))
-            # Por enquanto, vamos permitir exclusão - pode ser expandido depois
-            self.cursor.execute("DELETE FROM funcionarios WHERE id = ?", (funcionario_id,))
-            self.conn.commit()
-            return True, "Funcionário excluído com sucesso!"
-        except Exception as e:
-            self.conn.rollback()
-            return False, f"Erro ao excluir funcionário: {str(e)}"
+            lote = cursor.fetchmany(tamanho)
+        except sqlite3.Error as e:
+            self._terminar()
+            self._fechar(token)
+            if token not in self._cancelados:
+                self.erro.emit(token, str(e))
+            return
+        self._terminar()
+        esgotado = len(lote) < tamanho
+        if esgotado:
+            self._fechar(token)
+        self.pagina.emit(token, lote, esgotado)
 
-    def verificar_estoque(self, produto_id, quantidade):
-        self.cursor.execute("SELECT quantidade FROM produtos WHERE id = ?", (produto_id,))
-        result = self.cursor.fetchone()
-        return result[0] >= quantidade if result else False
+    @pyqtSlot(int)
+    def _fechar(self, token):
+        cursor = self._cursores.pop(token, None)
+        if cursor is not None:
+            cursor.close()
+        with self._lock:
+            self._cancelados.discard(token)
 
-    def atualizar_estoque(self, produto_id, quantidade):
-        self.cursor.execute("UPDATE produtos SET quantidade = quantidade - ? WHERE id = ?", 
-                           (quantidade, produto_id))
-        self.conn.commit()
+# Aparência de todas as janelas, aplicada uma única vez na aplicação: cada
+# widget com estilo próprio é identificado pelo objectName
+ESTILO_APLICACAO = """
+    QMainWindow, QDialog {background-color: #f5f5f5;}
+    QMainWindow QPushButton {
+        background-color: #3498db;
+        color: white;
+        border: none;
+        padding: 10px;
+        border-radius: 5px;
+        font-size: 16px;
+        font-weight: bold;
+    }
+    QMainWindow QPushButton:hover {background-color: #2980b9;}
+    QMainWindow QTableView {
+        border: 1px solid #dcdcdc;
+        border-radius: 5px;
+        background-color: #ffffff;
+        gridline-color: #e0e0e0;
+    }
+    QMainWindow QTableView QHeaderView::section {
+        background-color: #3498db;
+        padding: 8px;
+        color: white;
+        font-weight: bold;
+        font-size: 14px;
+        border: 0px;
+    }
+    QLabel#titulo {font-size: 28px; font-weight: bold; color: #2c3e50;}
+    QPushButton#alertas {font-size: 14px; padding: 8px 18px; border-radius: 15px; background-color: #e74c3c; color: white; font-weight: bold;}
+    QWidget#painelBotoes {background-color: #2c3e50; border-radius: 10px;}
+    QLabel#tituloPainel {color: white; font-size: 18px; font-weight: bold;}
+    QLabel#categoria {color: #3498db; font-size: 16px; font-weight: bold; margin-top: 10px;}
+    #painelBotoes QPushButton {
+        background-color: #34495e;
+        color: white;
+        text-align: left;
+        padding: 18px 25px;
+        border-radius: 8px;
+        font-size: 13px;
+        font-weight: bold;
+        margin-left: 10px;
+        margin-right: 10px;
+    }
+    #painelBotoes QPushButton:hover {background-color: #3498db;}
+    QLabel#rotuloBusca {font-size: 14px; font-weight: bold;}
+    QLineEdit#busca {padding: 10px; border-radius: 5px; border: 1px solid #ddd; font-size: 14px;}
+    QPushButton#buscar {font-size: 14px; padding: 10px 20px;}
+    QLabel#status {color: #555; font-size: 16px; margin-top: 10px; font-weight: bold;}
+    QPushButton#editar, QPushButton#excluir, QPushButton#exportar {font-size: 14px; padding: 12px 25px; color: white; font-weight: bold;}
+    QPushButton#editar {background-color: #f39c12;}
+    QPushButton#excluir {background-color: #e74c3c;}
+    QPushButton#exportar {background-color: #27ae60;}
+    QDialog QPushButton {
+        background-color: #3498db;
+        color: white;
+        border: none;
+        padding: 8px;
+        border-radius: 4px;
+    }
+    QDialog QPushButton:hover {background-color: #2980b9;}
+    QDialog QLabel {font-weight: bold;}
+    QDialog QTableWidget {
+        border: 1px solid #dcdcdc;
+        border-radius: 5px;
+        background-color: #ffffff;
+    }
+    QLabel#total {font-size: 18px; font-weight: bold; color: #2c3e50;}
+    QPushButton#finalizar {background-color: #27ae60; font-weight: bold;}
+"""
 
-    def criar_ordem_servico(self, cliente_id, moto_id, descricao):
-        data = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.cursor.execute("INSERT INTO ordens_servico (cliente_id, moto_id, descricao, status, mao_obra, data) VALUES (?, ?, ?, ?, ?, ?)", 
-                           (cliente_id, moto_id, descricao, "Aberta", 0.0, data))
-        self.conn.commit()
-        return self.cursor.lastrowid
+def aplicar_estilo(app):
+    app.setStyle('Fusion')
+    app.setStyleSheet(ESTILO_APLICACAO)
 
-    def adicionar_peca_os(self, os_id, produto_id, quantidade):
-        if self.verificar_estoque(produto_id, quantidade):
-            self.cursor.execute("INSERT INTO os_pecas (os_id, produto_id, quantidade) VALUES (?, ?, ?)", 
-                               (os_id, produto_id, quantidade))
-            self.atualizar_estoque(produto_id, quantidade)
-            self.conn.commit()
-            return True
-        return False
+# Campo de escolha de cliente ou produto com busca incremental. A lista começa
+# com os itens usados por último; enquanto o usuário digita, as sugestões do
+# banco aparecem em um completer e a escolhida passa a ser o item atual
+INTERVALO_SUGESTOES_MS = 150
 
-    def concluir_os(self, os_id, mao_obra):
-        self.cursor.execute("UPDATE ordens_servico SET status = ?, mao_obra = ? WHERE id = ?", 
-                           ("Concluída", mao_obra, os_id))
-        self.conn.commit()
+def descrever_cliente(cliente):
+    # O telefone diferencia clientes com o mesmo nome
+    return f"{cliente.nome} ({cliente.telefone})" if cliente.telefone else cliente.nome
 
-    def calcular_total_os(self, os_id):
-        self.cursor.execute("SELECT SUM(p.preco_venda * op.quantidade) FROM os_pecas op JOIN produtos p ON op.produto_id = p.id WHERE op.os_id = ?", 
-                           (os_id,))
-        total_pecas = self.cursor.fetchone()[0] or 0
-        self.cursor.execute("SELECT mao_obra FROM ordens_servico WHERE id = ?", (os_id,))
-        mao_obra = self.cursor.fetchone()[0]
-        return total_pecas + mao_obra
+class CampoBusca(QComboBox):
+    def __init__(self, buscar, descrever, fixos=()):
+        super().__init__()
+        # buscar(texto) devolve as linhas; descrever(linha) o texto exibido;
+        # fixos são (texto, id) sempre no início da lista, como "Cliente Avulso"
+        self.buscar = buscar
+        self.descrever = descrever
+        self.fixos = list(fixos)
+        self._sugestoes = []
+        self.setEditable(True)
+        self.setInsertPolicy(QComboBox.NoInsert)
+        self.lineEdit().setPlaceholderText("Digite para buscar...")
 
-    def registrar_venda(self, cliente_id, produtos_quantidades):
-        data = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.cursor.execute("INSERT INTO vendas (cliente_id, data) VALUES (?, ?)", (cliente_id, data))
-        venda_id = self.cursor.lastrowid
-        total = 0
-        for produto_id, quantidade in produtos_quantidades:
-            if self.verificar_estoque(produto_id, quantidade):
-                self.cursor.execute("INSERT INTO venda_itens (venda_id, produto_id, quantidade) VALUES (?, ?, ?)", 
-                                   (venda_id, produto_id, quantidade))
-                self.atualizar_estoque(produto_id, quantidade)
-                self.cursor.execute("SELECT preco_venda FROM produtos WHERE id = ?", (produto_id,))
-                preco_venda = self.cursor.fetchone()[0]
-                total += preco_venda * quantidade
-            else:
-                self.conn.rollback()
-                return None
-        self.conn.commit()
-        return total
+        self.modelo_sugestoes = QStringListModel(self)
+        completer = QCompleter(self.modelo_sugestoes, self)
+        completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        completer.activated[QModelIndex].connect(self._escolher)
+        # No campo de texto, e não no combo: o combo localizaria a sugestão
+        # pelo texto, e nomes repetidos apontariam para o primeiro cliente
+        self.lineEdit().setCompleter(completer)
 
-    def listar_os(self):
-        self.cursor.execute("SELECT os.id, c.nome, m.modelo, os.descricao, os.status, os.data FROM ordens_servico os JOIN clientes c ON os.cliente_id = c.id JOIN motos m ON os.moto_id = m.id")
-        return self.cursor.fetchall()
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(INTERVALO_SUGESTOES_MS)
+        self.timer.timeout.connect(self._sugerir)
+        self.lineEdit().textEdited.connect(self.timer.start)
+        self.lineEdit().editingFinished.connect(self._restaurar_texto)
+        self.preencher(self.buscar(""))
 
-    def relatorio_estoque_baixo(self):
-        self.cursor.execute("SELECT codigo, descricao, quantidade FROM produtos WHERE quantidade <= estoque_minimo")
-        return self.cursor.fetchall()
+    def preencher(self, linhas, atual=0):
+        # Os sinais ficam bloqueados durante a troca; a mudança para o item atual
+        # é emitida uma única vez no final
+        self.blockSignals(True)
+        self.clear()
+        for texto, item_id in self.fixos:
+            self.addItem(texto, item_id)
+        for linha in linhas:
+            self.addItem(self.descrever(linha), linha.id)
+        self.setCurrentIndex(-1)
+        self.blockSignals(False)
+        self.setCurrentIndex(atual if self.count() else -1)
+
+    def _sugerir(self):
+        texto = self.lineEdit().text()
+        self._sugestoes = self.buscar(texto) if texto.strip() else []
+        self.modelo_sugestoes.setStringList([self.descrever(linha) for linha in self._sugestoes])
+        if self._sugestoes:
+            self.completer().complete()
+
+    def _escolher(self, indice):
+        self.preencher(self._sugestoes, len(self.fixos) + indice.row())
+
+    def _restaurar_texto(self):
+        # Texto digitado sem escolher uma sugestão: volta ao item atual
+        atual = self.itemText(self.currentIndex()) if self.currentIndex() >= 0 else ""
+        if self.lineEdit().text() != atual:
+            self.setEditText(atual)
 
 # Janela para cadastro de clientes
 class CadastroClienteDialog(QDialog):
@@ -302,7 +3105,7 @@ class CadastroClienteDialog(QDialog):
             QMessageBox.warning(self, "Erro", "Nome é obrigatório!")
             return
             
-        if len(telefone) != 11 or not telefone.isdigit():
+        if not validar_telefone(telefone):
             QMessageBox.warning(self, "Erro", "Telefone deve conter exatamente 11 dígitos!")
             return
             
@@ -355,6 +3158,76 @@ class CadastroProdutoDialog(QDialog):
         except ValueError:
             QMessageBox.warning(self, "Erro", "Verifique os valores numéricos!")
 
+# Janela para entrada (recebimento) de mercadoria, com a movimentação recente do produto
+DIAS_HISTORICO_ESTOQUE = 90
+
+class EntradaEstoqueDialog(QDialog):
+    def __init__(self, db):
+        super().__init__()
+        self.db = db
+        self.setWindowTitle("Entrada de Estoque")
+        self.setFixedSize(500, 500)
+
+        layout = QVBoxLayout()
+        form_layout = QFormLayout()
+
+        self.produto_combo = CampoBusca(self.db.sugestoes_produtos,
+                                        lambda produto: f"{produto.descricao} ({produto.quantidade} un)")
+        self.produto_combo.currentIndexChanged.connect(self.atualizar_historico)
+        form_layout.addRow("Produto:", self.produto_combo)
+
+        self.quantidade = QLineEdit()
+        self.quantidade.setValidator(QIntValidator(1, 999999))
+        form_layout.addRow("Quantidade:", self.quantidade)
+
+        self.preco_custo = QLineEdit()
+        self.preco_custo.setPlaceholderText("Manter o preço atual")
+        form_layout.addRow("Preço Custo:", self.preco_custo)
+        layout.addLayout(form_layout)
+
+        btn_salvar = QPushButton("Registrar Entrada")
+        btn_salvar.clicked.connect(self.salvar)
+        layout.addWidget(btn_salvar)
+
+        layout.addWidget(QLabel(f"Movimentação dos últimos {DIAS_HISTORICO_ESTOQUE} dias"))
+        self.historico_table = QTableWidget()
+        self.historico_table.setColumnCount(4)
+        self.historico_table.setHorizontalHeaderLabels(["Data", "Tipo", "Quantidade", "Referência"])
+        self.historico_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.historico_table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.historico_table)
+
+        self.setLayout(layout)
+        self.atualizar_historico()
+
+    def atualizar_historico(self):
+        produto_id = self.produto_combo.currentData()
+        inicio = (datetime.now() - timedelta(days=DIAS_HISTORICO_ESTOQUE)).strftime("%Y-%m-%d")
+        movimentos = self.db.historico_estoque(produto_id, inicio) if produto_id is not None else []
+        self.historico_table.setRowCount(len(movimentos))
+        for i, movimento in enumerate(reversed(movimentos)):
+            valores = [movimento.data, movimento.tipo.capitalize(), f"{movimento.quantidade:+d}",
+                       "" if movimento.referencia is None else str(movimento.referencia)]
+            for j, valor in enumerate(valores):
+                self.historico_table.setItem(i, j, QTableWidgetItem(valor))
+
+    def salvar(self):
+        produto_id = self.produto_combo.currentData()
+        try:
+            quantidade = int(self.quantidade.text())
+            preco_custo = float(self.preco_custo.text().replace(",", ".")) if self.preco_custo.text().strip() else None
+        except ValueError:
+            QMessageBox.warning(self, "Erro", "Verifique os valores numéricos!")
+            return
+        if produto_id is None or quantidade <= 0:
+            QMessageBox.warning(self, "Erro", "Selecione o produto e informe a quantidade!")
+            return
+        if self.db.registrar_entrada(produto_id, quantidade, preco_custo):
+            QMessageBox.information(self, "Sucesso", "Entrada registrada com sucesso!")
+            self.accept()
+        else:
+            QMessageBox.warning(self, "Erro", "Não foi possível registrar a entrada!")
+
 # Janela para ordem de serviço
 class OrdemServicoDialog(QDialog):
     def __init__(self, db):
@@ -366,10 +3239,7 @@ class OrdemServicoDialog(QDialog):
         layout = QVBoxLayout()
         form_layout = QFormLayout()
 
-        self.cliente_combo = QComboBox()
-        clientes = self.db.listar_clientes()
-        for cliente in clientes:
-            self.cliente_combo.addItem(cliente[1], cliente[0])
+        self.cliente_combo = CampoBusca(self.db.sugestoes_clientes, descrever_cliente)
         self.cliente_combo.currentIndexChanged.connect(self.atualizar_motos)
         form_layout.addRow("Cliente:", self.cliente_combo)
 
@@ -379,10 +3249,8 @@ class OrdemServicoDialog(QDialog):
         self.descricao = QLineEdit()
         form_layout.addRow("Descrição:", self.descricao)
 
-        self.produto_combo = QComboBox()
-        produtos = self.db.listar_produtos()
-        for produto in produtos:
-            self.produto_combo.addItem(f"{produto[2]} ({produto[3]} un)", produto[0])
+        self.produto_combo = CampoBusca(self.db.sugestoes_produtos,
+                                        lambda produto: f"{produto.descricao} ({produto.quantidade} un)")
         form_layout.addRow("Peça:", self.produto_combo)
 
         self.quantidade_peca = QLineEdit()
@@ -414,17 +3282,22 @@ class OrdemServicoDialog(QDialog):
         cliente_id = self.cliente_combo.currentData()
         motos = self.db.listar_motos(cliente_id)
         for moto in motos:
-            self.moto_combo.addItem(f"{moto[1]} {moto[2]} ({moto[3]})", moto[0])
+            self.moto_combo.addItem(f"{moto.marca} {moto.modelo} ({moto.placa})", moto.id)
 
     def adicionar_peca(self):
         produto_id = self.produto_combo.currentData()
+        if produto_id is None:
+            QMessageBox.warning(self, "Erro", "Selecione uma peça!")
+            return
         try:
             quantidade = int(self.quantidade_peca.text())
             if quantidade > 0:
-                produto = [p for p in self.db.listar_produtos() if p[0] == produto_id][0]
+                produto = self.db.obter_produto(produto_id)
                 row = self.pecas_table.rowCount()
                 self.pecas_table.insertRow(row)
-                self.pecas_table.setItem(row, 0, QTableWidgetItem(produto[2]))
+                item_peca = QTableWidgetItem(produto.descricao)
+                item_peca.setData(Qt.UserRole, produto_id)
+                self.pecas_table.setItem(row, 0, item_peca)
                 self.pecas_table.setItem(row, 1, QTableWidgetItem(str(quantidade)))
                 self.quantidade_peca.clear()
             else:
@@ -447,7 +3320,7 @@ class OrdemServicoDialog(QDialog):
             for row in range(self.pecas_table.rowCount()):
                 produto_nome = self.pecas_table.item(row, 0).text()
                 quantidade = int(self.pecas_table.item(row, 1).text())
-                produto_id = [p[0] for p in self.db.listar_produtos() if p[2] == produto_nome][0]
+                produto_id = self.pecas_table.item(row, 0).data(Qt.UserRole)
                 if not self.db.adicionar_peca_os(os_id, produto_id, quantidade):
                     QMessageBox.warning(self, "Erro", f"Estoque insuficiente para {produto_nome}!")
                     return
@@ -465,18 +3338,6 @@ class CadastroMotoDialog(QDialog):
         self.db = db
         self.setWindowTitle("Cadastrar Moto")
         self.setFixedSize(400, 350)
-        self.setStyleSheet("""
-            QDialog {background-color: #f5f5f5;}
-            QPushButton {
-                background-color: #3498db;
-                color: white;
-                border: none;
-                padding: 8px;
-                border-radius: 4px;
-            }
-            QPushButton:hover {background-color: #2980b9;}
-            QLabel {font-weight: bold;}
-        """)
 
         # Dicionário de marcas e modelos
         self.marcas_modelos = {
@@ -500,10 +3361,7 @@ class CadastroMotoDialog(QDialog):
         form_layout = QFormLayout()
         form_layout.setSpacing(15)
         
-        self.cliente_combo = QComboBox()
-        clientes = self.db.listar_clientes()
-        for cliente in clientes:
-            self.cliente_combo.addItem(cliente[1], cliente[0])
+        self.cliente_combo = CampoBusca(self.db.sugestoes_clientes, descrever_cliente)
             
         self.marca_combo = QComboBox()
         self.marca_combo.addItem("Selecione uma marca...", "")
@@ -584,8 +3442,7 @@ class CadastroMotoDialog(QDialog):
             return
             
         # Validação básica da placa (formato brasileiro)
-        import re
-        if not re.match(r'^[A-Z]{3}\d{4}$|^[A-Z]{3}\d[A-Z]\d{2}$', placa):
+        if not validar_placa(placa):
             QMessageBox.warning(self, "Erro", "Formato de placa inválido! Use formato ABC1234 ou ABC1D23")
             return
             
@@ -601,34 +3458,14 @@ class VendaProdutosDialog(QDialog):
         self.produtos_selecionados = []
         self.setWindowTitle("Venda de Produtos")
         self.setFixedSize(800, 600)
-        self.setStyleSheet("""
-            QDialog {background-color: #f5f5f5;}
-            QPushButton {
-                background-color: #3498db;
-                color: white;
-                border: none;
-                padding: 8px;
-                border-radius: 4px;
-            }
-            QPushButton:hover {background-color: #2980b9;}
-            QLabel {font-weight: bold;}
-            QTableWidget {
-                border: 1px solid #dcdcdc;
-                border-radius: 5px;
-                background-color: #ffffff;
-            }
-        """)
 
         layout = QVBoxLayout(self)
         
         # Cliente
         cliente_layout = QHBoxLayout()
         cliente_layout.addWidget(QLabel("Cliente:"))
-        self.cliente_combo = QComboBox()
-        clientes = self.db.listar_clientes()
-        self.cliente_combo.addItem("Cliente Avulso", 0)
-        for cliente in clientes:
-            self.cliente_combo.addItem(cliente[1], cliente[0])
+        self.cliente_combo = CampoBusca(self.db.sugestoes_clientes, descrever_cliente,
+                                        [("Cliente Avulso", 0)])
         cliente_layout.addWidget(self.cliente_combo, 1)
         layout.addLayout(cliente_layout)
         
@@ -636,10 +3473,8 @@ class VendaProdutosDialog(QDialog):
         produto_group = QGroupBox("Adicionar Produtos")
         produto_layout = QHBoxLayout()
         
-        self.produto_combo = QComboBox()
-        produtos = self.db.listar_produtos()
-        for produto in produtos:
-            self.produto_combo.addItem(f"{produto[2]} - R${produto[4]:.2f} ({produto[3]} em estoque)", produto[0])
+        self.produto_combo = CampoBusca(self.db.sugestoes_produtos, lambda produto:
+                                        f"{produto.descricao} - R${produto.preco_venda:.2f} ({produto.quantidade} em estoque)")
         produto_layout.addWidget(self.produto_combo, 2)
         
         produto_layout.addWidget(QLabel("Qtd:"))
@@ -667,7 +3502,7 @@ class VendaProdutosDialog(QDialog):
         total_layout.addStretch()
         total_layout.addWidget(QLabel("TOTAL:"))
         self.total_label = QLabel("R$ 0,00")
-        self.total_label.setStyleSheet("font-size: 18px; font-weight: bold; color: #2c3e50;")
+        self.total_label.setObjectName("total")
         total_layout.addWidget(self.total_label)
         layout.addLayout(total_layout)
         
@@ -685,7 +3520,7 @@ class VendaProdutosDialog(QDialog):
         
         btn_finalizar = QPushButton("Finalizar Venda")
         btn_finalizar.clicked.connect(self.finalizar_venda)
-        btn_finalizar.setStyleSheet("background-color: #27ae60; font-weight: bold;")
+        btn_finalizar.setObjectName("finalizar")
         btn_layout.addWidget(btn_finalizar)
         
         layout.addLayout(btn_layout)
@@ -693,6 +3528,9 @@ class VendaProdutosDialog(QDialog):
     def adicionar_produto(self):
         produto_id = self.produto_combo.currentData()
         produto_texto = self.produto_combo.currentText()
+        if produto_id is None:
+            QMessageBox.warning(self, "Erro", "Selecione um produto!")
+            return
         
         try:
             quantidade = int(self.quantidade.text())
@@ -701,16 +3539,15 @@ class VendaProdutosDialog(QDialog):
                 return
                 
             # Obtendo informações do produto
-            produtos = self.db.listar_produtos()
-            produto = next(p for p in produtos if p[0] == produto_id)
+            produto = self.db.obter_produto(produto_id)
             
-            if quantidade > produto[3]:
-                QMessageBox.warning(self, "Erro", f"Estoque insuficiente! Disponível: {produto[3]}")
+            if quantidade > produto.quantidade:
+                QMessageBox.warning(self, "Erro", f"Estoque insuficiente! Disponível: {produto.quantidade}")
                 return
                 
-            codigo = produto[1]
-            nome = produto[2]
-            preco = produto[4]
+            codigo = produto.codigo
+            nome = produto.descricao
+            preco = produto.preco_venda
             subtotal = preco * quantidade
             
             # Adicionar à tabela
@@ -769,18 +3606,6 @@ class CadastroFuncionarioDialog(QDialog):
         self.db = db
         self.setWindowTitle("Cadastrar Funcionário")
         self.setFixedSize(400, 350)
-        self.setStyleSheet("""
-            QDialog {background-color: #f5f5f5;}
-            QPushButton {
-                background-color: #3498db;
-                color: white;
-                border: none;
-                padding: 8px;
-                border-radius: 4px;
-            }
-            QPushButton:hover {background-color: #2980b9;}
-            QLabel {font-weight: bold;}
-        """)
 
         layout = QVBoxLayout(self)
         
@@ -874,40 +3699,346 @@ class CadastroFuncionarioDialog(QDialog):
         QMessageBox.information(self, "Sucesso", "Funcionário cadastrado com sucesso!")
         self.accept()
 
+# Importação em segundo plano, para a janela continuar respondendo
+class ImportacaoThread(QThread):
+    progresso = pyqtSignal(int, int, float)
+    concluido = pyqtSignal(dict)
+    falhou = pyqtSignal(str)
+
+    def __init__(self, db, tipo, caminho):
+        super().__init__()
+        self.db = db
+        self.tipo = tipo
+        self.caminho = caminho
+
+    def run(self):
+        try:
+            relatorio = importar_arquivo(self.db, self.tipo, self.caminho, self.progresso.emit)
+            self.concluido.emit(relatorio)
+        except (OSError, ValueError, sqlite3.Error) as e:
+            self.falhou.emit(str(e))
+        finally:
+            self.db.conexoes.fechar_thread()
+
+# Janela para importação de produtos, clientes e motos a partir de planilhas
+class ImportacaoDialog(QDialog):
+    def __init__(self, db):
+        super().__init__()
+        self.db = db
+        self.thread = None
+        self.setWindowTitle("Importar Dados")
+        self.setFixedSize(600, 450)
+
+        layout = QVBoxLayout(self)
+        form_layout = QFormLayout()
+
+        self.tipo_combo = QComboBox()
+        for tipo in TIPOS_IMPORTACAO:
+            self.tipo_combo.addItem(tipo.capitalize(), tipo)
+        form_layout.addRow("Tipo:", self.tipo_combo)
+
+        arquivo_layout = QHBoxLayout()
+        self.arquivo = QLineEdit()
+        self.arquivo.setPlaceholderText("Arquivo CSV ou XLSX")
+        btn_escolher = QPushButton("Escolher...")
+        btn_escolher.clicked.connect(self.escolher_arquivo)
+        arquivo_layout.addWidget(self.arquivo, 1)
+        arquivo_layout.addWidget(btn_escolher)
+        form_layout.addRow("Arquivo:", arquivo_layout)
+        layout.addLayout(form_layout)
+
+        self.progresso_label = QLabel("")
+        layout.addWidget(self.progresso_label)
+
+        self.rejeitadas_table = QTableWidget()
+        self.rejeitadas_table.setColumnCount(2)
+        self.rejeitadas_table.setHorizontalHeaderLabels(["Linha", "Motivo"])
+        self.rejeitadas_table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.rejeitadas_table)
+
+        btn_layout = QHBoxLayout()
+        btn_layout.addStretch()
+        self.btn_fechar = QPushButton("Fechar")
+        self.btn_fechar.clicked.connect(self.accept)
+        btn_layout.addWidget(self.btn_fechar)
+        self.btn_importar = QPushButton("Importar")
+        self.btn_importar.clicked.connect(self.importar)
+        btn_layout.addWidget(self.btn_importar)
+        layout.addLayout(btn_layout)
+
+    def escolher_arquivo(self):
+        caminho, _ = QFileDialog.getOpenFileName(self, "Escolher arquivo", "", "Planilhas (*.csv *.xlsx)")
+        if caminho:
+            self.arquivo.setText(caminho)
+
+    def importar(self):
+        caminho = self.arquivo.text().strip()
+        if not caminho:
+            QMessageBox.warning(self, "Erro", "Escolha o arquivo a importar!")
+            return
+        self.btn_importar.setEnabled(False)
+        self.btn_fechar.setEnabled(False)
+        self.rejeitadas_table.setRowCount(0)
+        self.progresso_label.setText("Importando...")
+        self.thread = ImportacaoThread(self.db, self.tipo_combo.currentData(), caminho)
+        self.thread.progresso.connect(self.atualizar_progresso)
+        self.thread.concluido.connect(self.concluir)
+        self.thread.falhou.connect(self.falhar)
+        self.thread.start()
+
+    def atualizar_progresso(self, importados, rejeitados, segundos):
+        velocidade = (importados + rejeitados) / segundos if segundos else 0
+        self.progresso_label.setText(f"{importados} importados, {rejeitados} rejeitados ({velocidade:.0f} linhas/s)")
+
+    def concluir(self, relatorio):
+        self.btn_importar.setEnabled(True)
+        self.btn_fechar.setEnabled(True)
+        self.progresso_label.setText(
+            f"Concluído: {relatorio['importados']} importados, {relatorio['rejeitados']} rejeitados "
+            f"em {relatorio['segundos']:.1f}s ({relatorio['linhas_por_segundo']:.0f} linhas/s)")
+        erros = relatorio["erros"]
+        self.rejeitadas_table.setRowCount(len(erros))
+        for i, (linha, motivo) in enumerate(erros):
+            self.rejeitadas_table.setItem(i, 0, QTableWidgetItem(str(linha)))
+            self.rejeitadas_table.setItem(i, 1, QTableWidgetItem(motivo))
+
+    def falhar(self, mensagem):
+        self.btn_importar.setEnabled(True)
+        self.btn_fechar.setEnabled(True)
+        self.progresso_label.setText("")
+        QMessageBox.critical(self, "Erro", f"Erro na importação: {mensagem}")
+
+    def reject(self):
+        # Não fecha a janela no meio de uma importação
+        if self.thread is None or not self.thread.isRunning():
+            super().reject()
+
+# Painel de vendas e margens, calculado sobre os resumos mensais
+class PainelVendasDialog(QDialog):
+    INDICADORES = [
+        ("receita", "Receita total", formatar_moeda),
+        ("custo", "Custo", formatar_moeda),
+        ("margem", "Margem", formatar_moeda),
+        ("receita_vendas", "Vendas de balcão", formatar_moeda),
+        ("receita_pecas_os", "Peças em OS", formatar_moeda),
+        ("mao_obra", "Mão de obra", formatar_moeda),
+        ("vendas", "Nº de vendas", lambda v: f"{v:.0f}"),
+        ("ordens", "Nº de OS", lambda v: f"{v:.0f}"),
+    ]
+
+    def __init__(self, db):
+        super().__init__()
+        self.db = db
+        self.setWindowTitle("Painel de Vendas")
+        self.setMinimumSize(1000, 700)
+
+        layout = QVBoxLayout(self)
+        form_layout = QFormLayout()
+        self.mes_combo = QComboBox()
+        meses = [linha.periodo for linha in self.db.resumo_mensal()]
+        atual = datetime.now().strftime("%Y-%m")
+        if atual not in meses:
+            meses.append(atual)
+        for mes in reversed(meses):
+            self.mes_combo.addItem(mes)
+        self.mes_combo.currentTextChanged.connect(self.atualizar)
+        form_layout.addRow("Mês de referência:", self.mes_combo)
+        layout.addLayout(form_layout)
+
+        layout.addWidget(QLabel("Comparação de períodos"))
+        self.comparacao_table = QTableWidget()
+        self.comparacao_table.setColumnCount(8)
+        self.comparacao_table.setHorizontalHeaderLabels(["Indicador", "Mês", "Mês anterior", "Var. %",
+                                                         "Mês no ano anterior", "Var. %", "12 meses", "Var. %"])
+        self.comparacao_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.comparacao_table)
+
+        layout.addWidget(QLabel(f"{TOP_PRODUTOS} produtos de maior receita nos últimos 12 meses"))
+        self.produtos_table = QTableWidget()
+        self.produtos_table.setColumnCount(6)
+        self.produtos_table.setHorizontalHeaderLabels(["Código", "Descrição", "Quantidade", "Receita", "Margem", "Margem %"])
+        self.produtos_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.produtos_table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.produtos_table)
+
+        btn_fechar = QPushButton("Fechar")
+        btn_fechar.clicked.connect(self.accept)
+        layout.addWidget(btn_fechar, 0, Qt.AlignRight)
+
+        self.atualizar(self.mes_combo.currentText())
+
+    def atualizar(self, mes):
+        analise = analisar_resumos(self.db, mes)
+        percentual = lambda v: "" if v is None else f"{v:+.1f}%"
+        self.comparacao_table.setRowCount(len(self.INDICADORES))
+        for i, (chave, rotulo, formatar) in enumerate(self.INDICADORES):
+            c = analise["comparacoes"][chave]
+            valores = [rotulo, formatar(c["mes"]), formatar(c["mes_anterior"]), percentual(c["variacao_mes"]),
+                       formatar(c["mesmo_mes_ano_anterior"]), percentual(c["variacao_ano"]),
+                       formatar(c["12_meses"]), percentual(c["variacao_12_meses"])]
+            for j, valor in enumerate(valores):
+                self.comparacao_table.setItem(i, j, QTableWidgetItem(valor))
+        self.comparacao_table.resizeColumnsToContents()
+
+        produtos = analise["top_produtos"]
+        self.produtos_table.setRowCount(len(produtos))
+        for i, p in enumerate(produtos):
+            valores = [p["codigo"], p["descricao"], str(p["quantidade"]), formatar_moeda(p["receita"]),
+                       formatar_moeda(p["margem"]), percentual(p["margem_percentual"]).lstrip("+")]
+            for j, valor in enumerate(valores):
+                self.produtos_table.setItem(i, j, QTableWidgetItem(valor))
+        self.produtos_table.resizeColumnsToContents()
+
+# Diagnóstico do banco: perfil de métodos e comandos SQL e consultas lentas
+class DiagnosticoDialog(QDialog):
+    COLUNAS_TEMPO = ["Chamadas", "Total (ms)", "Média (ms)", "p95 (ms)", "Máx. (ms)"]
+
+    def __init__(self, db):
+        super().__init__()
+        self.db = db
+        self.setWindowTitle("Diagnóstico do Banco")
+        self.setMinimumSize(1000, 650)
+
+        layout = QVBoxLayout(self)
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+
+        abas = QTabWidget()
+        self.metodos_table = self._tabela(["Método"] + self.COLUNAS_TEMPO)
+        self.comandos_table = self._tabela(["Comando SQL"] + self.COLUNAS_TEMPO)
+        self.lentas_table = self._tabela(["Momento", "Método", "ms", "Comando SQL", "Parâmetros", "Plano"])
+        abas.addTab(self.metodos_table, "Métodos")
+        abas.addTab(self.comandos_table, "Comandos SQL")
+        abas.addTab(self.lentas_table, "Consultas lentas")
+        layout.addWidget(abas)
+
+        btn_layout = QHBoxLayout()
+        self.btn_perfil = QPushButton()
+        self.btn_perfil.clicked.connect(self.alternar_perfil)
+        btn_layout.addWidget(self.btn_perfil)
+        btn_limpar = QPushButton("Limpar")
+        btn_limpar.clicked.connect(self.limpar)
+        btn_layout.addWidget(btn_limpar)
+        btn_atualizar = QPushButton("Atualizar")
+        btn_atualizar.clicked.connect(self.atualizar)
+        btn_layout.addWidget(btn_atualizar)
+        btn_salvar = QPushButton("Salvar JSON")
+        btn_salvar.clicked.connect(self.salvar_json)
+        btn_layout.addWidget(btn_salvar)
+        btn_layout.addStretch()
+        btn_fechar = QPushButton("Fechar")
+        btn_fechar.clicked.connect(self.accept)
+        btn_layout.addWidget(btn_fechar)
+        layout.addLayout(btn_layout)
+
+        self.atualizar()
+
+    def _tabela(self, cabecalhos):
+        tabela = QTableWidget()
+        tabela.setColumnCount(len(cabecalhos))
+        tabela.setHorizontalHeaderLabels(cabecalhos)
+        tabela.setEditTriggers(QTableWidget.NoEditTriggers)
+        tabela.horizontalHeader().setStretchLastSection(True)
+        return tabela
+
+    def _preencher(self, tabela, linhas):
+        tabela.setRowCount(len(linhas))
+        for i, valores in enumerate(linhas):
+            for j, valor in enumerate(valores):
+                tabela.setItem(i, j, QTableWidgetItem(str(valor)))
+        tabela.resizeColumnsToContents()
+
+    def atualizar(self):
+        perfil = self.db.perfil_consultas()
+        ativo = perfil["ativo"]
+        self.btn_perfil.setText("Desativar perfil" if ativo else "Ativar perfil")
+        self.status_label.setText(f"Perfil {'ativo' if ativo else 'desativado'}; consultas lentas a partir de "
+                                  f"{perfil.get('limite_lento_ms', LIMITE_CONSULTA_LENTA_MS):g} ms")
+        tempos = lambda e: [e["chamadas"], e["total_ms"], e["media_ms"], e["p95_ms"], e["max_ms"]]
+        self._preencher(self.metodos_table, [[nome] + tempos(e) for nome, e in perfil["metodos"].items()])
+        self._preencher(self.comandos_table, [[sql] + tempos(e) for sql, e in perfil["comandos"].items()])
+        self._preencher(self.lentas_table, [[l["momento"], l["metodo"], l["ms"], l["sql"], ", ".join(l["parametros"]),
+                                             " | ".join(l["plano"] or [])] for l in reversed(perfil["lentas"])])
+
+    def alternar_perfil(self):
+        if self.db.perfil_ativo():
+            self.db.desativar_perfil()
+        else:
+            self.db.ativar_perfil()
+        self.atualizar()
+
+    def limpar(self):
+        self.db.limpar_perfil()
+        self.atualizar()
+
+    def salvar_json(self):
+        caminho, _ = QFileDialog.getSaveFileName(self, "Salvar diagnóstico",
+                                                 f"diagnostico_{datetime.now():%Y%m%d_%H%M%S}.json", "JSON (*.json)")
+        if not caminho:
+            return
+        with open(caminho, "w", encoding="utf-8") as arquivo:
+            json.dump(self.db.perfil_consultas(), arquivo, indent=2, ensure_ascii=False)
+        QMessageBox.information(self, "Sucesso", f"Diagnóstico salvo em {caminho}")
+
+# Exportação em segundo plano, com a própria conexão da thread
+class ExportacaoThread(QThread):
+    progresso = pyqtSignal(int)
+    concluido = pyqtSignal(int)
+    falhou = pyqtSignal(str)
+
+    def __init__(self, db, relatorio, caminho, filtro=None):
+        super().__init__()
+        self.db = db
+        self.relatorio = relatorio
+        self.caminho = caminho
+        self.filtro = filtro
+
+    def run(self):
+        try:
+            self.concluido.emit(exportar_relatorio(self.db, self.relatorio, self.caminho, self.progresso.emit,
+                                                   self.filtro))
+        except (OSError, sqlite3.Error) as e:
+            self.falhou.emit(str(e))
+        finally:
+            self.db.conexoes.fechar_thread()
+
 # Janela principal
 class MainWindow(QMainWindow):
-    def __init__(self):
+    # Nova quantidade de produtos com estoque baixo (pode vir de outra thread)
+    alertas_alterados = pyqtSignal(int)
+    # Primeira página de uma lista ou relatório exibida
+    pagina_exibida = pyqtSignal()
+    # Relatório de um backup automático (vem da thread do AgendadorBackup)
+    backup_concluido = pyqtSignal(object)
+
+    def __init__(self, db=None):
         super().__init__()
-        self.db = Database()
+        self.db = db or Database()
+        self.db.ao_alterar_alertas = self.alertas_alterados.emit
+        # Listas e relatórios são carregados em segundo plano
+        self.executor = ExecutorBanco(self.db)
+        self.executor.pagina.connect(self._receber_pagina)
+        self.executor.erro.connect(self._receber_erro)
+        self.executor.resultado.connect(self._receber_resultado)
+        self.executor.erro.connect(self._receber_erro_alteracoes)
+        self._token_tabela = None
+        # Verificação de alterações em andamento na thread do banco
+        self._token_alteracoes = None
+        self._consulta_alteracoes = None
+        self._verificar_de_novo = False
+        self.visao_atual = None
+        # Período aplicado à visão aberta (argumentos inicio e fim da consulta)
+        self._filtro = {}
+        self.exportacao = None
+        # Alterações gravadas no banco (por qualquer terminal) são aplicadas à visão aberta
+        self._ultima_alteracao = self.db.ultima_alteracao()
+        self.alteracoes_timer = QTimer(self)
+        self.alteracoes_timer.setInterval(INTERVALO_ALTERACOES_MS)
+        self.alteracoes_timer.timeout.connect(self.verificar_alteracoes)
+        self.alteracoes_timer.start()
+        self.backup_concluido.connect(self.mostrar_backup)
         self.setWindowTitle("Sistema de Gestão - Oficina de Motos")
         self.setMinimumSize(1200, 800)
-        self.setStyleSheet("""
-            QMainWindow {background-color: #f5f5f5;}
-            QPushButton {
-                background-color: #3498db;
-                color: white;
-                border: none;
-                padding: 10px;
-                border-radius: 5px;
-                font-size: 16px;
-                font-weight: bold;
-            }
-            QPushButton:hover {background-color: #2980b9;}
-            QTableWidget {
-                border: 1px solid #dcdcdc;
-                border-radius: 5px;
-                background-color: #ffffff;
-                gridline-color: #e0e0e0;
-            }
-            QTableWidget QHeaderView::section {
-                background-color: #3498db;
-                padding: 8px;
-                color: white;
-                font-weight: bold;
-                font-size: 14px;
-                border: 0px;
-            }
-        """)
 
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
@@ -918,9 +4049,17 @@ class MainWindow(QMainWindow):
         # Título e imagem do sistema
         header_layout = QHBoxLayout()
         logo_label = QLabel("SISTEMA DE GESTÃO - OFICINA DE MOTOS")
-        logo_label.setStyleSheet("font-size: 28px; font-weight: bold; color: #2c3e50;")
+        logo_label.setObjectName("titulo")
         header_layout.addWidget(logo_label)
         header_layout.addStretch()
+        
+        # Indicador de produtos com estoque baixo; abre o relatório
+        self.alertas_btn = QPushButton()
+        self.alertas_btn.setObjectName("alertas")
+        self.alertas_btn.clicked.connect(self.relatorio_estoque)
+        header_layout.addWidget(self.alertas_btn)
+        self.alertas_alterados.connect(self.atualizar_alertas)
+        self.atualizar_alertas(self.db.contagem_alertas())
         main_layout.addLayout(header_layout)
         
         # Layout principal dividido em duas partes
@@ -929,14 +4068,14 @@ class MainWindow(QMainWindow):
         # Painel de botões à esquerda
         button_panel = QWidget()
         button_panel.setFixedWidth(300)
-        button_panel.setStyleSheet("background-color: #2c3e50; border-radius: 10px;")
+        button_panel.setObjectName("painelBotoes")
         button_layout = QVBoxLayout(button_panel)
         button_layout.setSpacing(15)
         button_layout.setContentsMargins(15, 25, 15, 25)
         
         # Título do painel
         panel_title = QLabel("CONTROLES")
-        panel_title.setStyleSheet("color: white; font-size: 18px; font-weight: bold;")
+        panel_title.setObjectName("tituloPainel")
         panel_title.setAlignment(Qt.AlignCenter)
         button_layout.addWidget(panel_title)
         button_layout.addSpacing(15)
@@ -946,7 +4085,8 @@ class MainWindow(QMainWindow):
             "Cadastros": [
                 ("Cadastrar Cliente", self.cadastrar_cliente),
                 ("Cadastrar Moto", self.cadastrar_moto),
-                ("Cadastrar Produto", self.cadastrar_produto)
+                ("Cadastrar Produto", self.cadastrar_produto),
+                ("Importar Dados", self.importar_dados)
             ],
             "Funcionários": [
                 ("Cadastrar Funcionário", self.cadastrar_funcionario),
@@ -954,39 +4094,26 @@ class MainWindow(QMainWindow):
             ],
             "Operações": [
                 ("Nova Ordem de Serviço", self.nova_os),
-                ("Vender Produtos", self.vender_produtos)
+                ("Vender Produtos", self.vender_produtos),
+                ("Entrada de Estoque", self.entrada_estoque)
             ],
             "Relatórios": [
                 ("Ordens de Serviço", self.listar_os),
                 ("Estoque Baixo", self.relatorio_estoque),
-                ("Vendas", self.relatorio_vendas)
+                ("Vendas", self.relatorio_vendas),
+                ("Painel de Vendas", self.painel_vendas),
+                ("Diagnóstico do Banco", self.diagnostico)
             ]
         }
         
         for category, buttons in categories.items():
             cat_label = QLabel(category)
-            cat_label.setStyleSheet("color: #3498db; font-size: 16px; font-weight: bold; margin-top: 10px;")
+            cat_label.setObjectName("categoria")
             button_layout.addWidget(cat_label)
             
             for btn_text, btn_function in buttons:
                 btn = QPushButton(btn_text)
                 btn.clicked.connect(btn_function)
-                btn.setStyleSheet("""
-                    QPushButton {
-                        background-color: #34495e;
-                        color: white;
-                        text-align: left;
-                        padding: 18px 25px;
-                        border-radius: 8px;
-                        font-size: 13px;
-                        font-weight: bold;
-                        margin-left: 10px;
-                        margin-right: 10px;
-                    }
-                    QPushButton:hover {
-                        background-color: #3498db;
-                    }
-                """)
                 button_layout.addWidget(btn)
             
             button_layout.addSpacing(15)
@@ -1000,29 +4127,51 @@ class MainWindow(QMainWindow):
         # Barra de pesquisa
         search_layout = QHBoxLayout()
         search_label = QLabel("Pesquisar:")
-        search_label.setStyleSheet("font-size: 14px; font-weight: bold;")
+        search_label.setObjectName("rotuloBusca")
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("Digite para pesquisar...")
-        self.search_input.setStyleSheet("padding: 10px; border-radius: 5px; border: 1px solid #ddd; font-size: 14px;")
+        self.search_input.setObjectName("busca")
         search_button = QPushButton("Buscar")
-        search_button.setStyleSheet("font-size: 14px; padding: 10px 20px;")
+        search_button.setObjectName("buscar")
+        search_button.clicked.connect(self.search)
+        
+        # Busca enquanto digita, disparada após uma pausa na digitação
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(250)
+        self.search_timer.timeout.connect(self.search)
+        self.search_input.textChanged.connect(self.search_timer.start)
+        self.search_input.returnPressed.connect(self.search)
+        self._visao_antes_busca = None
+        
+        # Período das listas de OS e vendas
+        periodo_label = QLabel("Período:")
+        periodo_label.setObjectName("rotuloBusca")
+        self.periodo_combo = QComboBox()
+        self.periodo_combo.addItems(PERIODOS)
+        self.periodo_combo.currentIndexChanged.connect(self.alterar_periodo)
         
         search_layout.addWidget(search_label)
         search_layout.addWidget(self.search_input, 1)
         search_layout.addWidget(search_button)
+        search_layout.addSpacing(15)
+        search_layout.addWidget(periodo_label)
+        search_layout.addWidget(self.periodo_combo)
         
         content_layout_right.addLayout(search_layout)
         
         # Status atual
         self.status_label = QLabel("Bem-vindo ao Sistema de Gestão de Oficina")
-        self.status_label.setStyleSheet("color: #555; font-size: 16px; margin-top: 10px; font-weight: bold;")
+        self.status_label.setObjectName("status")
         content_layout_right.addWidget(self.status_label)
         
         # Tabela
-        self.table = QTableWidget()
+        self.table = QTableView()
         self.table.setAlternatingRowColors(True)
-        self.table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableView.SelectRows)
+        self.table.setEditTriggers(QTableView.NoEditTriggers)
+        self.table.horizontalHeader().setResizeContentsPrecision(AMOSTRA_COLUNAS)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         content_layout_right.addWidget(self.table)
         
         # Botões de ação para o item selecionado
@@ -1030,15 +4179,20 @@ class MainWindow(QMainWindow):
         action_layout.addStretch()
         
         self.edit_btn = QPushButton("Editar")
-        self.edit_btn.setStyleSheet("font-size: 14px; padding: 12px 25px; background-color: #f39c12; color: white; font-weight: bold;")
+        self.edit_btn.setObjectName("editar")
         self.edit_btn.clicked.connect(self.edit_selected)
         action_layout.addWidget(self.edit_btn)
         
         self.delete_btn = QPushButton("Excluir")
-        self.delete_btn.setStyleSheet("font-size: 14px; padding: 12px 25px; background-color: #e74c3c; color: white; font-weight: bold;")
+        self.delete_btn.setObjectName("excluir")
         self.delete_btn.clicked.connect(self.delete_selected)
         action_layout.addWidget(self.delete_btn)
         
+        self.export_btn = QPushButton("Exportar")
+        self.export_btn.setObjectName("exportar")
+        self.export_btn.clicked.connect(self.exportar)
+        action_layout.addWidget(self.export_btn)
+        
         content_layout_right.addLayout(action_layout)
         
         # Adicionando os painéis ao layout principal
@@ -1050,176 +4204,239 @@ class MainWindow(QMainWindow):
         # Barra de status no rodapé
         self.statusBar().showMessage("Sistema iniciado " + datetime.now().strftime("%d/%m/%Y %H:%M:%S"))
         
-        # Inicialmente mostrar lista de OS
-        self.listar_os()
+        # Inicialmente mostrar lista de OS, carregada depois que a janela aparece
+        QTimer.singleShot(0, self.listar_os)
 
     # Métodos adicionais para novas funcionalidades
     def cadastrar_cliente(self):
         dialog = CadastroClienteDialog(self.db)
         if dialog.exec_() == QDialog.Accepted:
             self.status_label.setText("Cliente cadastrado com sucesso!")
-            self.listar_clientes()  # Atualiza a tabela se estiver na visualização de clientes
+            self.verificar_alteracoes()
     
     def cadastrar_produto(self):
         dialog = CadastroProdutoDialog(self.db)
         if dialog.exec_() == QDialog.Accepted:
             self.status_label.setText("Produto cadastrado com sucesso!")
-            self.listar_produtos()  # Atualiza a tabela se estiver na visualização de produtos
+            self.verificar_alteracoes()
     
     def cadastrar_moto(self):
         dialog = CadastroMotoDialog(self.db)
         if dialog.exec_() == QDialog.Accepted:
             self.status_label.setText("Moto cadastrada com sucesso!")
-            # Atualiza a tabela se estiver mostrando motos de um cliente específico
-            self._atualizar_visualizacao_atual()
+            self.verificar_alteracoes()
     
+    def importar_dados(self):
+        dialog = ImportacaoDialog(self.db)
+        dialog.exec_()
+        self.verificar_alteracoes()
+
     def cadastrar_funcionario(self):
         dialog = CadastroFuncionarioDialog(self.db)
         if dialog.exec_() == QDialog.Accepted:
             self.status_label.setText("Funcionário cadastrado com sucesso!")
-            self.listar_funcionarios()  # Atualiza a tabela se estiver na visualização de funcionários
+            self.verificar_alteracoes()
     
     def nova_os(self):
         dialog = OrdemServicoDialog(self.db)
         if dialog.exec_() == QDialog.Accepted:
             self.status_label.setText("Ordem de serviço registrada com sucesso!")
-            self.listar_os()  # Atualiza a tabela de OS
+            self.verificar_alteracoes()
     
     def vender_produtos(self):
         dialog = VendaProdutosDialog(self.db)
         if dialog.exec_() == QDialog.Accepted:
             self.status_label.setText("Venda registrada com sucesso!")
-            # Pode afetar o estoque de produtos
-            if self.status_label.text().startswith("Lista de Produtos"):
-                self.listar_produtos()
+            self.verificar_alteracoes()
+    
+    def atualizar_alertas(self, quantidade):
+        self.alertas_btn.setText(f"Estoque baixo: {quantidade}")
+        self.alertas_btn.setVisible(quantidade > 0)
+
+    def entrada_estoque(self):
+        dialog = EntradaEstoqueDialog(self.db)
+        if dialog.exec_() == QDialog.Accepted:
+            self.status_label.setText("Entrada de estoque registrada com sucesso!")
+            self.verificar_alteracoes()
     
+    def _exibir_tabela(self, titulo, cabecalhos, consulta, formatadores=None):
+        # A consulta roda na thread do banco; a que estava carregando é cancelada
+        self.status_label.setText(titulo)
+        if self._token_tabela is not None:
+            self.executor.cancelar(self._token_tabela)
+        anterior = self.table.model()
+        token = None
+        model = TabelaPaginadaModel(cabecalhos, lambda tamanho: self.executor.buscar(token, tamanho),
+                                    formatadores, self.table)
+        model.aguardando = True
+        token = self._token_tabela = self.executor.abrir(consulta)
+        self.table.setModel(model)
+        if anterior is not None:
+            anterior.deleteLater()
+        self.statusBar().showMessage("Carregando...")
+
+    def _receber_pagina(self, token, linhas, esgotado):
+        if token != self._token_tabela:
+            return
+        model = self.table.model()
+        primeira = not model.linhas
+        model.acrescentar(linhas, esgotado)
+        if esgotado:
+            self._token_tabela = None
+        if primeira:
+            # A largura das colunas é calculada sobre uma amostra das linhas
+            self.table.resizeColumnsToContents()
+            self.statusBar().clearMessage()
+            self.pagina_exibida.emit()
+
+    def _receber_erro(self, token, mensagem):
+        if token != self._token_tabela:
+            return
+        self._token_tabela = None
+        self.statusBar().clearMessage()
+        QMessageBox.critical(self, "Erro", f"Erro ao carregar dados: {mensagem}")
+
+    def closeEvent(self, event):
+        self.executor.encerrar()
+        super().closeEvent(event)
+
+    def mostrar_backup(self, relatorio):
+        if "erro" in relatorio:
+            self.statusBar().showMessage(f"Falha no backup automático: {relatorio['erro']}")
+        else:
+            self.statusBar().showMessage(
+                f"Backup salvo em {relatorio['arquivo']} ({relatorio['segundos']:.1f}s)")
+
+    def _exibir_relatorio(self, visao):
+        titulo, cabecalhos, consulta, formatadores = RELATORIOS[visao]
+        consulta = getattr(self.db, consulta)
+        filtro = {}
+        if visao in VISOES_RECENTES_PRIMEIRO:
+            periodo = self.periodo_combo.currentText()
+            filtro = filtro_periodo(periodo)
+            if filtro:
+                titulo += f" - {periodo}"
+        self._exibir_tabela(titulo, cabecalhos, lambda: consulta(**filtro), formatadores)
+        self.visao_atual = visao
+        self._filtro = filtro
+
+    def alterar_periodo(self):
+        if self.visao_atual in VISOES_RECENTES_PRIMEIRO:
+            self._exibir_relatorio(self.visao_atual)
+
     def listar_os(self):
-        self.status_label.setText("Ordens de Serviço")
-        self.table.clear()
-        self.table.setColumnCount(6)
-        self.table.setHorizontalHeaderLabels(["ID", "Cliente", "Moto", "Descrição", "Status", "Data"])
-        
-        ordens = self.db.listar_os()
-        self.table.setRowCount(len(ordens))
-        
-        for i, ordem in enumerate(ordens):
-            for j, value in enumerate(ordem):
-                self.table.setItem(i, j, QTableWidgetItem(str(value)))
-                
-        self.table.resizeColumnsToContents()
+        self._exibir_relatorio(Visao.OS)
     
     def relatorio_estoque(self):
-        self.status_label.setText("Relatório de Estoque Baixo")
-        self.table.clear()
-        self.table.setColumnCount(3)
-        self.table.setHorizontalHeaderLabels(["Código", "Descrição", "Quantidade"])
-        
-        produtos = self.db.relatorio_estoque_baixo()
-        self.table.setRowCount(len(produtos))
-        
-        for i, produto in enumerate(produtos):
-            for j, value in enumerate(produto):
-                self.table.setItem(i, j, QTableWidgetItem(str(value)))
-                
-        self.table.resizeColumnsToContents()
+        self._exibir_relatorio(Visao.ESTOQUE_BAIXO)
     
     def relatorio_vendas(self):
-        self.status_label.setText("Relatório de Vendas")
-        self.table.clear()
-        self.table.setColumnCount(4)
-        self.table.setHorizontalHeaderLabels(["ID", "Cliente", "Data", "Total"])
-        
-        self.cursor = self.db.conn.cursor()
-        self.cursor.execute("""
-            SELECT v.id, COALESCE(c.nome, 'Cliente Avulso'), v.data,
-                   (SELECT SUM(p.preco_venda * vi.quantidade)
-                    FROM venda_itens vi
-                    JOIN produtos p ON vi.produto_id = p.id
-                    WHERE vi.venda_id = v.id) as total
-            FROM vendas v
-            LEFT JOIN clientes c ON v.cliente_id = c.id
-            ORDER BY v.data DESC
-        """)
-        
-        vendas = self.cursor.fetchall()
-        
-        self.table.setRowCount(len(vendas))
-        for i, venda in enumerate(vendas):
-            for j, value in enumerate(venda):
-                if j == 3 and value is not None:  # Formatar o valor total
-                    text = f"R$ {value:.2f}"
-                else:
-                    text = str(value) if value is not None else ""
-                self.table.setItem(i, j, QTableWidgetItem(text))
-                
-        self.table.resizeColumnsToContents()
+        self._exibir_relatorio(Visao.VENDAS)
     
     def listar_produtos(self):
-        self.status_label.setText("Lista de Produtos")
-        self.table.clear()
-        self.table.setColumnCount(5)
-        self.table.setHorizontalHeaderLabels(["ID", "Código", "Descrição", "Estoque", "Preço Venda"])
-        
-        produtos = self.db.listar_produtos()
-        self.table.setRowCount(len(produtos))
-        
-        for i, produto in enumerate(produtos):
-            for j, value in enumerate(produto):
-                self.table.setItem(i, j, QTableWidgetItem(str(value)))
-                
-        self.table.resizeColumnsToContents()
+        self._exibir_relatorio(Visao.PRODUTOS)
     
     def listar_clientes(self):
-        self.status_label.setText("Lista de Clientes")
-        self.table.clear()
-        self.table.setColumnCount(3)
-        self.table.setHorizontalHeaderLabels(["ID", "Nome", "Telefone"])
-        
-        self.cursor = self.db.conn.cursor()
-        self.cursor.execute("SELECT id, nome, telefone FROM clientes")
-        clientes = self.cursor.fetchall()
-        
-        self.table.setRowCount(len(clientes))
-        for i, cliente in enumerate(clientes):
-            for j, value in enumerate(cliente):
-                self.table.setItem(i, j, QTableWidgetItem(str(value)))
-                
-        self.table.resizeColumnsToContents()
+        self._exibir_relatorio(Visao.CLIENTES)
     
     def listar_funcionarios(self):
-        self.status_label.setText("Lista de Funcionários")
-        self.table.clear()
-        self.table.setColumnCount(4)
-        self.table.setHorizontalHeaderLabels(["ID", "Nome", "Função", "Status"])
-        
-        funcionarios = self.db.listar_funcionarios()
-        
-        self.table.setRowCount(len(funcionarios))
-        for i, funcionario in enumerate(funcionarios):
-            for j, value in enumerate(funcionario):
-                self.table.setItem(i, j, QTableWidgetItem(str(value)))
-                
-        self.table.resizeColumnsToContents()
+        self._exibir_relatorio(Visao.FUNCIONARIOS)
+
+    def verificar_alteracoes(self):
+        # Lê o registro de alterações a partir da última vista (na thread do
+        # banco) e atualiza só as linhas afetadas da visão aberta; com uma
+        # verificação em andamento, outra é feita quando ela terminar
+        if self._token_alteracoes is not None:
+            self._verificar_de_novo = True
+            return
+        self._verificar_de_novo = False
+        ultima, visao, filtro = self._ultima_alteracao, self.visao_atual, self._filtro
+        self._token_alteracoes = self.executor.tarefa(lambda: calcular_alteracoes(self.db, ultima, visao, filtro))
+        self._consulta_alteracoes = (visao, filtro)
+
+    def _receber_resultado(self, token, resultado):
+        if token != self._token_alteracoes:
+            return
+        self._token_alteracoes = None
+        self._ultima_alteracao = resultado["ultima"]
+        # Trocada a visão ou o período, a nova consulta já traz as alterações
+        if self._consulta_alteracoes == (self.visao_atual, self._filtro):
+            if resultado["recarregar"]:
+                if self.visao_atual in RELATORIOS:
+                    self._exibir_relatorio(self.visao_atual)
+            elif resultado["atuais"] or resultado["removidos"]:
+                self.table.model().aplicar_alteracoes(resultado["atuais"], resultado["removidos"],
+                                                      self.visao_atual in VISOES_RECENTES_PRIMEIRO)
+        if self._verificar_de_novo:
+            self.verificar_alteracoes()
+
+    def _receber_erro_alteracoes(self, token, mensagem):
+        # A próxima verificação tenta de novo a partir da mesma alteração
+        if token != self._token_alteracoes:
+            return
+        self._token_alteracoes = None
+        self.statusBar().showMessage(f"Erro ao verificar alterações: {mensagem}", 5000)
+    
+    def painel_vendas(self):
+        try:
+            dialog = PainelVendasDialog(self.db)
+        except ValueError as e:
+            QMessageBox.warning(self, "Aviso", str(e))
+            return
+        dialog.exec_()
+
+    def diagnostico(self):
+        try:
+            dialog = DiagnosticoDialog(self.db)
+        except ErroRemoto as e:
+            # O perfil de um servidor só é consultado com o token (OFICINA_TOKEN)
+            QMessageBox.warning(self, "Aviso", str(e))
+            return
+        dialog.exec_()
+
+    def exportar(self):
+        if self.visao_atual not in RELATORIOS:
+            QMessageBox.warning(self, "Aviso", "Abra uma lista ou relatório para exportar!")
+            return
+        if self.exportacao is not None and self.exportacao.isRunning():
+            QMessageBox.warning(self, "Aviso", "Já existe uma exportação em andamento!")
+            return
+        caminho, _ = QFileDialog.getSaveFileName(self, "Exportar relatório", self.visao_atual.value,
+                                                 "CSV (*.csv);;PDF (*.pdf)")
+        if not caminho:
+            return
+        if not caminho.lower().endswith((".csv", ".pdf")):
+            caminho += ".csv"
+        self.exportacao = ExportacaoThread(self.db, self.visao_atual, caminho, self._filtro)
+        self.exportacao.progresso.connect(
+            lambda linhas: self.statusBar().showMessage(f"Exportando... {linhas} linhas"))
+        self.exportacao.concluido.connect(
+            lambda linhas: self.statusBar().showMessage(f"Exportação concluída: {linhas} linhas em {caminho}"))
+        self.exportacao.falhou.connect(
+            lambda mensagem: QMessageBox.critical(self, "Erro", f"Erro na exportação: {mensagem}"))
+        self.statusBar().showMessage("Exportando...")
+        self.exportacao.start()
     
     def search(self):
-        query = self.search_input.text().strip().lower()
-        self.status_label.setText(f"Pesquisando por: {query}")
-        
-        # Implementação básica - filtra itens mostrados na tabela atual
-        for row in range(self.table.rowCount()):
-            match = False
-            for col in range(self.table.columnCount()):
-                item = self.table.item(row, col)
-                if item and query in item.text().lower():
-                    match = True
-                    break
-            
-            self.table.setRowHidden(row, not match)
+        self.search_timer.stop()
+        query = self.search_input.text().strip()
+        if not query:
+            # Busca apagada: volta para a visualização que estava aberta
+            if self._visao_antes_busca is not None:
+                self._exibir_relatorio(self._visao_antes_busca)
+                self._visao_antes_busca = None
+            return
+        
+        if self._visao_antes_busca is None and self.visao_atual in RELATORIOS:
+            self._visao_antes_busca = self.visao_atual
+        self.visao_atual = Visao.BUSCA
+        self._exibir_tabela(f"Pesquisando por: {query}", ["Tipo", "ID", "Resultado"],
+                            lambda: self.db.cursor_busca(query), {0: ROTULOS_BUSCA.get})
     
     def edit_selected(self):
-        selected_row = self.table.currentRow()
+        selected_row = self.table.currentIndex().row()
         if selected_row >= 0:
-            item_id = self.table.item(selected_row, 0).text()
+            item_id = self.table.model().valor(selected_row, 0)
             self.status_label.setText(f"Editando item {item_id}...")
             # Aqui você implementaria a edição com base no tipo de dados atual
             QMessageBox.information(self, "Informação", "Funcionalidade de edição em desenvolvimento.")
@@ -1227,15 +4444,13 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Aviso", "Selecione um item para editar!")
     
     def delete_selected(self):
-        selected_row = self.table.currentRow()
+        selected_row = self.table.currentIndex().row()
         if selected_row >= 0:
-            item_id = self.table.item(selected_row, 0).text()
-            item_nome = self.table.item(selected_row, 1).text() if self.table.columnCount() > 1 else ""
+            model = self.table.model()
+            item_id = model.valor(selected_row, 0)
+            item_nome = model.valor(selected_row, 1) if model.columnCount() > 1 else ""
             
-            # Identificar o tipo de item baseado no status atual
-            texto_status = self.status_label.text()
-            
-            if texto_status.startswith("Lista de Clientes"):
+            if self.visao_atual == Visao.CLIENTES:
                 reply = QMessageBox.question(self, 'Confirmar Exclusão', 
                                             f"Tem certeza que deseja excluir o cliente '{item_nome}' (ID: {item_id})?\n\n"
                                             "Esta ação não pode ser desfeita.",
@@ -1245,11 +4460,11 @@ class MainWindow(QMainWindow):
                     if sucesso:
                         QMessageBox.information(self, "Sucesso", mensagem)
                         self.status_label.setText("Cliente excluído com sucesso!")
-                        self.listar_clientes()  # Atualiza a lista
+                        self.verificar_alteracoes()
                     else:
                         QMessageBox.warning(self, "Erro", mensagem)
                         
-            elif texto_status.startswith("Lista de Funcionários"):
+            elif self.visao_atual == Visao.FUNCIONARIOS:
                 reply = QMessageBox.question(self, 'Confirmar Exclusão', 
                                             f"Tem certeza que deseja excluir o funcionário '{item_nome}' (ID: {item_id})?\n\n"
                                             "Esta ação não pode ser desfeita.",
@@ -1259,15 +4474,15 @@ class MainWindow(QMainWindow):
                     if sucesso:
                         QMessageBox.information(self, "Sucesso", mensagem)
                         self.status_label.setText("Funcionário excluído com sucesso!")
-                        self.listar_funcionarios()  # Atualiza a lista
+                        self.verificar_alteracoes()
                     else:
                         QMessageBox.warning(self, "Erro", mensagem)
                         
-            elif texto_status.startswith("Lista de Produtos"):
+            elif self.visao_atual == Visao.PRODUTOS:
                 # Implementar exclusão de produtos futuramente
                 QMessageBox.information(self, "Informação", "Funcionalidade de exclusão de produtos em desenvolvimento.")
                 
-            elif texto_status.startswith("Ordens de Serviço"):
+            elif self.visao_atual == Visao.OS:
                 # Implementar exclusão de OS futuramente
                 QMessageBox.information(self, "Informação", "Funcionalidade de exclusão de ordens de serviço em desenvolvimento.")
                 
@@ -1276,31 +4491,177 @@ class MainWindow(QMainWindow):
         else:
             QMessageBox.warning(self, "Aviso", "Selecione um item para excluir!")
 
-    def _atualizar_visualizacao_atual(self):
-        """Atualiza a visualização atual com base no status_label"""
-        texto = self.status_label.text()
-        if texto.startswith("Lista de Clientes"):
-            self.listar_clientes()
-        elif texto.startswith("Lista de Funcionários"):
-            self.listar_funcionarios()
-        elif texto.startswith("Lista de Produtos"):
-            self.listar_produtos()
-        elif texto.startswith("Ordens de Serviço"):
-            self.listar_os()
-        elif texto.startswith("Relatório de Estoque"):
-            self.relatorio_estoque()
-        elif texto.startswith("Relatório de Vendas"):
-            self.relatorio_vendas()
-        # Se não corresponder a nenhuma visualização conhecida, não faz nada
-
 # Inicialização
 if __name__ == "__main__":
-    init_db()
-    app = QApplication(sys.argv)
-    
-    # Aplicar estilo global
-    app.setStyle('Fusion')
-    
-    window = MainWindow()
+    parser = argparse.ArgumentParser(description="Sistema de Gestão - Oficina de Motos")
+    parser.add_argument("--db", help="arquivo do banco de dados (padrão: OFICINA_DB ou oficina_motos.db)")
+    parser.add_argument("--exportar", nargs=2, metavar=("RELATORIO", "ARQUIVO"),
+                        help="exporta " + ", ".join(RELATORIOS) + " para .csv ou .pdf e sai")
+    parser.add_argument("--importar", nargs=2, metavar=("TIPO", "ARQUIVO"),
+                        help="importa um CSV/XLSX de " + ", ".join(TIPOS_IMPORTACAO) + " e sai")
+    parser.add_argument("--reconstruir-resumos", action="store_true",
+                        help="recalcula os resumos de vendas a partir de todo o histórico e sai")
+    parser.add_argument("--servidor", metavar="URL",
+                        help="usa o banco de um servidor da oficina (servidor.py), ex.: http://192.168.0.10:8765; "
+                             "OFICINA_TOKEN libera o perfil, o arquivamento e a sincronização remotos")
+    parser.add_argument("--perfil-inicializacao", "--profile-startup", action="store_true",
+                        help="mostra o tempo de cada fase da abertura até a primeira lista aparecer")
+    parser.add_argument("--perfil-consultas", nargs="?", type=float, const=LIMITE_CONSULTA_LENTA_MS, metavar="MS",
+                        help="mede métodos e comandos SQL desde a abertura (Diagnóstico do Banco); "
+                             f"consultas lentas a partir de MS ms (padrão {LIMITE_CONSULTA_LENTA_MS})")
+    parser.add_argument("--arquivar", nargs="?", type=int, const=DIAS_ARQUIVAMENTO, metavar="DIAS",
+                        help="move OS concluídas e vendas com mais de DIAS dias (padrão "
+                             f"{DIAS_ARQUIVAMENTO}) para o arquivo morto e sai")
+    parser.add_argument("--backup", metavar="DIRETORIO",
+                        help="salva uma cópia compactada do banco no diretório (sem parar os terminais) e sai")
+    parser.add_argument("--restaurar", metavar="ARQUIVO",
+                        help="substitui o banco pelo backup ARQUIVO (.db.gz) e sai")
+    parser.add_argument("--backup-automatico", metavar="DIRETORIO",
+                        help=f"faz backups no diretório a cada {INTERVALO_BACKUP_HORAS} horas enquanto o programa estiver aberto")
+    parser.add_argument("--filial", action="store_true", help="mostra o identificador desta filial na sincronização e sai")
+    parser.add_argument("--enviar-alteracoes", nargs=2, metavar=("FILIAL", "ARQUIVO"),
+                        help="grava em ARQUIVO (.json.gz) as alterações que FILIAL ainda não recebeu e sai")
+    parser.add_argument("--receber-alteracoes", metavar="ARQUIVO",
+                        help="aplica as alterações de outra filial gravadas em ARQUIVO e sai")
+    parser.add_argument("--sincronizar", metavar="BANCO",
+                        help="troca as alterações com o banco de outra filial (arquivo local) e sai")
+    args, qt_args = parser.parse_known_args()
+    if args.servidor and (args.backup or args.restaurar or args.backup_automatico):
+        parser.error("o backup de um banco remoto é feito no servidor (servidor.py --backup)")
+
+    if args.backup:
+        relatorio = fazer_backup(args.backup, args.db)
+        print(f"Backup salvo em {relatorio['arquivo']}: {relatorio['bytes'] / 1e6:.1f} MB "
+              f"({relatorio['bytes_compactados'] / 1e6:.1f} MB compactado) em {relatorio['segundos']:.2f}s, "
+              f"{relatorio['reinicios']} reinícios")
+        print("fases: " + ", ".join(f"{nome} {segundos:.2f}s" for nome, segundos in relatorio["fases"].items()))
+        if relatorio["arquivo_morto"]:
+            print(f"Arquivo morto salvo em {relatorio['arquivo_morto']['arquivo']}: "
+                  f"{relatorio['arquivo_morto']['bytes'] / 1e6:.1f} MB")
+        for arquivo in relatorio["removidos"]:
+            print(f"removido: {arquivo}")
+        sys.exit(0)
+
+    if args.restaurar:
+        relatorio = restaurar_backup(args.restaurar, args.db)
+        print(f"Banco {relatorio['banco']}{' e arquivo morto' if relatorio['arquivo_morto'] else ''} "
+              f"restaurado em {relatorio['segundos']:.2f}s ({relatorio['mb_por_segundo']:.1f} MB/s)")
+        sys.exit(0)
+
+    # Fases da inicialização: (nome, segundos)
+    fases = [("importações", TEMPO_IMPORTACAO)]
+    marca = [time.perf_counter()]
+    def marcar_fase(nome):
+        agora = time.perf_counter()
+        fases.append((nome, agora - marca[0]))
+        marca[0] = agora
+
+    if args.servidor:
+        # O servidor é quem cria e migra o banco
+        db = DatabaseRemota(args.servidor, token=os.environ.get("OFICINA_TOKEN"))
+    else:
+        init_db(args.db)
+        db = Database(args.db)
+    if args.perfil_consultas is not None:
+        db.ativar_perfil(args.perfil_consultas)
+    marcar_fase("banco de dados")
+
+    if args.importar:
+        tipo, arquivo = args.importar
+        if tipo not in TIPOS_IMPORTACAO:
+            parser.error(f"tipo de importação inválido: {tipo}")
+        def mostrar_progresso(importados, rejeitados, segundos):
+            print(f"\r{importados} importados, {rejeitados} rejeitados "
+                  f"({(importados + rejeitados) / segundos:.0f} linhas/s)", end="", flush=True)
+        relatorio = importar_arquivo(db, tipo, arquivo, mostrar_progresso)
+        print(f"\r{relatorio['importados']} importados, {relatorio['rejeitados']} rejeitados "
+              f"em {relatorio['segundos']:.2f}s ({relatorio['linhas_por_segundo']:.0f} linhas/s)")
+        for linha, motivo in relatorio["erros"]:
+            print(f"linha {linha}: {motivo}")
+        sys.exit(0)
+
+    if args.arquivar is not None:
+        relatorio = arquivar(db, args.arquivar, progresso=lambda totais: print(
+            f"\r{totais['ordens_servico']} OS e {totais['vendas']} vendas arquivadas", end="", flush=True))
+        print(f"\r{relatorio['ordens_servico']} OS ({relatorio['os_pecas']} peças) e {relatorio['vendas']} vendas "
+              f"({relatorio['venda_itens']} itens) arquivadas em {relatorio['segundos']:.2f}s")
+        sys.exit(0)
+
+    if args.filial:
+        print(db.filial())
+        sys.exit(0)
+
+    if args.enviar_alteracoes:
+        par, arquivo = args.enviar_alteracoes
+        relatorio = enviar_alteracoes(db, par, arquivo)
+        print(f"{relatorio['alteracoes']} alterações gravadas em {arquivo} (até {relatorio['ate']})")
+        sys.exit(0)
+
+    def mostrar_sincronizacao(relatorio):
+        print(f"{relatorio['aplicadas']} aplicadas, {relatorio['ignoradas']} ignoradas, "
+              f"{relatorio['rejeitadas']} rejeitadas em {relatorio['segundos']:.2f}s")
+        for erro in relatorio["erros"]:
+            print(erro)
+
+    if args.receber_alteracoes:
+        mostrar_sincronizacao(receber_alteracoes(db, args.receber_alteracoes))
+        sys.exit(0)
+
+    if args.sincronizar:
+        init_db(args.sincronizar)
+        outro = Database(args.sincronizar)
+        relatorio = sincronizar(db, outro)
+        outro.close()
+        for sentido in ("enviadas", "recebidas"):
+            print(f"{sentido.capitalize()}: ", end="")
+            mostrar_sincronizacao(relatorio[sentido])
+        sys.exit(0)
+
+    if args.reconstruir_resumos:
+        inicio = time.perf_counter()
+        db.reconstruir_resumos()
+        print(f"Resumos reconstruídos em {time.perf_counter() - inicio:.2f}s")
+        sys.exit(0)
+
+    if args.exportar:
+        relatorio, arquivo = args.exportar
+        if relatorio not in RELATORIOS:
+            parser.error(f"relatório inválido: {relatorio}")
+        if arquivo.lower().endswith(".pdf"):
+            # O PDF é desenhado pelo Qt, que precisa de uma aplicação (sem janela)
+            os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+            app = QApplication(sys.argv[:1] + qt_args)
+        inicio = time.perf_counter()
+        linhas = exportar_relatorio(db, relatorio, arquivo,
+                                    lambda total: print(f"\r{total} linhas", end="", flush=True))
+        print(f"\r{linhas} linhas exportadas em {time.perf_counter() - inicio:.2f}s")
+        sys.exit(0)
+
+    app = QApplication(sys.argv[:1] + qt_args)
+    aplicar_estilo(app)
+    marcar_fase("aplicação e estilo")
+
+    window = MainWindow(db)
+    marcar_fase("janela principal")
     window.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+
+    if args.perfil_inicializacao:
+        def mostrar_perfil():
+            window.pagina_exibida.disconnect(mostrar_perfil)
+            marcar_fase("primeira lista")
+            for nome, segundos in fases:
+                print(f"{nome:<22}{segundos * 1000:9.1f} ms")
+            print(f"{'total':<22}{sum(segundos for _, segundos in fases) * 1000:9.1f} ms")
+        # A janela é pintada na primeira volta do laço de eventos
+        QTimer.singleShot(0, lambda: marcar_fase("exibição"))
+        window.pagina_exibida.connect(mostrar_perfil)
+
+    agendador = None
+    if args.backup_automatico:
+        agendador = AgendadorBackup(args.backup_automatico, args.db, ao_concluir=window.backup_concluido.emit)
+        agendador.start()
+    codigo = app.exec_()
+    if agendador:
+        # Espera um backup em andamento terminar
+        agendador.parar()
+    sys.exit(codigo)
\ No newline at end of file
@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+# sis importa o PyQt5; os testes não abrem janelas
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sis
+
+
+@pytest.fixture
+def caminho(tmp_path):
+    caminho = str(tmp_path / "oficina.db")
+    sis.init_db(caminho)
+    return caminho
+
+
+@pytest.fixture
+def db(caminho):
+    db = sis.Database(caminho)
+    yield db
+    db.close()
@@ -0,0 +1,16 @@
+import pytest
+
+
+@pytest.mark.parametrize("quantidade, estoque_minimo, alerta", [
+    (2, 5, True),
+    (5, 5, True),
+    (9, 5, False),
+    (0, None, False),
+    (None, 5, False),
+])
+def test_cadastro_conta_alerta_como_o_gatilho(db, quantidade, estoque_minimo, alerta):
+    assert db.contagem_alertas() == 0
+    db.cadastrar_produto("P1", "Pastilha", quantidade, 10.0, 20.0, estoque_minimo)
+    gravados = db.conn.execute("SELECT COUNT(*) FROM alertas_estoque").fetchone()[0]
+    assert gravados == int(alerta)
+    assert db.contagem_alertas() == gravados
@@ -0,0 +1,67 @@
+import threading
+import time
+
+import sis
+
+
+def test_alteracoes_da_visao_aberta(db):
+    ultima = db.ultima_alteracao()
+    cliente = db.cadastrar_cliente("Ana", "", "82999990000")
+    resultado = sis.calcular_alteracoes(db, ultima, sis.Visao.CLIENTES, {})
+    assert not resultado["recarregar"]
+    assert list(resultado["atuais"]) == [cliente] and not resultado["removidos"]
+
+    # Alteração de um cliente chega às OS dele pela coluna que o referencia
+    moto = db.cadastrar_moto(cliente, "Honda", "CG 160", "ABC1D23", "2020", "Preta")
+    os_id = db.criar_ordem_servico(cliente, moto, "Revisão")
+    ultima = db.ultima_alteracao()
+    db.conn.execute("UPDATE clientes SET nome = 'Ana Lima' WHERE id = ?", (cliente,))
+    db.conn.commit()
+    resultado = sis.calcular_alteracoes(db, ultima, sis.Visao.OS, {})
+    assert resultado["atuais"][os_id][1] == "Ana Lima"
+    assert resultado["ultima"] == db.ultima_alteracao()
+
+    ultima = db.ultima_alteracao()
+    db.excluir_funcionario(db.cadastrar_funcionario("Bia", "12345678901", "", "Vendas", "", 0.0))
+    resultado = sis.calcular_alteracoes(db, ultima, sis.Visao.FUNCIONARIOS, {})
+    assert not resultado["atuais"] and len(resultado["removidos"]) == 1
+
+
+def test_muitas_alteracoes_recarregam_a_visao(db):
+    ultima = db.ultima_alteracao()
+    for i in range(sis.LIMITE_ALTERACOES_VISAO + 1):
+        db.cadastrar_cliente(f"Cliente {i}", "", "82999990000")
+    resultado = sis.calcular_alteracoes(db, ultima, sis.Visao.CLIENTES, {})
+    assert resultado["recarregar"] and resultado["ultima"] == db.ultima_alteracao()
+
+
+def test_verificacao_nao_usa_o_banco_na_thread_da_interface(db, caminho):
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication([])
+    janela = sis.MainWindow(db)
+    janela.alteracoes_timer.stop()
+
+    def esperar(condicao):
+        limite = time.perf_counter() + 10
+        while not condicao():
+            assert time.perf_counter() < limite
+            app.processEvents()
+
+    # A primeira lista (OS) é aberta depois que a janela aparece
+    esperar(lambda: janela.visao_atual is not None)
+    janela.listar_clientes()
+    esperar(lambda: janela._token_tabela is None)
+    outro = sis.Database(caminho)
+    cliente = outro.cadastrar_cliente("Ana", "", "82999990000")
+    outro.close()
+
+    comandos_na_interface = []
+    principal = threading.current_thread()
+    db.conexoes.rastrear(lambda sql: threading.current_thread() is principal and comandos_na_interface.append(sql))
+    janela.verificar_alteracoes()
+    esperar(lambda: janela._token_alteracoes is None)
+    db.conexoes.rastrear(None)
+
+    assert not comandos_na_interface
+    assert [linha[0] for linha in janela.table.model().linhas] == [cliente]
+    janela.close()
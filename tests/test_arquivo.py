@@ -0,0 +1,73 @@
+import time
+
+import sis
+
+ANTIGA = int(time.time()) - 400 * 86400
+
+
+def _dados(db):
+    dono = db.cadastrar_cliente("Ana", "", "82999990000")
+    moto = db.cadastrar_moto(dono, "Honda", "CG 160", "ABC1D23", "2020", "Preta")
+    # Cliente sem motos, só com a OS e a venda que serão arquivadas
+    avulso = db.cadastrar_cliente("Bruno", "", "82999990001")
+    produto = db.cadastrar_produto("P1", "Pastilha", 50, 10.0, 20.0, 1)
+    antiga = db.criar_ordem_servico(avulso, moto, "Troca do freio dianteiro")
+    db.adicionar_peca_os(antiga, produto, 2)
+    db.concluir_os(antiga, 80.0)
+    recente = db.criar_ordem_servico(dono, moto, "Revisão geral")
+    # registrar_venda devolve o total; os ids são os da ordem de gravação
+    db.registrar_venda(avulso, [(produto, 1)])
+    db.registrar_venda(None, [(produto, 3)])
+    venda_antiga, venda_recente = [linha[0] for linha in db.conn.execute("SELECT id FROM vendas ORDER BY id")]
+    db.conn.execute("UPDATE ordens_servico SET data = ? WHERE id = ?", (ANTIGA, antiga))
+    db.conn.execute("UPDATE vendas SET data = ? WHERE id = ?", (ANTIGA, venda_antiga))
+    db.conn.commit()
+    return avulso, antiga, recente, venda_antiga, venda_recente
+
+
+def _contar(db, tabela):
+    return db.conn.execute(f"SELECT COUNT(*) FROM {tabela}").fetchone()[0]
+
+
+def test_arquivamento_move_as_linhas_antigas(db):
+    _, antiga, recente, venda_antiga, venda_recente = _dados(db)
+    relatorio = sis.arquivar(db, dias=30)
+    assert {tabela: relatorio[tabela] for tabela in sis.TABELAS_ARQUIVO} == {
+        "ordens_servico": 1, "os_pecas": 1, "vendas": 1, "venda_itens": 1}
+    assert [linha[0] for linha in db.conn.execute("SELECT id FROM ordens_servico")] == [recente]
+    assert [linha[0] for linha in db.conn.execute("SELECT id FROM arquivo.ordens_servico")] == [antiga]
+    assert [linha[0] for linha in db.conn.execute("SELECT id FROM arquivo.vendas")] == [venda_antiga]
+    assert _contar(db, "arquivo.os_pecas") == _contar(db, "arquivo.venda_itens") == 1
+    # Nada mais a arquivar: outra passada não move nada
+    assert not any(sis.arquivar(db, dias=30)[tabela] for tabela in sis.TABELAS_ARQUIVO)
+
+
+def test_listagens_juntam_banco_e_arquivo(db):
+    _, antiga, recente, venda_antiga, venda_recente = _dados(db)
+    antes = (db.listar_os(), db.relatorio_vendas())
+    sis.arquivar(db, dias=30)
+    assert (db.listar_os(), db.relatorio_vendas()) == antes
+    assert [linha[0] for linha in db.listar_os()] == [recente, antiga]
+    assert [linha[0] for linha in db.relatorio_vendas()] == [venda_recente, venda_antiga]
+    assert [linha[0] for linha in db.cursor_os([antiga])] == [antiga]
+    assert db.calcular_total_os(antiga) == antes[0][1].total
+
+
+def test_exclusao_de_cliente_conta_o_arquivo(db):
+    avulso = _dados(db)[0]
+    sis.arquivar(db, dias=30)
+    sucesso, mensagem = db.excluir_cliente(avulso)
+    assert not sucesso and "1 ordem(ns) de serviço" in mensagem
+    db.conn.execute("DELETE FROM arquivo.ordens_servico")
+    db.conn.commit()
+    sucesso, mensagem = db.excluir_cliente(avulso)
+    assert not sucesso and "1 venda(s)" in mensagem
+
+
+def test_os_arquivada_continua_na_busca(db):
+    antiga = _dados(db)[1]
+    assert [linha[1] for linha in db.cursor_busca("freio", tipo="os")] == [antiga]
+    sis.arquivar(db, dias=30)
+    assert [linha[1] for linha in db.cursor_busca("freio", tipo="os")] == [antiga]
+    # O documento de uma OS que continua no banco não muda
+    assert len(db.search("revisão")) == 1
@@ -0,0 +1,136 @@
+import gzip
+import os
+import shutil
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+import sis
+
+
+def _corromper(caminho):
+    # Índice que não corresponde mais à tabela: o banco abre, mas não passa no integrity_check
+    conn = sqlite3.connect(caminho)
+    conn.executescript("CREATE TABLE lixo (a, b); CREATE INDEX lixo_a ON lixo (a);")
+    conn.executemany("INSERT INTO lixo VALUES (?, ?)", [(i, -i) for i in range(100)])
+    conn.commit()
+    conn.execute("PRAGMA writable_schema = ON")
+    conn.execute("UPDATE sqlite_master SET sql = 'CREATE INDEX lixo_a ON lixo (b)' WHERE name = 'lixo_a'")
+    conn.commit()
+    conn.close()
+
+
+def _clientes(caminho):
+    conn = sqlite3.connect(caminho)
+    try:
+        return [linha[0] for linha in conn.execute("SELECT nome FROM clientes ORDER BY id")]
+    finally:
+        conn.close()
+
+
+def test_backup_reiniciado_por_gravacao_concorrente(caminho, tmp_path):
+    conn = sqlite3.connect(caminho)
+    conn.execute("CREATE TABLE lastro (dados BLOB)")
+    conn.executemany("INSERT INTO lastro VALUES (randomblob(1000))", [()] * 2000)
+    conn.commit()
+    conn.close()
+    escritor = sqlite3.connect(caminho)
+
+    def gravar(restantes, total):
+        # Outra conexão grava no meio da cópia: ela recomeça no próximo passo
+        escritor.execute("INSERT INTO lastro VALUES (randomblob(100))")
+        escritor.commit()
+
+    try:
+        relatorio = sis.fazer_backup(str(tmp_path / "backups"), caminho, paginas=5, progresso=gravar)
+    finally:
+        gravadas = escritor.execute("SELECT COUNT(*) FROM lastro").fetchone()[0]
+        escritor.close()
+    # Reiniciada a cada passo, a cópia acaba feita em um passo só
+    assert relatorio["reinicios"] == sis.MAXIMO_REINICIOS_BACKUP + 1
+    # Mesmo reiniciada, a cópia é íntegra e completa
+    copia = str(tmp_path / "copia.db")
+    sis.restaurar_backup(relatorio["arquivo"], copia)
+    conn = sqlite3.connect(copia)
+    assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    assert conn.execute("SELECT COUNT(*) FROM lastro").fetchone()[0] == gravadas > 2000
+    conn.close()
+
+
+def test_backup_de_banco_corrompido_falha(caminho, tmp_path):
+    _corromper(caminho)
+    diretorio = tmp_path / "backups"
+    with pytest.raises(sqlite3.DatabaseError, match="integridade"):
+        sis.fazer_backup(str(diretorio), caminho)
+    assert os.listdir(diretorio) == []
+
+
+def test_restauracao_de_backup_corrompido_nao_altera_o_banco(db, caminho, tmp_path):
+    db.cadastrar_cliente("Ana", "", "82999990000")
+    corrompido = str(tmp_path / "corrompido.db")
+    shutil.copy(caminho, corrompido)
+    _corromper(corrompido)
+    arquivo = str(tmp_path / "oficina-20260101-000000.db.gz")
+    with open(corrompido, "rb") as entrada, gzip.open(arquivo, "wb") as saida:
+        shutil.copyfileobj(entrada, saida)
+    with pytest.raises(sqlite3.DatabaseError, match="integridade"):
+        sis.restaurar_backup(arquivo, caminho)
+    assert _clientes(caminho) == ["Ana"]
+    assert not os.path.exists(caminho + ".restauracao")
+
+
+def test_backup_e_restauracao_com_arquivo_morto(db, caminho, tmp_path):
+    cliente = db.cadastrar_cliente("Ana", "", "82999990000")
+    moto = db.cadastrar_moto(cliente, "Honda", "CG 160", "ABC1D23", "2020", "Preta")
+    antiga = db.criar_ordem_servico(cliente, moto, "Troca de óleo")
+    db.concluir_os(antiga, 50.0)
+    db.conn.execute("UPDATE ordens_servico SET data = data - 400 * 86400 WHERE id = ?", (antiga,))
+    db.conn.commit()
+    assert sis.arquivar(db, dias=30)["ordens_servico"] == 1
+    relatorio = sis.fazer_backup(str(tmp_path / "backups"), caminho)
+    assert relatorio["arquivo_morto"]["arquivo"] == sis.backup_do_arquivo(relatorio["arquivo"])
+    assert [arquivo for _, arquivo in sis.listar_backups(str(tmp_path / "backups"), caminho)] == [relatorio["arquivo"]]
+
+    # Alterações depois do backup são desfeitas pela restauração, nos dois bancos
+    db.cadastrar_cliente("Bruno", "", "82999990001")
+    db.conn.execute("DELETE FROM arquivo.ordens_servico")
+    db.conn.commit()
+    db.close()
+    restauracao = sis.restaurar_backup(relatorio["arquivo"], caminho)
+    assert restauracao["arquivo_morto"]
+    assert _clientes(caminho) == ["Ana"]
+    db = sis.Database(caminho)
+    try:
+        assert [linha[0] for linha in db.conn.execute("SELECT id FROM arquivo.ordens_servico")] == [antiga]
+        assert [linha[0] for linha in db.listar_os()] == [antiga]
+    finally:
+        db.close()
+
+
+def test_rotacao_mantem_recentes_diarios_e_mensais(caminho, tmp_path):
+    diretorio = tmp_path / "backups"
+    diretorio.mkdir()
+    # De 6 em 6 horas de 1 a 20/03/2026 e um por mês de 01/2025 a 02/2026
+    momentos = [datetime(2026, 3, 1) + timedelta(hours=6 * i) for i in range(80)]
+    momentos += [datetime(2025 + (mes - 1) // 12, (mes - 1) % 12 + 1, 15) for mes in range(1, 15)]
+
+    def nome(momento):
+        return str(diretorio / f"oficina-{momento:%Y%m%d-%H%M%S}.db.gz")
+
+    for momento in momentos:
+        open(nome(momento), "wb").close()
+        open(sis.backup_do_arquivo(nome(momento)), "wb").close()
+
+    removidos = sis._rotacionar_backups(str(diretorio), caminho, sis.RETENCAO_BACKUP)
+    # 7 mais recentes, o último de cada um dos 14 últimos dias e de cada um dos 12 últimos meses
+    recentes = sorted(momentos, reverse=True)[:7]
+    diarios = [datetime(2026, 3, dia, 18) for dia in range(7, 21)]
+    mensais = [datetime(2025, mes, 15) for mes in range(4, 13)] + [datetime(2026, 1, 15), datetime(2026, 2, 15)]
+    manter = {nome(momento) for momento in recentes + diarios + mensais}
+    assert len(manter) == 30
+    assert {arquivo for _, arquivo in sis.listar_backups(str(diretorio), caminho)} == manter
+    assert sorted(removidos) == sorted(set(map(nome, momentos)) - manter)
+    # As cópias do arquivo morto acompanham os seus backups
+    assert {sis.backup_do_arquivo(arquivo) for arquivo in manter} == {
+        str(diretorio / arquivo) for arquivo in os.listdir(diretorio) if "-arquivo" in arquivo}
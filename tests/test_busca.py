@@ -0,0 +1,59 @@
+import sis
+
+
+def _indexado(db):
+    # Conteúdo do índice comparado ao que os gatilhos gerariam a partir das tabelas
+    esperado = set()
+    for tipo, (codigo, tabela, _, conteudo) in sis.TIPOS_BUSCA.items():
+        esperado.update(db.conn.execute(f"SELECT id * 4 + {codigo}, '{tipo}', {conteudo.format(r='')} FROM {tabela}"))
+    return set(db.conn.execute("SELECT rowid, tipo, conteudo FROM busca")) == esperado
+
+
+def _ids(db, texto, tipo=None):
+    return [linha.id for linha in db.cursor_busca(texto, tipo=tipo)]
+
+
+def test_inclusao_entra_no_indice(db):
+    cliente = db.cadastrar_cliente("José Antônio", "123.456.789-01", "82999990000")
+    moto = db.cadastrar_moto(cliente, "Honda", "CG 160", "ABC1D23", "2020", "Preta")
+    produto = db.cadastrar_produto("P1", "Pastilha de freio", 50, 10.0, 20.0, 1)
+    os_id = db.criar_ordem_servico(cliente, moto, "Revisão do freio")
+    assert _indexado(db)
+    # Prefixos, sem acentos e o CPF sem pontuação
+    assert _ids(db, "jose anto") == [cliente]
+    assert _ids(db, "12345678901") == _ids(db, "123.456.789-01") == [cliente]
+    assert _ids(db, "abc1") == [moto]
+    assert _ids(db, "revisao") == [os_id]
+    assert {(linha.tipo, linha.id) for linha in db.search("freio")} == {("produto", produto), ("os", os_id)}
+    assert _ids(db, "freio", tipo="produto") == [produto]
+    assert _ids(db, "  ") == []
+
+
+def test_alteracao_e_exclusao_acompanham_o_indice(db):
+    cliente = db.cadastrar_cliente("Maria", "", "82999990000")
+    produto = db.cadastrar_produto("P1", "Vela", 50, 10.0, 20.0, 1)
+    db.conn.execute("UPDATE clientes SET nome = 'Mariana Souza' WHERE id = ?", (cliente,))
+    db.conn.execute("UPDATE produtos SET descricao = 'Vela de ignição', quantidade = 40 WHERE id = ?", (produto,))
+    db.conn.commit()
+    assert _indexado(db)
+    assert _ids(db, "souza") == [cliente] and _ids(db, "ignicao") == [produto]
+    assert _ids(db, "maria") == [cliente]
+
+    sucesso, _ = db.excluir_cliente(cliente)
+    assert sucesso
+    db.conn.execute("DELETE FROM produtos WHERE id = ?", (produto,))
+    db.conn.commit()
+    assert _indexado(db)
+    assert db.search("mariana") == db.search("vela") == []
+
+
+def test_mais_relevantes_primeiro(db):
+    longo = db.cadastrar_produto("P1", "Kit de revisão com filtro, vela, corrente e óleo para motor", 5, 1.0, 2.0, 1)
+    curto = db.cadastrar_produto("P2", "Óleo", 5, 1.0, 2.0, 1)
+    repetido = db.cadastrar_produto("P3", "Óleo 20W50, óleo mineral e óleo semissintético para motor de moto de "
+                                          "quatro tempos", 5, 1.0, 2.0, 1)
+    # bm25: o termo em um documento curto ou repetido pesa mais que uma menção em um longo
+    ordem = _ids(db, "oleo")
+    assert sorted(ordem[:2]) == sorted([curto, repetido]) and ordem[2] == longo
+    produtos = _ids(db, "oleo", tipo="produto")
+    assert produtos[2] == longo and [linha.id for linha in db.sugestoes_produtos("oleo")] == produtos
@@ -0,0 +1,27 @@
+import sis
+
+
+def test_atualizar_catalogo_rele_so_os_alterados(db, caminho):
+    mantido = db.cadastrar_produto("P1", "Pastilha", 5, 10.0, 20.0, 1)
+    alterado = db.cadastrar_produto("P2", "Corrente", 5, 10.0, 20.0, 1)
+    removido = db.cadastrar_produto("P3", "Vela", 5, 10.0, 20.0, 1)
+    assert db.produto_por_codigo("P2").quantidade == 5
+
+    # Outro terminal altera e exclui produtos
+    outro = sis.Database(caminho)
+    outro.conn.execute("UPDATE produtos SET quantidade = 9 WHERE id = ?", (alterado,))
+    outro.conn.execute("DELETE FROM produtos WHERE id = ?", (removido,))
+    outro.conn.commit()
+    outro.close()
+
+    db.atualizar_catalogo([alterado, removido])
+    assert db.obter_produto(alterado).quantidade == 9
+    assert db.obter_produto(removido) is None
+    assert db.produto_por_descricao("Pastilha").id == mantido
+
+
+def test_catalogo_recarregado_depois_de_invalidado(db):
+    produto_id = db.cadastrar_produto("P1", "Pastilha", 5, 10.0, 20.0, 1)
+    db.invalidar_catalogo()
+    assert db.produto_por_codigo("P1").id == produto_id
+    assert [produto.id for produto in db.catalogo_produtos()] == [produto_id]
@@ -0,0 +1,43 @@
+import threading
+
+import sis
+
+
+def _contar_clientes(conexoes):
+    return conexoes.conexao().execute("SELECT COUNT(*) FROM clientes").fetchone()[0]
+
+
+def test_leitura_nao_espera_transacao_de_escrita_aberta(caminho):
+    # busy_timeout zero: se a leitura precisasse esperar o escritor, daria
+    # "database is locked" na hora em vez de esperar
+    conexoes = sis.GerenciadorConexoes(caminho, busy_timeout=0)
+    antes = _contar_clientes(conexoes)
+    escrito, liberar = threading.Event(), threading.Event()
+    erros = []
+
+    def escritor():
+        try:
+            conn = conexoes.conexao()
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("INSERT INTO clientes (nome, cpf, telefone) VALUES (?, ?, ?)", ("Ana", "1", "2"))
+            escrito.set()
+            liberar.wait(10)
+            conn.commit()
+        except Exception as erro:
+            erros.append(erro)
+            escrito.set()
+        finally:
+            conexoes.fechar_thread()
+
+    thread = threading.Thread(target=escritor)
+    thread.start()
+    try:
+        assert escrito.wait(10)
+        # A transação do escritor está aberta: a leitura vê o retrato anterior
+        assert _contar_clientes(conexoes) == antes
+    finally:
+        liberar.set()
+        thread.join(10)
+    assert not erros
+    assert _contar_clientes(conexoes) == antes + 1
+    conexoes.fechar()
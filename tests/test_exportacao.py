@@ -0,0 +1,47 @@
+import csv
+import os
+import subprocess
+import sys
+
+import pytest
+
+# ru_maxrss só existe onde há o módulo resource (Linux, macOS)
+pytest.importorskip("resource")
+
+LINHAS = 1000000
+# Crescimento máximo do pico de memória (ru_maxrss) durante a exportação
+ORCAMENTO_MEMORIA_MB = 50
+
+# A exportação roda em outro processo: o pico de memória da geração dos dados
+# não esconde o da exportação
+EXPORTAR = """
+import os, resource, sys
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, sys.argv[1])
+import sis
+db = sis.Database(sys.argv[2])
+antes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+linhas = sis.exportar_relatorio(db, sis.Visao.VENDAS, sys.argv[3])
+print(linhas, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - antes)
+"""
+
+
+def test_exportar_um_milhao_de_linhas_com_memoria_constante(db, caminho, tmp_path):
+    db.conn.execute("""
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+        INSERT INTO vendas (cliente_id, data, total) SELECT NULL, 1700000000 + i, i % 500 FROM n
+    """, (LINHAS,))
+    db.conn.commit()
+    saida = str(tmp_path / "vendas.csv")
+
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    resultado = subprocess.run([sys.executable, "-c", EXPORTAR, raiz, caminho, saida],
+                               capture_output=True, text=True, check=True)
+    linhas, crescimento = map(int, resultado.stdout.split()[-2:])
+
+    assert linhas == LINHAS
+    # ru_maxrss vem em KiB no Linux e em bytes no macOS
+    por_mb = 1024 * 1024 if sys.platform == "darwin" else 1024
+    assert crescimento / por_mb < ORCAMENTO_MEMORIA_MB
+    with open(saida, encoding="utf-8-sig") as arquivo:
+        assert sum(1 for _ in csv.reader(arquivo, delimiter=";")) == LINHAS + 1
@@ -0,0 +1,102 @@
+import sqlite3
+
+import pytest
+
+import sis
+
+
+def _csv(tmp_path, nome, linhas):
+    caminho = tmp_path / nome
+    caminho.write_text("\n".join(linhas) + "\n", encoding="utf-8")
+    return str(caminho)
+
+
+def _contar(db, tabela):
+    return db.conn.execute(f"SELECT COUNT(*) FROM {tabela}").fetchone()[0]
+
+
+def test_produtos_validos_e_rejeitados(db, tmp_path):
+    caminho = _csv(tmp_path, "produtos.csv", [
+        "codigo;descricao;quantidade;preco_custo;preco_venda;estoque_minimo",
+        "P1;Pastilha;10;12,50;25,90;2",
+        "P2;;5;1;2;0",
+        "P3;Vela;cinco;1;2;0",
+        ";;;;;",
+        "P4;Óleo;-1;1;2;0",
+        "P5;Corrente;3.0;40;79,9;",
+    ])
+    progresso = []
+    relatorio = sis.importar_arquivo(db, "produtos", caminho, lambda *valores: progresso.append(valores[:2]))
+    assert (relatorio["importados"], relatorio["rejeitados"]) == (2, 3)
+    # Número da linha no arquivo (a vazia não conta como rejeitada)
+    assert relatorio["erros"] == [(3, "descrição é obrigatória"), (4, "valores numéricos inválidos"),
+                                  (6, "quantidade deve ser maior ou igual a zero")]
+    assert progresso == [(2, 3)]
+    assert db.conn.execute("SELECT codigo, quantidade, preco_custo, preco_venda, estoque_minimo FROM produtos "
+                           "ORDER BY id").fetchall() == [("P1", 10, 12.5, 25.9, 2), ("P5", 3, 40.0, 79.9, 0)]
+    # Saldo inicial no histórico do estoque e os produtos no catálogo
+    assert db.conn.execute("SELECT SUM(quantidade) FROM movimentos_estoque WHERE tipo = 'inicial'").fetchone()[0] == 13
+    assert len(db.catalogo_produtos()) == 2
+
+
+def test_clientes_e_motos(db, tmp_path):
+    clientes = _csv(tmp_path, "clientes.csv", [
+        "nome,cpf,telefone",
+        "Ana,111.222.333-44,82999990000",
+        "Bruno,,8299999",
+        ",,82999990001",
+    ])
+    relatorio = sis.importar_arquivo(db, "clientes", clientes)
+    assert (relatorio["importados"], relatorio["rejeitados"]) == (1, 2)
+    assert [erro for _, erro in relatorio["erros"]] == ["telefone deve conter exatamente 11 dígitos", "nome é obrigatório"]
+    ana = db.cliente_por_cpf("111.222.333-44")
+
+    motos = _csv(tmp_path, "motos.csv", [
+        "cliente_id,cliente_cpf,marca,modelo,placa,ano,cor",
+        f"{ana},,Honda,CG 160,abc1d23,2020,Preta",
+        ",111.222.333-44,Yamaha,Fazer,XYZ9876,,",
+        "999,,Honda,Biz,AAA1234,,",
+        f"{ana},,Honda,,AAA1234,,",
+        f"{ana},,Honda,Pop,AA1234,,",
+    ])
+    relatorio = sis.importar_arquivo(db, "motos", motos)
+    assert (relatorio["importados"], relatorio["rejeitados"]) == (2, 3)
+    assert [erro for _, erro in relatorio["erros"]] == [
+        "cliente não encontrado", "marca e modelo são obrigatórios", "formato de placa inválido"]
+    assert [(moto.placa, moto.modelo) for moto in db.listar_motos(ana)] == [("ABC1D23", "CG 160"), ("XYZ9876", "Fazer")]
+
+
+def test_erro_na_gravacao_desfaz_so_o_lote(db, tmp_path):
+    # Lotes de duas linhas; o segundo falha no banco
+    db.conn.execute("CREATE TRIGGER recusar BEFORE INSERT ON clientes WHEN new.nome = 'Erro' "
+                    "BEGIN SELECT RAISE(ABORT, 'recusado'); END")
+    db.conn.commit()
+    caminho = _csv(tmp_path, "clientes.csv", [
+        "nome,cpf,telefone",
+        "Ana,,82999990000",
+        "Bruno,,82999990001",
+        "Carla,,82999990002",
+        "Erro,,82999990003",
+        "Davi,,82999990004",
+    ])
+    with pytest.raises(sqlite3.IntegrityError, match="recusado"):
+        sis.importar_arquivo(db, "clientes", caminho, tamanho_lote=2)
+    assert [linha.nome for linha in db.cursor_clientes()] == ["Ana", "Bruno"]
+    assert not db.conn.in_transaction
+    # O banco segue utilizável depois do erro
+    db.cadastrar_cliente("Elisa", "", "82999990005")
+    assert _contar(db, "clientes") == 3
+
+
+def test_xlsx(db, tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    planilha = openpyxl.Workbook()
+    planilha.active.append(["Codigo", "Descricao", "Quantidade", "Preco_custo", "Preco_venda"])
+    planilha.active.append(["P1", "Pastilha", 10, 12.5, 25.9])
+    planilha.active.append([None, None, None, None, None])
+    planilha.active.append(["P2", None, 1, 1, 2])
+    caminho = str(tmp_path / "produtos.xlsx")
+    planilha.save(caminho)
+    relatorio = sis.importar_arquivo(db, "produtos", caminho)
+    assert (relatorio["importados"], relatorio["rejeitados"]) == (1, 1)
+    assert relatorio["erros"] == [(4, "descrição é obrigatória")]
@@ -0,0 +1,144 @@
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+
+import pytest
+
+import sis
+
+REPOSITORIO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _dados(db):
+    cliente = db.cadastrar_cliente("Ana Silva", "12345678901", "11999999999")
+    avulso = db.cadastrar_cliente("Sem Histórico", "", "")
+    moto = db.cadastrar_moto(cliente, "Honda", "CG 160", "ABC1D23")
+    produto = db.cadastrar_produto("P1", "Vela", 10, 5.0, 9.0, 1)
+    os_id = db.criar_ordem_servico(cliente, moto, "Revisão")
+    db.adicionar_peca_os(os_id, produto, 1)
+    db.registrar_venda(cliente, [(produto, 1)])
+    return cliente, avulso, moto, os_id
+
+
+def _comandos(db, chamada):
+    # Comandos SQL executados pela chamada, já com os parâmetros
+    comandos = []
+    db.conn.set_trace_callback(comandos.append)
+    try:
+        resultado = chamada()
+        if hasattr(resultado, "fetchall"):
+            resultado.fetchall()
+    finally:
+        db.conn.set_trace_callback(None)
+    return [sql for sql in comandos if sql.lstrip().upper().startswith("SELECT")]
+
+
+def _plano(db, sql):
+    return [linha[3] for linha in db.conn.execute("EXPLAIN QUERY PLAN " + sql)]
+
+
+def test_banco_novo_fica_na_ultima_versao(caminho):
+    conn = sqlite3.connect(caminho)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(sis.MIGRACOES)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    conn.close()
+
+
+def test_banco_existente_e_migrado_no_lugar(tmp_path):
+    caminho = str(tmp_path / "oficina_motos.db")
+    shutil.copy(os.path.join(REPOSITORIO, "oficina_motos.db"), caminho)
+    sis.init_db(caminho)
+    conn = sqlite3.connect(caminho)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(sis.MIGRACOES)
+    indices = {linha[0] for linha in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    conn.close()
+    assert {"idx_motos_cliente", "idx_os_cliente", "idx_os_moto", "idx_os_pecas_os", "idx_vendas_cliente",
+            "idx_venda_itens_venda"} <= indices
+    # Abrir de novo não refaz nada
+    sis.init_db(caminho)
+
+
+def test_datas_em_texto_viram_inteiros(tmp_path):
+    caminho = str(tmp_path / "oficina_motos.db")
+    shutil.copy(os.path.join(REPOSITORIO, "oficina_motos.db"), caminho)
+    # OS e vendas como o sistema gravava antes da migração: data em texto, hora local
+    datas = ["2024-01-31 23:59:59", "2024-02-01 08:30:00", "2025-06-15 12:00:00"]
+    conn = sqlite3.connect(caminho)
+    cliente = conn.execute("SELECT MIN(id) FROM clientes").fetchone()[0]
+    produto = conn.execute("SELECT MIN(id) FROM produtos").fetchone()[0]
+    conn.execute("INSERT INTO motos (cliente_id, marca, modelo, placa) VALUES (?, 'Honda', 'CG 160', 'ABC1D23')",
+                 (cliente,))
+    moto = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+    for data in datas:
+        conn.execute("INSERT INTO ordens_servico (cliente_id, moto_id, descricao, status, mao_obra, data) "
+                     "VALUES (?, ?, 'Revisão', 'Concluída', 50, ?)", (cliente, moto, data))
+        conn.execute("INSERT INTO os_pecas (os_id, produto_id, quantidade) VALUES (last_insert_rowid(), ?, 1)",
+                     (produto,))
+        conn.execute("INSERT INTO vendas (cliente_id, data) VALUES (?, ?)", (cliente, data))
+        conn.execute("INSERT INTO venda_itens (venda_id, produto_id, quantidade) VALUES (last_insert_rowid(), ?, 2)",
+                     (produto,))
+    conn.commit()
+    conn.close()
+
+    sis.init_db(caminho)
+    instantes = [int(datetime.strptime(data, "%Y-%m-%d %H:%M:%S").timestamp()) for data in datas]
+    conn = sqlite3.connect(caminho)
+    for tabela in ("ordens_servico", "vendas"):
+        assert conn.execute(f"SELECT data, typeof(data) FROM {tabela} ORDER BY id").fetchall() == [
+            (instante, "integer") for instante in instantes]
+    # Os resumos e os totais calculados na migração continuam nos dias gravados
+    assert conn.execute("SELECT dia, vendas, ordens FROM resumo_diario ORDER BY dia").fetchall() == [
+        ("2024-01-31", 1, 1), ("2024-02-01", 1, 1), ("2025-06-15", 1, 1)]
+    assert conn.execute("SELECT DISTINCT total FROM ordens_servico").fetchall() == [(650.0,)]
+    conn.close()
+    # O filtro por período usa os inteiros
+    db = sis.Database(caminho)
+    try:
+        assert [linha.data for linha in db.listar_os(inicio=instantes[1], fim=instantes[2])] == [instantes[1]]
+    finally:
+        db.close()
+
+
+# Métodos com as consultas frequentes -> índice que o plano precisa usar
+CONSULTAS = {
+    "listar_motos": (lambda db, d: db.listar_motos(d["cliente"]), "idx_motos_cliente"),
+    "excluir_cliente (motos)": (lambda db, d: db.excluir_cliente(d["avulso"]), "idx_motos_cliente"),
+    "excluir_cliente (OS)": (lambda db, d: db.excluir_cliente(d["avulso"]), "idx_os_cliente"),
+    "excluir_cliente (vendas)": (lambda db, d: db.excluir_cliente(d["avulso"]), "idx_vendas_cliente"),
+    "ids_relacionados (moto)": (lambda db, d: db.ids_relacionados("ordens_servico", "moto_id", [d["moto"]]),
+                                "idx_os_moto"),
+    "ids_relacionados (cliente)": (lambda db, d: db.ids_relacionados("vendas", "cliente_id", [d["cliente"]]),
+                                   "idx_vendas_cliente"),
+    "relatorio_vendas do período": (lambda db, d: db.relatorio_vendas(inicio=d["inicio"]), "idx_vendas_data"),
+    "listar_os do período": (lambda db, d: db.listar_os(inicio=d["inicio"]), "idx_os_data"),
+}
+
+
+@pytest.mark.parametrize("nome", CONSULTAS)
+def test_consultas_frequentes_usam_indice(db, nome):
+    cliente, avulso, moto, _ = _dados(db)
+    dados = {"cliente": cliente, "avulso": avulso, "moto": moto, "inicio": int(time.time()) - 86400}
+    chamada, indice = CONSULTAS[nome]
+    planos = [_plano(db, sql) for sql in _comandos(db, lambda: chamada(db, dados))]
+    assert planos, nome
+    usados = [passo for plano in planos for passo in plano if indice in passo]
+    assert usados and all("USING INDEX" in passo or "USING COVERING INDEX" in passo for passo in usados), planos
+    # Nenhuma tabela percorrida inteira (json_each é a lista de ids do filtro)
+    varreduras = [passo for plano in planos for passo in plano
+                  if passo.startswith("SCAN") and not passo.startswith("SCAN json_each")]
+    assert not varreduras, planos
+
+
+@pytest.mark.parametrize("tabela, coluna, indice", [
+    ("os_pecas", "os_id", "idx_os_pecas_os"),
+    ("os_pecas", "produto_id", "idx_os_pecas_produto"),
+    ("venda_itens", "venda_id", "idx_venda_itens_venda"),
+    ("venda_itens", "produto_id", "idx_venda_itens_produto"),
+])
+def test_itens_pela_chave_estrangeira_usam_indice(db, tabela, coluna, indice):
+    # Itens de uma OS/venda e histórico de um produto
+    plano = _plano(db, f"SELECT quantidade FROM {tabela} WHERE {coluna} = 1")
+    assert any(indice in passo and "USING INDEX" in passo for passo in plano), plano
+    assert not any(passo.startswith("SCAN") for passo in plano), plano
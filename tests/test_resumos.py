@@ -0,0 +1,60 @@
+import time
+
+import sis
+
+ANTIGA = int(time.time()) - 400 * 86400
+
+
+def _resumos(db):
+    # Os três resumos, com os valores arredondados (somas em ordens diferentes)
+    return {tabela: [tuple(round(v, 2) if isinstance(v, float) else v for v in linha)
+                     for linha in db.conn.execute(f"SELECT * FROM {tabela} ORDER BY 1, 2")]
+            for tabela in ("resumo_diario", "resumo_mensal", "resumo_produtos")}
+
+
+def _movimentar(db):
+    cliente = db.cadastrar_cliente("Ana", "", "82999990000")
+    moto = db.cadastrar_moto(cliente, "Honda", "CG 160", "ABC1D23", "2020", "Preta")
+    pastilha = db.cadastrar_produto("P1", "Pastilha", 100, 10.0, 25.5, 1)
+    oleo = db.cadastrar_produto("P2", "Óleo", 100, 20.0, 39.9, 1)
+    db.registrar_venda(cliente, [(pastilha, 2), (oleo, 1)])
+    db.registrar_venda(None, [(oleo, 3)])
+    # Venda e OS de um ano atrás, gravadas direto com a data antiga
+    db.conn.execute("INSERT INTO vendas (cliente_id, data, total) VALUES (?, ?, 51)", (cliente, ANTIGA))
+    venda = db.conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+    db.conn.execute("INSERT INTO venda_itens (venda_id, produto_id, quantidade, preco_unitario) VALUES (?, ?, 2, 25.5)",
+                    (venda, pastilha))
+    db.conn.execute("INSERT INTO ordens_servico (cliente_id, moto_id, descricao, status, mao_obra, data) "
+                    "VALUES (?, ?, 'Freio', 'Concluída', 70, ?)", (cliente, moto, ANTIGA))
+    antiga = db.conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+    db.conn.execute("INSERT INTO os_pecas (os_id, produto_id, quantidade, preco_unitario) VALUES (?, ?, 1, 39.9)",
+                    (antiga, oleo))
+    db.conn.commit()
+    os_id = db.criar_ordem_servico(cliente, moto, "Revisão")
+    db.adicionar_peca_os(os_id, pastilha, 4)
+    db.concluir_os(os_id, 80.0)
+    # Mão de obra corrigida e uma OS ainda aberta
+    db.concluir_os(os_id, 95.5)
+    aberta = db.criar_ordem_servico(cliente, moto, "Barulho no motor")
+    db.adicionar_peca_os(aberta, oleo, 1)
+
+
+def test_resumos_iguais_aos_reconstruidos(db):
+    _movimentar(db)
+    mantidos = _resumos(db)
+    assert len(mantidos["resumo_diario"]) == len(mantidos["resumo_mensal"]) == 2
+    hoje = mantidos["resumo_diario"][1]
+    assert hoje[1:] == (2, 210.6, 100.0, 6, 2, 1, 95.5, 141.9, 60.0, 5)
+    db.reconstruir_resumos()
+    assert _resumos(db) == mantidos
+
+
+def test_resumos_reconstruidos_com_o_arquivo(db):
+    _movimentar(db)
+    mantidos = _resumos(db)
+    relatorio = sis.arquivar(db, dias=30)
+    assert relatorio["vendas"] == relatorio["ordens_servico"] == 1
+    # O arquivamento não mexe nos resumos e a reconstrução lê também o arquivo
+    assert _resumos(db) == mantidos
+    db.reconstruir_resumos()
+    assert _resumos(db) == mantidos
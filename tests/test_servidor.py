@@ -0,0 +1,91 @@
+import pytest
+
+import servidor
+import sis
+
+
+TOKEN = "segredo"
+
+
+@pytest.fixture
+def servico(caminho):
+    servico = servidor.ServidorOficina(sis.Database(caminho), porta=0, token=TOKEN)
+    servico.url = servico.iniciar_em_segundo_plano()
+    yield servico
+    servico.parar()
+
+
+@pytest.fixture
+def remoto(servico):
+    db = sis.DatabaseRemota(servico.url)
+    yield db, servico
+    db.close()
+
+
+def test_todo_metodo_publico_esta_classificado():
+    publicos = {nome for nome in dir(sis.Database) if not nome.startswith("_") and callable(getattr(sis.Database, nome))}
+    assert servidor.METODOS == publicos - {"close"}
+    assert not servidor.METODOS_TERMINAL & servidor.METODOS_ADMINISTRACAO
+    assert servidor.METODOS_ESCRITA | servidor.METODOS_ESTADO <= servidor.METODOS
+
+
+@pytest.mark.parametrize("token", [None, "errado"])
+def test_administracao_exige_o_token(servico, token):
+    db = sis.DatabaseRemota(servico.url, token=token)
+    try:
+        for nome in ("ativar_perfil", "perfil_consultas", "arquivar_lote", "lote_sincronizacao"):
+            with pytest.raises(sis.ErroRemoto, match="administrador"):
+                db._chamar(nome)
+        with pytest.raises(sis.ErroRemoto, match="inexistente"):
+            db._chamar("close")
+        assert db.listar_clientes() == []
+    finally:
+        db.close()
+
+
+def test_administracao_com_o_token(servico):
+    db = sis.DatabaseRemota(servico.url, token=TOKEN)
+    try:
+        db.ativar_perfil()
+        assert db.perfil_ativo()
+        assert "ate" in db.lote_sincronizacao("outra")
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("nome, args, escrita", [
+    ("registrar_venda", [None, []], True),
+    ("recontar_alertas", [], True),
+    ("produto_por_codigo", ["P1"], True),
+    ("sugestoes_produtos", [], True),
+    ("sugestoes_produtos", ["past"], False),
+    ("listar_motos", [1], False),
+])
+def test_caches_passam_pela_thread_de_escrita(remoto, nome, args, escrita):
+    _, servico = remoto
+    esperado = servico._escritor if escrita else servico._leitores
+    assert servico._executor(nome, args, {}) is esperado
+
+
+def test_catalogo_e_alertas_pelo_servidor(remoto):
+    db, _ = remoto
+    produto_id = db.cadastrar_produto("P1", "Pastilha", 2, 10.0, 20.0, 5)
+    assert db.produto_por_codigo("P1")[0] == produto_id
+    assert db.recontar_alertas() is None
+    assert db.contagem_alertas() == 1
+    db.registrar_venda(None, [(produto_id, 1)])
+    assert [produto[0] for produto in db.sugestoes_produtos()] == [produto_id]
+
+
+def test_conjuntos_de_ids_pelo_servidor(remoto):
+    # verificar_alteracoes passa os ids alterados como conjuntos
+    db, _ = remoto
+    cliente = db.cadastrar_cliente("Ana", "", "82999990000")
+    moto = db.cadastrar_moto(cliente, "Honda", "CG 160", "ABC1D23", "2020", "Preta")
+    os_id = db.criar_ordem_servico(cliente, moto, "Revisão")
+    produto = db.cadastrar_produto("P1", "Pastilha", 2, 10.0, 20.0, 5)
+    db.catalogo_produtos()
+    db.atualizar_catalogo({produto})
+    assert db.obter_produto(produto)[0] == produto
+    assert db.ids_relacionados("ordens_servico", "cliente_id", {cliente}) == [os_id]
+    assert [linha[0] for linha in db.cursor_os({os_id}).fetchall()] == [os_id]
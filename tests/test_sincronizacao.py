@@ -0,0 +1,126 @@
+import time
+
+import pytest
+
+import sis
+
+
+@pytest.fixture
+def filiais(tmp_path):
+    bancos = []
+    for nome in ("a", "b"):
+        caminho = str(tmp_path / f"{nome}.db")
+        sis.init_db(caminho)
+        bancos.append(sis.Database(caminho))
+    yield bancos
+    for db in bancos:
+        db.close()
+
+
+def _nomes(db, tabela="clientes", coluna="nome"):
+    return sorted(linha[0] for linha in db.conn.execute(f"SELECT {coluna} FROM {tabela}"))
+
+
+def _renomear(db, cliente, nome, momento):
+    # Alteração local com o momento escolhido (a versão usada nos conflitos)
+    db.conn.execute("UPDATE clientes SET nome = ? WHERE id = ?", (nome, cliente))
+    db.conn.execute("UPDATE alteracoes SET momento = ? WHERE seq = (SELECT MAX(seq) FROM alteracoes)", (momento,))
+    db.conn.commit()
+
+
+def _id_por_nome(db, nome):
+    return db.conn.execute("SELECT id FROM clientes WHERE nome = ?", (nome,)).fetchone()[0]
+
+
+def test_sincronizar_nos_dois_sentidos(filiais):
+    a, b = filiais
+    # Os ids locais colidem: o cliente 1 de cada filial é outra pessoa
+    ana = a.cadastrar_cliente("Ana", "", "82999990000")
+    moto = a.cadastrar_moto(ana, "Honda", "CG 160", "ABC1D23", "2020", "Preta")
+    a.criar_ordem_servico(ana, moto, "Revisão")
+    b.cadastrar_cliente("Bruno", "", "82999990001")
+    b.cadastrar_produto("P1", "Pastilha", 5, 10.0, 20.0, 1)
+
+    relatorio = sis.sincronizar(a, b)
+    assert relatorio["enviadas"]["aplicadas"] == 3 and relatorio["recebidas"]["aplicadas"] == 2
+    assert not relatorio["enviadas"]["erros"] and not relatorio["recebidas"]["erros"]
+    for db in filiais:
+        assert _nomes(db) == ["Ana", "Bruno"]
+        assert _nomes(db, "produtos", "descricao") == ["Pastilha"]
+    # As referências recebidas apontam para os ids locais
+    dono = b.conn.execute("SELECT c.nome FROM motos m JOIN clientes c ON c.id = m.cliente_id").fetchone()[0]
+    assert dono == "Ana"
+    assert [linha[1] for linha in b.listar_os()] == ["Ana"]
+
+    # Alteração e exclusão chegam à outra filial; a segunda passada não muda nada
+    bruno_em_a = _id_por_nome(a, "Bruno")
+    a.conn.execute("UPDATE clientes SET telefone = '82988887777' WHERE id = ?", (bruno_em_a,))
+    a.conn.commit()
+    assert a.excluir_cliente(a.cadastrar_cliente("Temporário", "", ""))[0]
+    sis.sincronizar(a, b)
+    assert b.conn.execute("SELECT telefone FROM clientes WHERE nome = 'Bruno'").fetchone()[0] == "82988887777"
+    assert _nomes(b) == ["Ana", "Bruno"]
+    relatorio = sis.sincronizar(a, b)
+    assert relatorio["enviadas"]["aplicadas"] == relatorio["recebidas"]["aplicadas"] == 0
+
+
+def test_arquivo_de_alteracoes(filiais, tmp_path):
+    a, b = filiais
+    a.cadastrar_cliente("Ana", "", "82999990000")
+    a.cadastrar_produto("P1", "Pastilha", 5, 10.0, 20.0, 1)
+    caminho = str(tmp_path / "lote.json.gz")
+    enviado = sis.enviar_alteracoes(a, b.filial(), caminho)
+    assert enviado["alteracoes"] == 2
+    relatorio = sis.receber_alteracoes(b, caminho)
+    assert relatorio["aplicadas"] == 2 and not relatorio["erros"]
+    assert _nomes(b) == ["Ana"]
+    # O mesmo arquivo recebido de novo não altera nada
+    assert sis.receber_alteracoes(b, caminho)["aplicadas"] == 0
+
+
+@pytest.mark.parametrize("momento_a, momento_b", [(100, 50), (50, 100), (70, 70)])
+def test_conflito_vale_a_versao_maior(filiais, momento_a, momento_b):
+    a, b = filiais
+    cliente = a.cadastrar_cliente("Ana", "", "82999990000")
+    sis.sincronizar(a, b)
+    agora = int(time.time())
+    _renomear(a, cliente, "Ana (A)", agora + momento_a)
+    _renomear(b, _id_por_nome(b, "Ana"), "Ana (B)", agora + momento_b)
+    sis.sincronizar(a, b)
+    # Empate no momento: desempata o identificador da filial
+    vencedora = max((momento_a, a.filial(), "Ana (A)"), (momento_b, b.filial(), "Ana (B)"))[2]
+    assert _nomes(a) == _nomes(b) == [vencedora]
+
+
+def test_exclusao_com_dependentes_e_recusada(filiais):
+    a, b = filiais
+    cliente = a.cadastrar_cliente("Ana", "", "82999990000")
+    sis.sincronizar(a, b)
+    # Em B o cliente ganha uma moto; em A ele é excluído antes de ela chegar
+    b.cadastrar_moto(_id_por_nome(b, "Ana"), "Honda", "CG 160", "ABC1D23", "2020", "Preta")
+    assert a.excluir_cliente(cliente)[0]
+    # A recebe a moto antes da exclusão chegar a B e a recusa (cliente inexistente)
+    assert a.aplicar_sincronizacao(b.lote_sincronizacao(a.filial()))["rejeitadas"] == 1
+    relatorio = b.aplicar_sincronizacao(a.lote_sincronizacao(b.filial()))
+    assert relatorio["rejeitadas"] == 1 and "possui registros dependentes" in relatorio["erros"][0]
+    assert _nomes(b) == ["Ana"]
+    # O cliente volta para A, junto com a moto que A tinha recusado
+    sis.sincronizar(a, b)
+    assert _nomes(a) == ["Ana"] and _nomes(a, "motos", "placa") == ["ABC1D23"]
+
+
+def test_alteracoes_consolidadas_antes_da_limpeza_do_registro(filiais):
+    a, b = filiais
+    cliente = a.cadastrar_cliente("Ana", "", "82999990000")
+    sis.sincronizar(a, b)
+    # Passado o prazo do registro, a abertura do banco consolida as alterações
+    # em versoes e as apaga do registro
+    _renomear(a, cliente, "Ana Lima", int(time.time()))
+    a.conn.execute("UPDATE alteracoes SET momento = momento - ?", (sis.RETENCAO_ALTERACOES + 60,))
+    a.conn.commit()
+    sis.init_db(a.conexoes.caminho)
+    assert a.conn.execute("SELECT COUNT(*) FROM alteracoes").fetchone()[0] == 0
+    assert a.conn.execute("SELECT operacao FROM versoes WHERE tabela = 'clientes'").fetchone()[0] == "U"
+    relatorio = sis.sincronizar(a, b)
+    assert relatorio["enviadas"]["aplicadas"] == 1
+    assert _nomes(b) == ["Ana Lima"]
@@ -0,0 +1,59 @@
+def _os(db):
+    cliente = db.cadastrar_cliente("Ana", "", "82999990000")
+    moto = db.cadastrar_moto(cliente, "Honda", "CG 160", "ABC1D23", "2020", "Preta")
+    pastilha = db.cadastrar_produto("P1", "Pastilha", 50, 10.0, 25.5, 1)
+    oleo = db.cadastrar_produto("P2", "Óleo", 50, 20.0, 39.9, 1)
+    return db.criar_ordem_servico(cliente, moto, "Revisão"), pastilha, oleo
+
+
+def _totais(db, os_id):
+    return tuple(db.totais_os([os_id])[0])
+
+
+def _somado(db, os_id):
+    # Total das peças recalculado a partir de os_pecas
+    return round(db.conn.execute("SELECT COALESCE(SUM(quantidade * preco_unitario), 0) FROM os_pecas WHERE os_id = ?",
+                                 (os_id,)).fetchone()[0], 2)
+
+
+def test_totais_acompanham_as_pecas(db):
+    os_id, pastilha, oleo = _os(db)
+    assert _totais(db, os_id) == (os_id, 0, 0, 0)
+    assert db.adicionar_peca_os(os_id, pastilha, 2)
+    assert db.adicionar_peca_os(os_id, oleo, 1)
+    assert _totais(db, os_id) == (os_id, 90.9, 0, 90.9)
+
+    # O preço fica gravado na peça: mudar o do produto não altera a OS
+    db.conn.execute("UPDATE produtos SET preco_venda = 99 WHERE id = ?", (pastilha,))
+    db.conn.execute("UPDATE os_pecas SET quantidade = 3 WHERE os_id = ? AND produto_id = ?", (os_id, pastilha))
+    db.conn.commit()
+    assert _totais(db, os_id) == (os_id, 116.4, 0, 116.4) and _somado(db, os_id) == 116.4
+
+    db.conn.execute("DELETE FROM os_pecas WHERE os_id = ? AND produto_id = ?", (os_id, oleo))
+    db.conn.commit()
+    assert _totais(db, os_id) == (os_id, 76.5, 0, 76.5) and _somado(db, os_id) == 76.5
+    assert db.calcular_total_os(os_id) == 76.5
+
+
+def test_peca_movida_entre_os(db):
+    os_id, pastilha, _ = _os(db)
+    outra = db.criar_ordem_servico(*db.conn.execute(
+        "SELECT cliente_id, moto_id FROM ordens_servico WHERE id = ?", (os_id,)).fetchone(), "Freio")
+    db.adicionar_peca_os(os_id, pastilha, 2)
+    db.conn.execute("UPDATE os_pecas SET os_id = ? WHERE os_id = ?", (outra, os_id))
+    db.conn.commit()
+    assert _totais(db, os_id) == (os_id, 0, 0, 0)
+    assert _totais(db, outra) == (outra, 51.0, 0, 51.0)
+
+
+def test_mao_de_obra_entra_no_total(db):
+    os_id, pastilha, _ = _os(db)
+    db.adicionar_peca_os(os_id, pastilha, 2)
+    db.concluir_os(os_id, 80.0)
+    assert _totais(db, os_id) == (os_id, 51.0, 80.0, 131.0)
+    # Mão de obra corrigida e peça incluída depois da conclusão
+    db.concluir_os(os_id, 60.0)
+    db.adicionar_peca_os(os_id, pastilha, 1)
+    assert _totais(db, os_id) == (os_id, 76.5, 60.0, 136.5)
+    assert db.calcular_total_os(os_id) == 136.5
+    assert [(linha[0], linha.total) for linha in db.listar_os()] == [(os_id, 136.5)]